@@ -0,0 +1,189 @@
+"""Wall time, peak memory and output size of the HTML cleaning pipeline per corpus page.
+
+Runs offline on benchmarks/pages (see benchmarks/corpus.py), no browser needed.
+For every page it reports the median _clean_html time over --repeat runs, the
+share spent in _walk_elements and _split_long_text, the tracemalloc peak of
+one run, and the size of the cleaned output in characters and tokens. Then the
+path FetchAndCleanHTMLTool takes for a first page under --budget tokens: the
+walk stopped by _take_for_budget (_cleaned_items) and _render_page, with the
+viewport at the top of the page, timed the same way. Run from backend/:
+
+    python -m benchmarks.cleaner_suite
+    python -m benchmarks.cleaner_suite --budget 2000 --save before.json
+    python -m benchmarks.cleaner_suite --compare before.json --threshold 0.2
+
+--compare exits non-zero when a page got slower or hungrier than the threshold
+allows, or when its output changed.
+"""
+import argparse
+import asyncio
+import json
+import statistics
+import sys
+import time
+import tracemalloc
+
+from benchmarks.corpus import load_corpus
+from src.agents.tools.browser_tools import FetchAndCleanHTMLTool
+from src.agents.tools.token_budget import count_tokens, encoding_name
+
+
+class PhaseTimedCleaner(FetchAndCleanHTMLTool):
+    """Adds up the time spent in the outermost calls of the instrumented methods"""
+
+    def _record(self, name, elapsed, calls=1):
+        phases = self.__dict__.setdefault("bench_phases", {})
+        total, count = phases.get(name, (0.0, 0))
+        phases[name] = (total + elapsed, count + calls)
+
+    def _timed(self, name, method, *args, **kwargs):
+        active = self.__dict__.setdefault("bench_active", set())
+        if name in active:
+            return method(*args, **kwargs)
+        active.add(name)
+        start = time.perf_counter()
+        try:
+            return method(*args, **kwargs)
+        finally:
+            active.discard(name)
+            self._record(name, time.perf_counter() - start)
+
+    def _walk_elements(self, *args, **kwargs):
+        # A generator: time each step, not the call that creates it
+        walk = super()._walk_elements(*args, **kwargs)
+        while True:
+            start = time.perf_counter()
+            try:
+                item = next(walk)
+            except StopIteration:
+                self._record("walk_elements", time.perf_counter() - start)
+                return
+            self._record("walk_elements", time.perf_counter() - start, calls=0)
+            yield item
+
+    def _split_long_text(self, *args, **kwargs):
+        return self._timed("split_long_text", super()._split_long_text, *args, **kwargs)
+
+
+VIEWPORT = {"x": 0, "y": 0, "w": 1280, "h": 720}
+
+
+def _make(tool_class, parser_backend):
+    return tool_class.model_construct(name="bench", description="bench", parser_backend=parser_backend)
+
+
+def first_page(tool, html: str, positions: dict, budget: int, loop) -> tuple:
+    """What the tool returns for a first fetch under budget: (output, items walked)"""
+    page_budget = tool._page_budget(budget, "html", True, None)
+    items, complete = tool._cleaned_items(html, positions, VIEWPORT, page_budget)
+    # _render_page reads the viewport through the page; hand it the order it would compute
+    tool._snapshot = {"items": items, "complete": complete, "viewport": VIEWPORT,
+                      "order": tool._viewport_order(items or [], VIEWPORT)}
+    return loop.run_until_complete(tool._render_page(items, "html", True, budget)), len(items or [])
+
+
+def bench_page(html: str, positions: dict, repeat: int, parser_backend: str, budget: int) -> dict:
+    tool = _make(FetchAndCleanHTMLTool, parser_backend)
+    output = tool._clean_html(html, positions)
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        tool._clean_html(html, positions)
+        times.append(time.perf_counter() - start)
+
+    tracemalloc.start()
+    try:
+        tool._clean_html(html, positions)
+        peak = tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+    # Instrumented run kept apart so the wrappers don't skew the wall time above
+    timed = _make(PhaseTimedCleaner, parser_backend)
+    start = time.perf_counter()
+    timed._clean_html(html, positions)
+    timed_total = time.perf_counter() - start
+    phases = timed.__dict__.get("bench_phases", {})
+
+    loop = asyncio.new_event_loop()
+    try:
+        page_output, walked = first_page(tool, html, positions, budget, loop)
+        page_times = []
+        for _ in range(repeat):
+            start = time.perf_counter()
+            first_page(tool, html, positions, budget, loop)
+            page_times.append(time.perf_counter() - start)
+    finally:
+        loop.close()
+
+    return {
+        "median_ms": statistics.median(times) * 1000,
+        "min_ms": min(times) * 1000,
+        "walk_elements_share": phases.get("walk_elements", (0.0, 0))[0] / timed_total,
+        "split_long_text_share": phases.get("split_long_text", (0.0, 0))[0] / timed_total,
+        "split_long_text_calls": phases.get("split_long_text", (0.0, 0))[1],
+        "peak_kb": peak / 1024,
+        "output_chars": len(output),
+        "output_tokens": count_tokens(output),
+        "first_page_ms": statistics.median(page_times) * 1000,
+        "first_page_walked": walked,
+        "first_page_tokens": count_tokens(page_output),
+    }
+
+
+def compare(results: dict, baseline: dict, threshold: float) -> list:
+    """Regressions of results against a saved run"""
+    regressions = []
+    for name, current in results.items():
+        before = baseline.get(name)
+        if before is None:
+            continue
+        for key in ("median_ms", "peak_kb", "first_page_ms"):
+            if key in before and current[key] > before[key] * (1 + threshold):
+                regressions.append(f"{name}: {key} {before[key]:.1f} -> {current[key]:.1f}")
+        for key in ("output_chars", "output_tokens", "first_page_tokens"):
+            if key in before and current[key] != before[key]:
+                regressions.append(f"{name}: {key} changed {before[key]} -> {current[key]}")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("pages", nargs="*", help="Corpus pages to run (default: all)")
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--parser-backend", default="html.parser")
+    parser.add_argument("--budget", type=int, default=8000, help="Token budget of the first-page run")
+    parser.add_argument("--save", help="Write the results to this JSON file")
+    parser.add_argument("--compare", help="Baseline JSON written by --save")
+    parser.add_argument("--threshold", type=float, default=0.2,
+                        help="Allowed slowdown / memory growth against the baseline (0.2 = 20%%)")
+    args = parser.parse_args()
+
+    tokenizer = f"tiktoken {encoding_name()}" if encoding_name() else "length estimate (tiktoken encoding unavailable)"
+    print(f"Parser backend {args.parser_backend}, token counts via {tokenizer}")
+    print(f"{'page':<12} {'median ms':>10} {'min ms':>8} {'walk':>8} {'split':>6} {'peak KB':>9} "
+          f"{'chars':>8} {'tokens':>7} {'page ms':>8} {'walked':>7}")
+
+    results = {}
+    for name, html, positions in load_corpus(args.pages):
+        result = results[name] = bench_page(html, positions, args.repeat, args.parser_backend, args.budget)
+        print(f"{name:<12} {result['median_ms']:>10.1f} {result['min_ms']:>8.1f} "
+              f"{result['walk_elements_share']:>8.0%} {result['split_long_text_share']:>6.0%} "
+              f"{result['peak_kb']:>9.0f} {result['output_chars']:>8} {result['output_tokens']:>7} "
+              f"{result['first_page_ms']:>8.1f} {result['first_page_walked']:>7}")
+
+    if args.save:
+        with open(args.save, "w") as f:
+            json.dump(results, f, indent=2)
+    if args.compare:
+        with open(args.compare) as f:
+            regressions = compare(results, json.load(f), args.threshold)
+        for regression in regressions:
+            print(f"REGRESSION {regression}")
+        if regressions:
+            sys.exit(1)
+        print("No regressions against the baseline.")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,84 @@
+"""Checked-in page corpus for the cleaner benchmarks.
+
+benchmarks/pages/ holds one <name>.html per page, as page.content() returns it
+after ELEMENT_POSITIONS_JS stamped data-cleaner-id, next to the recorded
+<name>.positions.json, plus manifest.json describing each page. Generated pages
+are rebuilt from CORPUS with
+
+    python -m benchmarks.corpus [name ...]
+
+Pages saved from a real browser session can be dropped next to them: any
+<name>.html is picked up, and one without a positions file gets synthetic
+positions from stamp_positions when loaded.
+"""
+import json
+import sys
+from pathlib import Path
+
+from bs4 import BeautifulSoup, NavigableString
+
+from benchmarks.fixtures import generate_article_page, generate_nested_page, generate_page, stamp_positions
+
+PAGES_DIR = Path(__file__).parent / "pages"
+MANIFEST = PAGES_DIR / "manifest.json"
+
+# name -> (generator, kwargs, description)
+CORPUS = {
+    "small": (generate_page, {"n_nodes": 300, "seed": 11}, "Short page: a few forms, links and paragraphs"),
+    "medium": (generate_page, {"n_nodes": 3000, "seed": 12}, "Typical content page"),
+    "large": (generate_page, {"n_nodes": 12000, "seed": 13}, "10k+ node page"),
+    "deep": (generate_nested_page, {"depth": 400, "n_nodes": 1000, "seed": 14},
+             "Main content under 400 nested containers"),
+    "list_heavy": (generate_page, {"n_nodes": 3000, "seed": 15, "list_bias": 0.6},
+                   "Listing page where most blocks are ul/ol"),
+    "article": (generate_article_page, {"n_blocks": 400, "seed": 16},
+                "Long-form text in divs, split into chunks by the cleaner"),
+}
+
+
+def count_nodes(html: str) -> int:
+    """Elements plus non-blank text nodes"""
+    soup = BeautifulSoup(html, "html.parser")
+    return sum(1 for node in soup.descendants
+               if not isinstance(node, NavigableString) or node.strip())
+
+
+def build(names=None):
+    PAGES_DIR.mkdir(exist_ok=True)
+    manifest = json.loads(MANIFEST.read_text()) if MANIFEST.exists() else {}
+    for name in names or CORPUS:
+        generator, kwargs, description = CORPUS[name]
+        html, positions = stamp_positions(generator(**kwargs))
+        (PAGES_DIR / f"{name}.html").write_text(html, encoding="utf-8")
+        (PAGES_DIR / f"{name}.positions.json").write_text(json.dumps(positions, indent=1), encoding="utf-8")
+        manifest[name] = {
+            "description": description,
+            "source": f"{generator.__name__}({', '.join(f'{k}={v!r}' for k, v in kwargs.items())})",
+            "nodes": count_nodes(html),
+            "elements": len(positions),
+            "bytes": len(html.encode("utf-8")),
+        }
+        print(f"{name}: {manifest[name]['nodes']} nodes, {len(positions)} positioned elements")
+    MANIFEST.write_text(json.dumps(manifest, indent=2, sort_keys=True) + "\n", encoding="utf-8")
+
+
+def load_corpus(names=None):
+    """Yield (name, html, element_positions) for every page in benchmarks/pages, or just `names`"""
+    paths = sorted(PAGES_DIR.glob("*.html"))
+    if names:
+        missing = set(names) - {path.stem for path in paths}
+        if missing:
+            raise ValueError(f"Unknown corpus pages {sorted(missing)}, run `python -m benchmarks.corpus` to build them")
+        paths = [path for path in paths if path.stem in names]
+    for path in paths:
+        html = path.read_text(encoding="utf-8")
+        positions_path = path.with_suffix(".positions.json")
+        if positions_path.exists():
+            positions = json.loads(positions_path.read_text(encoding="utf-8"))
+        else:
+            html, positions = stamp_positions(html)
+        yield path.stem, html, positions
+
+
+if __name__ == "__main__":
+    build(sys.argv[1:])
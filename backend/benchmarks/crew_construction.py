@@ -0,0 +1,60 @@
+"""Time to construct a MasterCrew, with cold and warm config/tool caches.
+
+Cold runs clear the YAML cache and the tool registry before every construction,
+which is what each request paid before they existed: parsing agents.yaml,
+tasks.yaml and tools.yaml and validating every tool. Warm runs are what a request
+pays now. No browser or LLM call is made: the crew gets a Page that is never
+used, but crew.py still needs GEMINI_API_KEY to be set. Run from backend/:
+
+    GEMINI_API_KEY=unused python -m benchmarks.crew_construction --repeat 50
+"""
+import argparse
+import logging
+import statistics
+import time
+
+from playwright.async_api import Page
+
+from src.agents.crew import MasterCrew
+from src.agents.tools.tool_registry import tool_registry
+from src.agents.utils.config_cache import config_cache
+
+
+class UnusedPage(Page):
+    """Passes the tools' Page validation; construction never touches it"""
+
+    def __init__(self):
+        pass
+
+    url = "about:blank"
+    context = None
+
+
+def construct(cold: bool) -> float:
+    if cold:
+        config_cache.clear()
+        tool_registry.clear()
+    start = time.perf_counter()
+    MasterCrew(PAGE=UnusedPage())
+    return time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--repeat", type=int, default=30)
+    args = parser.parse_args()
+    logging.disable(logging.INFO)
+
+    construct(cold=True)  # imports and crewAI's own one-time setup
+    print(f"{'caches':<6} {'median ms':>10} {'min ms':>8} {'max ms':>8}")
+    medians = {}
+    for label, cold in (("cold", True), ("warm", False)):
+        times = [construct(cold) * 1000 for _ in range(args.repeat)]
+        medians[label] = statistics.median(times)
+        print(f"{label:<6} {medians[label]:>10.2f} {min(times):>8.2f} {max(times):>8.2f}")
+    print(f"Warm construction is {medians['cold'] / medians['warm']:.1f}x faster.")
+    print(f"Config cache {config_cache.stats()}, tool registry {tool_registry.stats()}")
+
+
+if __name__ == "__main__":
+    main()
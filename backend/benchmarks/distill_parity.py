@@ -0,0 +1,123 @@
+"""Parity of FetchAndCleanHTMLTool's browser mode (DISTILL_DOM_JS) with the Python cleaner.
+
+Every fixture page is loaded into Chromium twice, each time in a fresh tab so
+both runs number the data-cleaner-ids from zero. The first load goes the
+Python way: ELEMENT_POSITIONS_JS, page.content(), _cleaned_items.
+The second runs DISTILL_DOM_JS. The two item lists have to be identical.
+Pages are the hand-written EDGE_CASE_PAGES, generated pages, the
+benchmarks/pages corpus and pages nested --depth levels deep. Chromium's HTML
+parser stops nesting at 512 levels, so the deep ones are built by NEST_JS
+after loading; they check that neither mode runs out of stack. Needs
+Playwright's Chromium (`playwright install chromium`); run from backend/:
+
+    python -m benchmarks.distill_parity
+    python -m benchmarks.distill_parity --nodes 500 5000 --seeds 5 --no-corpus --depth 2000 20000
+
+Exits non-zero when any page's items differ.
+"""
+import argparse
+import asyncio
+import json
+import sys
+import time
+
+from playwright.async_api import async_playwright
+
+from benchmarks.corpus import load_corpus
+from benchmarks.fixtures import EDGE_CASE_PAGES, generate_page
+from src.agents.tools.browser_tools import FetchAndCleanHTMLTool
+from src.agents.tools.page_scripts import DISTILL_DOM_JS, ELEMENT_POSITIONS_JS
+
+# Wraps a link and a paragraph every 500 levels, and a list at the bottom, in `depth` nested divs
+NEST_JS = """(depth) => {
+    let parent = document.body;
+    for (let level = 0; level < depth; level++) {
+        const div = document.createElement('div');
+        if (level % 500 === 0) div.innerHTML = `<a href="/level-${level}">Level ${level}</a><p>Text at level ${level}.</p>`;
+        parent.appendChild(div);
+        parent = div;
+    }
+    parent.innerHTML = '<ul><li>Deepest</li><li><button type="button">Go</button></li></ul>';
+}"""
+
+
+def fixture_pages(node_counts: list[int], seeds: int, corpus: bool = True, depths: tuple = ()):
+    """Yield (name, html, nesting depth or None) for every page the parity check runs on"""
+    for name, html in EDGE_CASE_PAGES.items():
+        yield name, html, None
+    for nodes in node_counts:
+        for seed in range(seeds):
+            yield f"generated-{nodes}-{seed}", generate_page(nodes, seed), None
+    if corpus:
+        for name, html, _ in load_corpus():
+            yield f"corpus-{name}", html, None
+    for depth in depths:
+        yield f"nested-{depth}", "<!DOCTYPE html><html><body></body></html>", depth
+
+
+def first_difference(expected: list, actual: list) -> str:
+    for index, (a, b) in enumerate(zip(expected, actual)):
+        if a != b:
+            return f"item {index}: python {json.dumps(a)[:200]} != browser {json.dumps(b)[:200]}"
+    return f"python has {len(expected)} items, browser {len(actual)}"
+
+
+async def _load(context, html: str, depth: int | None = None):
+    page = await context.new_page()
+    await page.set_content(html)
+    if depth:
+        await page.evaluate(NEST_JS, depth)
+    return page
+
+
+async def run(node_counts: list[int], seeds: int, corpus: bool, headless: bool = True,
+              depths: tuple = ()) -> list[str]:
+    tool = FetchAndCleanHTMLTool.model_construct(name="bench", description="bench", parser_backend="html.parser")
+    mismatches = []
+    async with async_playwright() as p:
+        browser = await p.chromium.launch(headless=headless)
+        context = await browser.new_context(viewport={"width": 1280, "height": 720})
+        print(f"{'page':<22} {'items':>6} {'python ms':>10} {'browser ms':>11} {'items':>8}")
+        for name, html, depth in fixture_pages(node_counts, seeds, corpus, depths):
+            page = await _load(context, html, depth)
+            start = time.perf_counter()
+            positions = (await page.evaluate(ELEMENT_POSITIONS_JS))["positions"]
+            expected = tool._cleaned_items(await page.content(), positions)[0]
+            python_ms = (time.perf_counter() - start) * 1000
+            await page.close()
+
+            page = await _load(context, html, depth)
+            start = time.perf_counter()
+            actual = await page.evaluate(DISTILL_DOM_JS)
+            browser_ms = (time.perf_counter() - start) * 1000
+            await page.close()
+
+            same = expected == actual
+            if not same:
+                mismatches.append(f"{name}: {first_difference(expected or [], actual or [])}")
+            print(f"{name:<22} {len(expected or []):>6} {python_ms:>10.1f} {browser_ms:>11.1f} "
+                  f"{'same' if same else 'DIFFER':>8}")
+        await browser.close()
+    return mismatches
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--nodes", type=int, nargs="+", default=[300, 2000])
+    parser.add_argument("--seeds", type=int, default=3)
+    parser.add_argument("--no-corpus", action="store_true", help="Skip the benchmarks/pages corpus")
+    parser.add_argument("--depth", type=int, nargs="*", default=[1000, 10000],
+                        help="Nesting depths of the script-built deep pages")
+    parser.add_argument("--headed", action="store_true")
+    args = parser.parse_args()
+    mismatches = asyncio.run(run(args.nodes, args.seeds, not args.no_corpus, headless=not args.headed,
+                                 depths=tuple(args.depth)))
+    for mismatch in mismatches:
+        print(f"MISMATCH {mismatch}")
+    if mismatches:
+        sys.exit(1)
+    print("Browser mode matches the Python cleaner on every page.")
+
+
+if __name__ == "__main__":
+    main()
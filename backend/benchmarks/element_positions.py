@@ -0,0 +1,129 @@
+"""In-page cost of ELEMENT_POSITIONS_JS against the per-selector script it replaced.
+
+Each run loads a fresh fixture page (so nothing is stamped yet) and times one
+call of the script inside the page with performance.now(). Needs Playwright's
+Chromium (`playwright install chromium`); run from backend/:
+
+    python -m benchmarks.element_positions --nodes 2000 10000 40000 --runs 7
+"""
+import argparse
+import asyncio
+import statistics
+
+from playwright.async_api import async_playwright
+
+from benchmarks.fixtures import generate_page
+from src.agents.tools.page_scripts import ELEMENT_POSITIONS_JS
+
+# The version before the single-walk rewrite: ten querySelectorAll tag scans plus four
+# [class*=...] scans, layout reads interleaved with setAttribute writes, full textContent.
+LEGACY_ELEMENT_POSITIONS_JS = """
+() => {
+    const positions = {};
+    const interactiveSelectors = [
+        'a', 'button', 'input', 'textarea', 'select', 'form', 
+        'label', 'details', 'summary', 'dialog'
+    ];
+
+    // Also check for elements with button-like classes
+    const buttonClassIndicators = ['button', 'btn', 'clickable', 'link-button'];
+
+    // Continue numbering across calls so elements added later never reuse an id
+    let elementCounter = window.__cleanerIdCounter || 0;
+
+    // Get traditional interactive elements
+    interactiveSelectors.forEach(selector => {
+        const elements = document.querySelectorAll(selector);
+        elements.forEach((el) => {
+            const rect = el.getBoundingClientRect();
+            const style = window.getComputedStyle(el);
+            if (rect.width > 0 && rect.height > 0 && style.opacity > 0 && style.visibility !== 'hidden') {
+                const uniqueId = el.getAttribute('data-cleaner-id') || `cleaner-id-${elementCounter}`;
+                if (!el.getAttribute('data-cleaner-id')) {
+                    el.setAttribute('data-cleaner-id', uniqueId);
+                }
+
+                positions[uniqueId] = {
+                    x: Math.round(rect.left + window.scrollX),
+                    y: Math.round(rect.top + window.scrollY),
+                    w: Math.round(rect.width),
+                    h: Math.round(rect.height),
+                    tag: el.tagName.toLowerCase(),
+                    text: el.textContent.trim().replace(/\\s+/g, ' '),
+                };
+                elementCounter++;
+            }
+        });
+    });
+
+    // Get elements with button-like classes
+    buttonClassIndicators.forEach(indicator => {
+        const elements = document.querySelectorAll(`[class*="${indicator}"]`);
+        elements.forEach((el) => {
+            // Skip if already processed
+            if (el.getAttribute('data-cleaner-id')) return;
+
+            const rect = el.getBoundingClientRect();
+            const style = window.getComputedStyle(el);
+            if (rect.width > 0 && rect.height > 0 && style.opacity > 0 && style.visibility !== 'hidden') {
+                const uniqueId = `cleaner-id-${elementCounter}`;
+                el.setAttribute('data-cleaner-id', uniqueId);
+
+                positions[uniqueId] = {
+                    x: Math.round(rect.left + window.scrollX),
+                    y: Math.round(rect.top + window.scrollY),
+                    w: Math.round(rect.width),
+                    h: Math.round(rect.height),
+                    tag: el.tagName.toLowerCase(),
+                    text: el.textContent.trim().replace(/\\s+/g, ' '),
+                };
+                elementCounter++;
+            }
+        });
+    });
+
+    window.__cleanerIdCounter = elementCounter;
+    return positions;
+}
+"""
+
+
+def _timed(script: str) -> str:
+    return f"() => {{ const start = performance.now(); const result = ({script})(); " \
+           f"return {{ ms: performance.now() - start, elements: Object.keys(result.positions || result).length }}; }}"
+
+
+async def run(node_counts: list[int], runs: int, headless: bool = True):
+    scripts = {"legacy": _timed(LEGACY_ELEMENT_POSITIONS_JS), "current": _timed(ELEMENT_POSITIONS_JS)}
+    async with async_playwright() as p:
+        browser = await p.chromium.launch(headless=headless)
+        page = await browser.new_page(viewport={"width": 1280, "height": 720})
+        print(f"{'nodes':>8} {'elements':>9} {'legacy ms':>10} {'current ms':>11} {'speedup':>8}")
+        for nodes in node_counts:
+            html = generate_page(nodes, seed=nodes)
+            samples = {name: [] for name in scripts}
+            elements = 0
+            for _ in range(runs):
+                # Alternate so neither script always runs on a warmer page
+                for name, script in scripts.items():
+                    await page.set_content(html)
+                    result = await page.evaluate(script)
+                    samples[name].append(result["ms"])
+                    elements = result["elements"]
+            legacy = statistics.median(samples["legacy"])
+            current = statistics.median(samples["current"])
+            print(f"{nodes:>8} {elements:>9} {legacy:>10.1f} {current:>11.1f} {legacy / current:>7.1f}x")
+        await browser.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--nodes", type=int, nargs="+", default=[2000, 10000, 40000])
+    parser.add_argument("--runs", type=int, default=7)
+    parser.add_argument("--headed", action="store_true")
+    args = parser.parse_args()
+    asyncio.run(run(args.nodes, args.runs, headless=not args.headed))
+
+
+if __name__ == "__main__":
+    main()
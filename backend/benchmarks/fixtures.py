@@ -0,0 +1,246 @@
+"""Deterministic synthetic pages for the cleaner benchmarks.
+
+Pages mix the structures FetchAndCleanHTMLTool has to deal with: nested layout
+blocks, inline runs, links/buttons/inputs/forms, lists, tables, scripts and
+images, plus a share of elements hidden by CSS. The same (n_nodes, seed) always
+produces the same page.
+"""
+import random
+import re
+
+from bs4 import BeautifulSoup
+
+BLOCK_TAGS = ['div', 'section', 'article', 'nav', 'header', 'footer', 'main', 'aside', 'blockquote']
+INLINE_TAGS = ['span', 'strong', 'em', 'b', 'i', 'small', 'code', 'mark']
+TEXTS = [
+    'Lorem ipsum dolor sit amet. ', 'Buy now! ', 'Price: $19.99. ', 'Short',
+    '&nbsp;Free&nbsp;shipping ', 'Some very long text that goes on and on. Another Sentence Here! And More text? ',
+]
+ATTRIBUTES = [
+    '', ' class="btn primary"', ' id="search" name="q"', ' href="/a?b=1&amp;c=2"',
+    ' title="He said &quot;hi&quot;"', ' role="button" aria-label="Open"', ' class="card-link clickable"',
+]
+HIDDEN = [' style="display:none"', ' style="visibility:hidden"', ' style="opacity:0"', ' hidden']
+
+STYLE = "body{font:14px sans-serif} .btn{padding:4px} li{margin:2px}"
+
+# Same selection as ELEMENT_POSITIONS_JS
+POSITION_TAGS = {'a', 'button', 'input', 'textarea', 'select', 'form', 'label', 'details', 'summary', 'dialog'}
+BUTTON_CLASS_INDICATORS = ('button', 'btn', 'clickable', 'link-button')
+HIDING_STYLE = re.compile(r'display:\s*none|visibility:\s*hidden|opacity:\s*0(?![.\d])')
+
+
+def generate_page(n_nodes: int, seed: int = 0, max_depth: int = 14, list_bias: float = 0.1) -> str:
+    """Build a page of roughly n_nodes elements and text nodes.
+
+    max_depth caps the nesting of block elements; list_bias is the share of
+    blocks that become ul/ol lists.
+    """
+    r = random.Random(seed)
+    count = 0
+
+    def hidden() -> str:
+        return r.choice(HIDDEN) if r.random() < 0.05 else ''
+
+    def text() -> str:
+        nonlocal count
+        count += 1
+        chunk = r.choice(TEXTS)
+        return chunk * r.randint(1, 3) if r.random() < 0.2 else chunk
+
+    def inline(depth: int, in_interactive: bool = False) -> str:
+        nonlocal count
+        count += 1
+        k = r.random()
+        if depth >= max_depth or k < 0.35:
+            return text()
+        if k < 0.45:
+            return r.choice(['<img alt="logo" src="logo.png">', '<img src="x.png">', '<!-- note -->', '<br>',
+                             '<svg width="8" height="8"><path d="M0 0h8v8z"></path></svg>'])
+        if k < 0.65 and not in_interactive:
+            tag = r.choice(['a', 'button', 'label'])
+            if r.random() < 0.3:
+                inner = ''.join(inline(depth + 1, True) for _ in range(r.randint(1, 2)))
+            else:
+                inner = r.choice(['Click', 'Go', '', 'Next page'])
+            return f'<{tag}{r.choice(ATTRIBUTES)}{hidden()}>{inner}</{tag}>'
+        if k < 0.72 and not in_interactive:
+            input_type = r.choice(['text', 'checkbox', 'submit'])
+            return f'<input{r.choice(ATTRIBUTES)}{hidden()} type="{input_type}" placeholder="Search">'
+        tag = r.choice(INLINE_TAGS)
+        inner = ''.join(inline(depth + 1, in_interactive) for _ in range(r.randint(1, 3)))
+        return f'<{tag}>{inner}</{tag}>'
+
+    def block(depth: int) -> str:
+        nonlocal count
+        count += 1
+        if depth >= max_depth or r.random() < 0.2:
+            return f'<p>{"".join(inline(depth + 1) for _ in range(r.randint(1, 4)))}</p>'
+        if r.random() < list_bias:
+            tag = r.choice(['ul', 'ol'])
+            items = ''.join(f'<li>{inline(depth + 1) if r.random() < 0.6 else block(depth + 1)}</li>'
+                            for _ in range(r.randint(1, 8)))
+            return f'<{tag}>{items}</{tag}>'
+        kind = r.choices(['heading', 'table', 'form', 'script', 'details', 'container'], weights=[6, 6, 6, 4, 3, 45])[0]
+        if kind == 'heading':
+            level = r.randint(1, 4)
+            return f'<h{level}>{inline(depth + 1)}</h{level}>'
+        if kind == 'table':
+            rows = ''.join('<tr>' + ''.join(f'<td>{inline(depth + 1)}</td>' for _ in range(r.randint(1, 4))) + '</tr>'
+                           for _ in range(r.randint(1, 5)))
+            return f'<table><tbody>{rows}</tbody></table>'
+        if kind == 'form':
+            fields = ''.join(inline(depth + 1) for _ in range(r.randint(1, 4)))
+            return (f'<form action="/s" method="post">{fields}'
+                    '<select name="s"><option value="1">One</option><option value="2">Two</option></select>'
+                    f'<textarea name="t">{r.choice(["", "hello", "a &lt;b&gt;"])}</textarea></form>')
+        if kind == 'script':
+            if r.random() < 0.5:
+                return '<script>var a = 1 < 2 && "</div>".length;</script>'
+            return '<noscript><img alt="nojs"></noscript>'
+        if kind == 'details':
+            return f'<details><summary>More</summary>{block(depth + 1)}</details>'
+        tag = r.choice(BLOCK_TAGS)
+        inner = ''.join(block(depth + 1) if r.random() < 0.6 else inline(depth + 1) for _ in range(r.randint(1, 4)))
+        return f'<{tag}{hidden()}>{inner}</{tag}>'
+
+    parts = []
+    while count < n_nodes:
+        parts.append(block(0))
+    return (f'<!DOCTYPE html><html><head><meta charset="utf-8"><title>Fixture {n_nodes}/{seed}</title>'
+            f'<style>{STYLE}</style></head><body>{"".join(parts)}</body></html>')
+
+
+def stamp_positions(html: str) -> tuple[str, dict]:
+    """Offline stand-in for ELEMENT_POSITIONS_JS: stamp data-cleaner-id and return (html, positions).
+
+    Elements hidden by the `hidden` attribute or an inline display/visibility/opacity
+    style (on themselves or an ancestor) are skipped. Boxes come from a simple
+    top-to-bottom flow, so ids, sizes and the page height are deterministic.
+    """
+    soup = BeautifulSoup(html, 'html.parser')
+    positions = {}
+    y = 0
+    for element in soup.find_all(True):
+        class_name = ' '.join(element.get('class', []))
+        if element.name not in POSITION_TAGS and not any(i in class_name for i in BUTTON_CLASS_INDICATORS):
+            continue
+        if any(node.has_attr('hidden') or HIDING_STYLE.search(node.get('style', ''))
+               for node in [element, *element.parents] if node.name not in ('[document]', None)):
+            continue
+        if element.find_parent('head'):
+            continue
+        text = re.sub(r'\s+', ' ', element.get_text()).strip()
+        if element.name != 'form':
+            y += 28
+        unique_id = f'cleaner-id-{len(positions)}'
+        element['data-cleaner-id'] = unique_id
+        positions[unique_id] = {
+            'x': 16 + (len(positions) * 37) % 640,
+            'y': y,
+            'w': 24 + min(len(text), 40) * 7 if element.name != 'input' else 200,
+            'h': 24,
+            'tag': element.name,
+            'text': text[:200],
+        }
+    return str(soup), positions
+
+
+def generate_nested_page(depth: int, n_nodes: int = 1000, seed: int = 0) -> str:
+    """A page whose main content sits under `depth` nested containers.
+
+    Every level carries a little text and the innermost one a link, so every
+    container holds an interactive element and the cleaner has to walk the
+    whole chain instead of merging it into one text block.
+    """
+    r = random.Random(seed)
+    body = re.search(r'<body>(.*)</body>', generate_page(n_nodes, seed), re.S).group(1)
+    opening, closing = [], []
+    for level in range(depth):
+        tag = BLOCK_TAGS[level % len(BLOCK_TAGS)]
+        text = f'<span>{r.choice(TEXTS)}</span>' if level % 5 == 0 else ''
+        opening.append(f'<{tag}>{text}')
+        closing.append(f'</{tag}>')
+    chain = ''.join(opening) + f'<a href="/deep">Level {depth}</a>{body}' + ''.join(reversed(closing))
+    return (f'<!DOCTYPE html><html><head><meta charset="utf-8"><title>Nested {depth}/{seed}</title>'
+            f'<style>{STYLE}</style></head><body>{chain}</body></html>')
+
+
+def generate_article_page(n_blocks: int, seed: int = 0) -> str:
+    """Text-heavy page: a link bar over sections of long prose, each with a "Read more" link.
+
+    The prose divs hold no interactive elements, so the cleaner merges each into
+    one text and splits it with _split_long_text.
+    """
+    r = random.Random(seed)
+    words = ' '.join(TEXTS).replace('&nbsp;', ' ').split()
+    nav = ''.join(f'<a href="/section/{i}">Section {i}</a>' for i in range(8))
+    blocks = []
+    for _ in range(n_blocks):
+        sentences = []
+        for _ in range(r.randint(3, 12)):
+            sentence = ' '.join(r.choice(words) for _ in range(r.randint(4, 20))).rstrip('.!?')
+            sentences.append(sentence[:1].upper() + sentence[1:] + r.choice(['.', '!', '?', '']))
+        blocks.append(f'<section><div><span>{" ".join(sentences[:2])}</span> {" ".join(sentences[2:])}</div>'
+                      f'<a href="/more/{len(blocks)}">Read more</a></section>')
+    return (f'<!DOCTYPE html><html><head><meta charset="utf-8"><title>Article {n_blocks}/{seed}</title>'
+            f'<style>{STYLE}</style></head><body><nav>{nav}</nav><main>{"".join(blocks)}</main></body></html>')
+
+
+def _edge_case_page(title: str, body: str) -> str:
+    return (f'<!DOCTYPE html><html><head><meta charset="utf-8"><title>{title}</title>'
+            f'<style>{STYLE}</style></head><body>{body}</body></html>')
+
+
+# Hand-written pages for the places where the Python cleaner and DISTILL_DOM_JS
+# could drift apart: whitespace and string handling, alt text, pruning, innermost
+# interactive elements and attribute filtering.
+EDGE_CASE_PAGES = {
+    "whitespace": _edge_case_page("Whitespace", (
+        '<p>&nbsp;Free&nbsp;shipping&nbsp;</p><p>  runs\tof\n\n  whitespace  </p>'
+        '<p>\u2003em space\u2003and\u00a0nbsp\u3000ideographic\u3000</p><p>\u200bzero width\u200b</p>'
+        '<span>\n\t </span><div> a <b>bold</b>  <i>mix</i> </div>'
+    )),
+    "long_text": _edge_case_page("Long text", (
+        '<div>' + 'Some very long text that goes on and on. Another Sentence Here! And More text? ' * 6 + '</div>'
+        '<div><span>' + 'Lorem ipsum dolor sit amet. ' * 12 + '</span>no-break-' + 'x' * 250 + '</div>'
+        '<div>' + 'Short. ' * 40 + '</div><p>' + 'A paragraph over two hundred characters. ' * 8 + '</p>'
+    )),
+    "unicode": _edge_case_page("Unicode", (
+        '<div>' + 'Emoji \U0001f600 counts as one code point. ' * 8 + '</div>'
+        '<p>\u00dcn\u00efc\u00f6d\u00e9 \u00f1ame \u2014 \u201cquotes\u201d and \u2018apostrophes\u2019</p>'
+        '<a href="/\u00e9t\u00e9">\u00c9t\u00e9 \U0001f30d</a>'
+        '<div>' + '\U0001f468\u200d\U0001f469\u200d\U0001f467 family. ' * 30 + '</div>'
+    )),
+    "images": _edge_case_page("Images", (
+        '<p>Before <img alt="  Company logo " src="logo.png"> after</p><div><img src="x.png"></div>'
+        '<a href="/home"><img alt="Home"></a><button><img alt="Search"> Go</button>'
+        '<ul><li><img alt="Item one"></li><li>Two</li></ul>'
+    )),
+    "pruned": _edge_case_page("Pruned", (
+        '<!-- a comment --><script>var a = "<div>not markup</div>";</script><noscript><p>No JS</p></noscript>'
+        '<p>Kept<!-- inline comment --> text</p><svg width="8" height="8"><text>svg text</text></svg>'
+        '<iframe src="about:blank"></iframe><object data="x"></object><div><style>p{}</style>After style</div>'
+        '<canvas>canvas fallback</canvas><video>video fallback</video>'
+    )),
+    "interactive": _edge_case_page("Interactive", (
+        '<a href="/outer"><span>Outer <button type="button">Inner</button></span></a>'
+        '<form action="/s" method="post"><label for="q">Query</label><input id="q" name="q" placeholder="Search">'
+        '<select name="s"><option value="1" selected>One</option><option value="2">Two</option></select>'
+        '<textarea name="t">a &lt;b&gt;</textarea><input type="checkbox" checked disabled></form>'
+        '<details><summary>More</summary><p>Hidden details</p></details>'
+        '<div class="btn primary" role="button" aria-label="Open">Open</div><a href="/empty"></a>'
+        '<button style="display:none">Hidden</button><a href="/x" hidden>Hidden link</a>'
+    )),
+    "lists": _edge_case_page("Lists", (
+        '<ul><li>One</li><li> </li><li>Two <b>bold</b></li></ul>'
+        '<ol><li><a href="/1">Linked</a></li><li>Plain</li></ol>'
+        '<ul><li><ul><li>Nested</li></ul></li></ul><li>Orphan item</li>'
+        '<dl><dt>Term</dt><dd>Definition</dd></dl>'
+    )),
+    "attributes": _edge_case_page("Attributes", (
+        '<a href="/a?b=1&amp;c=2" title="He said &quot;hi&quot;" data-track="x" onclick="go()">Link</a>'
+        '<input type="text" value="prefilled" required readonly style="color:red" tabindex="2">'
+        '<button class="card-link clickable" id="b1" name="b" aria-label="Card">Card</button>'
+    )),
+}
@@ -0,0 +1,113 @@
+"""Parity and timing of _mark_interactive against the marking it replaced.
+
+The legacy cleaner below reproduces the marking _clean_html did before the
+one-pass rewrite: a find_all per interactive tag and per button class, a
+find_all per child tag to decide which elements are innermost, and a scan of
+every innermost element against element.descendants for each list and content
+block. Every corpus page is cleaned by both; the outputs have to be identical.
+Runs offline on benchmarks/pages, from backend/:
+
+    python -m benchmarks.interactive_marking
+    python -m benchmarks.interactive_marking small medium --repeat 3
+
+Exits non-zero when any page's output differs.
+"""
+import argparse
+import statistics
+import sys
+import time
+
+from benchmarks.corpus import load_corpus
+from src.agents.tools.browser_tools import FetchAndCleanHTMLTool, INNERMOST
+
+
+class _LegacyMarks(dict):
+    """The old set of innermost elements behind the id-keyed lookups of _walk_elements"""
+
+    def __init__(self, elements: dict, innermost: set):
+        super().__init__()
+        self.elements = elements
+        self.innermost = innermost
+
+    def get(self, key, default=None):
+        element = self.elements.get(key)
+        return INNERMOST if element is not None and element in self.innermost else default
+
+
+class LegacyMarkingCleaner(FetchAndCleanHTMLTool):
+    def _mark_interactive(self, body, interactive_elements: set):
+        # Find innermost interactive elements
+        innermost_interactive = set()
+        all_interactive = []
+
+        # Get traditional interactive elements
+        for tag_name in interactive_elements:
+            all_interactive.extend(body.find_all(tag_name))
+
+        # Also find elements with button-like classes
+        button_class_indicators = ['button', 'btn', 'clickable', 'link-button', 'ui button']
+        for indicator in button_class_indicators:
+            elements_with_class = body.find_all(class_=lambda x: x and indicator in ' '.join(x).lower())
+            all_interactive.extend(elements_with_class)
+
+        for element in all_interactive:
+            has_interactive_children = False
+            for child_tag in interactive_elements:
+                if element.find_all(child_tag):
+                    has_interactive_children = True
+                    break
+
+            if not has_interactive_children:
+                innermost_interactive.add(element)
+
+        return _LegacyMarks({id(element): element for element in body.find_all(True)}, innermost_interactive)
+
+    def _contains_innermost_interactive(self, element, interactive_marks) -> bool:
+        for interactive_el in interactive_marks.innermost:
+            if interactive_el in element.descendants:
+                return True
+        return False
+
+
+def _make(tool_class, parser_backend):
+    return tool_class.model_construct(name="bench", description="bench", parser_backend=parser_backend)
+
+
+def _median_ms(tool, html: str, positions: dict, repeat: int) -> float:
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        tool._clean_html(html, positions)
+        times.append(time.perf_counter() - start)
+    return statistics.median(times) * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("pages", nargs="*", help="Corpus pages to run (default: all)")
+    parser.add_argument("--repeat", type=int, default=1, help="Timed runs per page and version")
+    parser.add_argument("--parser-backend", default="html.parser")
+    args = parser.parse_args()
+
+    legacy = _make(LegacyMarkingCleaner, args.parser_backend)
+    current = _make(FetchAndCleanHTMLTool, args.parser_backend)
+    print(f"{'page':<12} {'legacy ms':>10} {'one-pass ms':>12} {'speedup':>8} {'output':>8}")
+
+    mismatches = []
+    for name, html, positions in load_corpus(args.pages):
+        same = legacy._clean_html(html, positions) == current._clean_html(html, positions)
+        if not same:
+            mismatches.append(name)
+        legacy_ms = _median_ms(legacy, html, positions, args.repeat)
+        current_ms = _median_ms(current, html, positions, args.repeat)
+        print(f"{name:<12} {legacy_ms:>10.1f} {current_ms:>12.1f} {legacy_ms / current_ms:>7.1f}x "
+              f"{'same' if same else 'DIFFERS':>8}")
+
+    if mismatches:
+        print(f"Output differs on {', '.join(mismatches)}")
+        sys.exit(1)
+    print("Identical output on every page.")
+
+
+if __name__ == "__main__":
+    main()
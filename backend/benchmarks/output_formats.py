@@ -0,0 +1,51 @@
+"""Token cost of FetchAndCleanHTMLTool's output formats on the fixture pages.
+
+Runs offline: fixture pages get synthetic positions from stamp_positions, go
+through the Python cleaner once, and the same item list is rendered as HTML
+(as returned before delta snapshots), HTML with data-cleaner-id (full
+snapshots today) and the compact element table. Run from backend/:
+
+    python -m benchmarks.output_formats --nodes 500 2000 10000 --seeds 3
+"""
+import argparse
+
+from benchmarks.fixtures import generate_page, stamp_positions
+from src.agents.tools.browser_tools import FetchAndCleanHTMLTool
+from src.agents.tools.element_map import render_element_map
+from src.agents.tools.token_budget import count_tokens, encoding_name
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--nodes", type=int, nargs="+", default=[500, 2000, 10000])
+    parser.add_argument("--seeds", type=int, default=3)
+    args = parser.parse_args()
+
+    tool = FetchAndCleanHTMLTool.model_construct(name="bench", description="bench", parser_backend="html.parser")
+    tokenizer = f"tiktoken {encoding_name()}" if encoding_name() else "length estimate (tiktoken encoding unavailable)"
+    print(f"Token counts via {tokenizer}")
+    print(f"{'nodes':>7} {'seed':>5} {'elements':>9} {'html':>8} {'html+ids':>9} {'table':>8} {'saved':>7}")
+
+    totals = {"html": 0, "html+ids": 0, "table": 0}
+    for nodes in args.nodes:
+        for seed in range(args.seeds):
+            html, positions = stamp_positions(generate_page(nodes, seed))
+            items = tool._cleaned_items(html, positions)[0]
+            counts = {
+                "html": count_tokens(tool._render_cleaned_html(items)),
+                "html+ids": count_tokens(tool._render_cleaned_html(items, with_ids=True)),
+                "table": count_tokens(render_element_map(items)),
+            }
+            for name, count in counts.items():
+                totals[name] += count
+            elements = sum(1 for item in items or [] if isinstance(item, dict) and item.get("type") == "interactive")
+            saved = 1 - counts["table"] / counts["html+ids"]
+            print(f"{nodes:>7} {seed:>5} {elements:>9} {counts['html']:>8} {counts['html+ids']:>9} "
+                  f"{counts['table']:>8} {saved:>6.0%}")
+
+    print(f"{'total':>23} {totals['html']:>8} {totals['html+ids']:>9} {totals['table']:>8} "
+          f"{1 - totals['table'] / totals['html+ids']:>6.0%}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,74 @@
+"""Parity and timing of the _clean_html parser backends (see src/agents/tools/html_parsers.py).
+
+Every page is cleaned with each installed backend; the item lists have to be
+identical to html.parser's. Pages are the benchmarks/pages corpus,
+EDGE_CASE_PAGES and generated pages. Runs offline, from backend/:
+
+    python -m benchmarks.parser_parity
+    python -m benchmarks.parser_parity --repeat 9 --nodes 500 5000
+
+Exits non-zero when a backend's items differ on any page. The timings are the
+median of --repeat runs; expect them to vary between runs on the larger pages.
+"""
+import argparse
+import statistics
+import sys
+import time
+
+from benchmarks.corpus import load_corpus
+from benchmarks.fixtures import EDGE_CASE_PAGES, generate_page, stamp_positions
+from src.agents.tools.browser_tools import FetchAndCleanHTMLTool
+from src.agents.tools.html_parsers import PARSER_BACKENDS
+
+
+def parity_pages(node_counts: list[int], seeds: int):
+    """Yield (name, html, element_positions) for every page the check runs on"""
+    yield from load_corpus()
+    for name, html in EDGE_CASE_PAGES.items():
+        yield name, *stamp_positions(html)
+    for nodes in node_counts:
+        for seed in range(seeds):
+            yield f"generated-{nodes}-{seed}", *stamp_positions(generate_page(nodes, seed))
+
+
+def _median_ms(tool, html: str, positions: dict, repeat: int) -> float:
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        tool._cleaned_items(html, positions)[0]
+        times.append(time.perf_counter() - start)
+    return statistics.median(times) * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--nodes", type=int, nargs="+", default=[300, 2000])
+    parser.add_argument("--seeds", type=int, default=3)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    backends = [name for name, backend in PARSER_BACKENDS.items() if backend.is_available()]
+    missing = sorted(set(PARSER_BACKENDS) - set(backends))
+    if missing:
+        print(f"Not installed, skipped: {', '.join(missing)}")
+    tools = {name: FetchAndCleanHTMLTool.model_construct(name="bench", description="bench", parser_backend=name)
+             for name in backends}
+    print(f"{'page':<22} " + " ".join(f"{name + ' ms':>14}" for name in backends) + f" {'items':>8}")
+
+    mismatches = []
+    for name, html, positions in parity_pages(args.nodes, args.seeds):
+        expected = tools["html.parser"]._cleaned_items(html, positions)[0]
+        differing = [backend for backend in backends
+                     if tools[backend]._cleaned_items(html, positions)[0] != expected]
+        mismatches.extend(f"{name} ({backend})" for backend in differing)
+        timings = " ".join(f"{_median_ms(tools[backend], html, positions, args.repeat):>14.1f}" for backend in backends)
+        print(f"{name:<22} {timings} {'DIFFER' if differing else 'same':>8}")
+
+    if mismatches:
+        print(f"Items differ from html.parser on {', '.join(mismatches)}")
+        sys.exit(1)
+    print("Every backend matches html.parser on every page.")
+
+
+if __name__ == "__main__":
+    main()
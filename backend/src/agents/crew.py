@@ -5,8 +5,14 @@ import json
 import yaml
 from crewai.project import CrewBase, agent, crew, task
 import logging
-from src.agents.tools.browser_tools import GoToPageTool,FetchAndCleanHTMLTool, GoBackTool, ReloadPageTool, GetCurrentURL, HoverElementTool, SelectDropdownTool, ScrollPageTool, DoubleClickTool, TextDeleteTool, TakeScreenshotTool, ClickElementTool, FillInputTool
-from src.agents.utils.browser_manager import BrowserManager
+from src.agents.tools.tool_registry import tool_registry
+from src.agents.tools.browser_tools import new_run_id
+from src.agents.utils.browser_manager import browser_manager
+from src.agents.utils.tab_manager import TabManager
+from src.agents.utils.config_cache import config_cache
+from src.agents.utils.action_trace import TraceRecorder, trace_store, page_fingerprint, fingerprints_match, result_failed
+from src.agents.utils.browser_loop import browser_loop
+from src.utils.connection_manager import manager
 from playwright.async_api import Page # pyright: ignore[reportMissingImports]
 from typing import List, Optional, Literal
 from enum import Enum
@@ -83,9 +89,14 @@ class PlannerOutputFormat(RootModel[Union[InitialPlanning, IterativePlanning]]):
 @CrewBase
 class MasterCrew:
 
-    def __init__(self, PAGE: Page):
+    def __init__(self, PAGE: Page, TABS: Optional[TabManager] = None, USER_ID: Optional[str] = None):
         self.page=PAGE
-        self.browser_manager = BrowserManager()
+        self.user_id = USER_ID
+        # Every tool follows the run's active tab
+        self.tabs = TABS or TabManager(PAGE.context, PAGE)
+        # Screenshots, extractions and page visits of this run all go under this id
+        self.run_id = new_run_id()
+        self.browser_manager = browser_manager
         self.execution_history=[] #track iterations
         #Used for cacheing
         self.crew_instance=None
@@ -93,86 +104,10 @@ class MasterCrew:
         self._executor_task=None
 
         try:
-            config_dir = os.path.join(os.path.dirname(__file__), "config")
-            with open(os.path.join(config_dir, "agents.yaml"), 'r') as file:
-                self.agents_config = yaml.safe_load(file)
-            with open(os.path.join(config_dir, "tasks.yaml"), 'r') as file:
-                self.tasks_config = yaml.safe_load(file)
-            with open(os.path.join(config_dir, "tools.yaml"), 'r') as file:
-                self.tools_config = yaml.safe_load(file)
-
-            self.goto_page_tool = GoToPageTool(
-                name=self.tools_config['goto_page_tool']['name'],
-                description=self.tools_config['goto_page_tool']['description'],
-                page=self.page
-            )
-
-            self.fetch_and_clean_html_tool = FetchAndCleanHTMLTool(
-                name=self.tools_config['fetch_and_clean_html_tool']['name'],
-                description=self.tools_config['fetch_and_clean_html_tool']['description'],
-                page=self.page
-            )
-            self.take_screenshot_tool = TakeScreenshotTool(
-                name=self.tools_config['take_screenshot_tool']['name'],
-                description=self.tools_config['take_screenshot_tool']['description'],
-                page=self.page
-            )
-
-            self.go_back_tool = GoBackTool(
-                name=self.tools_config['go_back_tool']['name'],
-                description=self.tools_config['go_back_tool']['description'],
-                page=self.page
-            )
-            self.reload_page_tool = ReloadPageTool(
-                name=self.tools_config['reload_page_tool']['name'],
-                description=self.tools_config['reload_page_tool']['description'],
-                page=self.page
-            )
-            self.get_current_url = GetCurrentURL(
-                name=self.tools_config['get_current_url']['name'],
-                description=self.tools_config['get_current_url']['description'],
-                page=self.page
-            )
-            self.hover_element_tool = HoverElementTool(
-                name=self.tools_config['hover_element_tool']['name'],
-                description=self.tools_config['hover_element_tool']['description'],
-                page=self.page
-            )
-            self.select_dropdown_tool = SelectDropdownTool(
-                name=self.tools_config['select_dropdown_tool']['name'],
-                description=self.tools_config['select_dropdown_tool']['description'],
-                page=self.page
-            )
-
-            self.scroll_page_tool = ScrollPageTool(
-                name=self.tools_config['scroll_page_tool']['name'],
-                description=self.tools_config['scroll_page_tool']['description'],
-                page=self.page
-            )
-            self.double_click_tool = DoubleClickTool(
-                name=self.tools_config['double_click_tool']['name'],
-                description=self.tools_config['double_click_tool']['description'],
-                page=self.page
-            )
-            self.text_delete_tool = TextDeleteTool(
-                name=self.tools_config['text_delete_tool']['name'],
-                description=self.tools_config['text_delete_tool']['description'],
-                page=self.page
-            )
-
-            self.click_element_tool = ClickElementTool(
-                name=self.tools_config['click_element_tool']['name'],
-                description=self.tools_config['click_element_tool']['description'],
-                page=self.page
-            )
-
-            self.fill_input_tool = FillInputTool(
-                name=self.tools_config['fill_input_tool']['name'],
-                description=self.tools_config['fill_input_tool']['description'],
-                page=self.page
-            )
-
-
+            # agents.yaml and tasks.yaml are loaded by CrewBase once this returns, see load_yaml below
+            self.tools = tool_registry.build(self.page, self.tabs, self.run_id)
+            for key, tool in self.tools.items():
+                setattr(self, key, tool)
         except (FileNotFoundError, yaml.YAMLError) as e:
             logger.error(f"Failed to load or parse configuration: {e}")
             raise
@@ -191,18 +126,7 @@ class MasterCrew:
     def executor_agent(self) -> Agent:
         return Agent(
             config=self.agents_config["executor"],
-            tools=[self.goto_page_tool,
-                   self.take_screenshot_tool,
-                   self.fetch_and_clean_html_tool,
-                   self.hover_element_tool,
-                   self.get_current_url,
-                   self.go_back_tool,
-                   self.reload_page_tool,self.select_dropdown_tool,
-                   self.scroll_page_tool,
-                   self.double_click_tool,
-                   self.text_delete_tool,
-                   self.click_element_tool,
-                   self.fill_input_tool],
+            tools=list(self.tools.values()),
             output_json=ExecutorOutputFormat,
             llm=llm,
             verbose=True,
@@ -314,6 +238,76 @@ class MasterCrew:
             return {"efficient": True, "warnings": []}
 
     def run_iterative_planner_executor(self, user_request, max_iterations=5):
+        """Replay the recorded trace of this request if there is one, else plan and execute.
+
+        With TRACE_MODE set, the tool calls of every authenticated user's run are
+        recorded, replayed ones included, and the trace of a completed run replaces the
+        stored one, so a trace that diverged and was finished by the agents is repaired
+        for next time.
+        """
+        recorder = TraceRecorder() if self.user_id and trace_store.recording else None
+        for tool in self.tools.values():
+            tool.recorder = recorder
+        try:
+            trace = trace_store.load(user_request, self.user_id)
+            if trace:
+                replayed = self._replay(trace, user_request)
+                if replayed:
+                    return replayed
+            result = self._plan_and_execute(user_request, max_iterations)
+            if recorder and result.get("status") == "COMPLETED":
+                trace_store.save(user_request, self.user_id, recorder)
+            return result
+        finally:
+            for tool in self.tools.values():
+                tool.recorder = None
+
+    def _replay(self, trace, user_request):
+        """Run the trace's tool calls without the LLM; None once the page or a result stops matching it"""
+        logger.info(f"⏩ Replaying {len(trace.steps)} recorded steps for '{trace.request}'")
+        manager.publish(f"⏩ Replaying {len(trace.steps)} recorded steps")
+        tools = {tool.name: tool for tool in self.tools.values()}
+        results = []
+        for number, step in enumerate(trace.steps, 1):
+            tool = tools.get(step.tool)
+            current = browser_loop.call(page_fingerprint(self.tabs.page))
+            if tool is None or not fingerprints_match(current, step.before):
+                return self._diverged(number, step, f"page is {current['location']}, expected {step.before['location']}"
+                                      if tool else f"tool '{step.tool}' no longer exists")
+            value = step.unchecked_value(user_request)
+            if value is not None:
+                return self._diverged(number, step, f"'{value}' is not in the request, it may not apply to this run")
+            result = tool.run(**step.args)
+            results.append(f"{step.tool}: {result}")
+            manager.publish(f"   Step {number}/{len(trace.steps)}: {step.tool} → {result}")
+            if result_failed(result) != result_failed(step.result):
+                return self._diverged(number, step, f"result was '{str(result)[:200]}', recorded '{step.result[:200]}'")
+            after = browser_loop.call(page_fingerprint(self.tabs.page))
+            if not fingerprints_match(after, step.after):
+                return self._diverged(number, step, f"page became {after['location']}, expected {step.after['location']}")
+
+        trace_store.count_replay(diverged=False)
+        logger.info(f"🎉 Replayed all {len(trace.steps)} steps")
+        manager.publish("All tasks completed successfully!")
+        return {
+            "status": "COMPLETED",
+            "iterations": 0,
+            "replayed": True,
+            "final_result": {
+                "status": "SUCCESS",
+                "step_description": f"Replayed {len(trace.steps)} recorded steps",
+                "result_summary": results[-1] if results else "",
+            },
+            "execution_history": results,
+        }
+
+    def _diverged(self, number, step, reason):
+        trace_store.count_replay(diverged=True)
+        logger.info(f"↩️ Replay diverged at step {number} ({step.tool}): {reason}; handing over to the agents")
+        manager.publish(f"↩️ Recorded steps no longer match the page at step {number}, planning from here")
+        return None
+
+    def _plan_and_execute(self, user_request, max_iterations=5):
 
         
         logger.info(f"🚀 Starting automation task: '{user_request}'")
@@ -393,3 +387,8 @@ class MasterCrew:
             "iterations": max_iterations,
             "execution_history": self.execution_history
         }
+
+
+# CrewBase reads agents.yaml and tasks.yaml from disk for every MasterCrew; serve them
+# from the process-wide cache instead (reparsed when a file changes)
+MasterCrew.load_yaml = staticmethod(config_cache.load)
@@ -1,6 +1,5 @@
 import time
 import logging
-import asyncio
 import json
 from crewai.utilities.events import (
     CrewKickoffStartedEvent,
@@ -30,7 +29,7 @@ class BasicListener(BaseEventListener):
         @crewai_event_bus.on(CrewKickoffStartedEvent)
         def on_crew_started(source, event):
             print("Inside Agent")
-            asyncio.create_task(manager.broadcast(f"👥 Crew started: {event.crew_name}"))
+            manager.publish(f"👥 Crew started: {event.crew_name}")
 
         # Agent finished something (planner or executor)
         @crewai_event_bus.on(AgentExecutionCompletedEvent)
@@ -50,58 +49,58 @@ class BasicListener(BaseEventListener):
             print("session_type:",session_type)
             # 1. INITIAL PLANNING
             if session_type == "INITIAL_PLANNING":
-                asyncio.create_task(manager.broadcast(f"Initial Planning for: {output.get('overall_task_name')}"))
-                asyncio.create_task(manager.broadcast(f"Thought: {output.get('master_thought')}"))
-                asyncio.create_task(manager.broadcast(f"Estimated steps: {output.get('estimated_steps')}"))
+                manager.publish(f"Initial Planning for: {output.get('overall_task_name')}")
+                manager.publish(f"Thought: {output.get('master_thought')}")
+                manager.publish(f"Estimated steps: {output.get('estimated_steps')}")
 
-                asyncio.create_task(manager.broadcast("📋 Planned Steps:"))
+                manager.publish("📋 Planned Steps:")
                 for step in output.get("steps", []):
-                    asyncio.create_task(manager.broadcast(f"   Step {step['step_id']}: {step['task_name']} → {step['status']}"))
+                    manager.publish(f"   Step {step['step_id']}: {step['task_name']} → {step['status']}")
 
                 current_task = output.get("current_task", {})
-                asyncio.create_task(manager.broadcast(f"First Task: {current_task.get('task_name')}"))
+                manager.publish(f"First Task: {current_task.get('task_name')}")
 
             # 2. ITERATIVE PLANNING
             elif session_type == "ITERATIVE_PLANNING":
-                asyncio.create_task(manager.broadcast(f"Iterative Planning update for: {output.get('overall_task_name')}"))
-                asyncio.create_task(manager.broadcast(f"Progress: {output.get('progress_analysis')}"))
-                asyncio.create_task(manager.broadcast(f"Reasoning: {output.get('adaptation_reasoning')}"))
+                manager.publish(f"Iterative Planning update for: {output.get('overall_task_name')}")
+                manager.publish(f"Progress: {output.get('progress_analysis')}")
+                manager.publish(f"Reasoning: {output.get('adaptation_reasoning')}")
 
-                asyncio.create_task(manager.broadcast("Updated Steps:"))
+                manager.publish("Updated Steps:")
                 for step in output.get("steps", []):
-                    asyncio.create_task(manager.broadcast(f"   Step {step['step_id']}: {step['task_name']} → {step['status']}"))
+                    manager.publish(f"   Step {step['step_id']}: {step['task_name']} → {step['status']}")
 
                 current_task = output.get("current_task", {})
-                asyncio.create_task(manager.broadcast(f"Next Task: {current_task.get('task_name')}"))
+                manager.publish(f"Next Task: {current_task.get('task_name')}")
 
                 if output.get("task_is_final", False):
-                    asyncio.create_task(manager.broadcast("All tasks completed successfully!"))
+                    manager.publish("All tasks completed successfully!")
 
             # 3. EXECUTOR RESULTS
             elif "status" in output and "result_summary" in output:
                 status_icon = "✅" if output.get("status") == "SUCCESS" else "❌"
-                asyncio.create_task(manager.broadcast(f"{status_icon} Executor finished: {output.get('step_description')}"))
-                asyncio.create_task(manager.broadcast(f"Result: {output.get('result_summary')}"))
+                manager.publish(f"{status_icon} Executor finished: {output.get('step_description')}")
+                manager.publish(f"Result: {output.get('result_summary')}")
 
                 if output.get("error_details"):
-                    asyncio.create_task(manager.broadcast(f"Error: {output.get('error_details')}"))
+                    manager.publish(f"Error: {output.get('error_details')}")
 
                 if output.get("suggestions_for_planner"):
-                    asyncio.create_task(manager.broadcast(f"Suggestions: {output.get('suggestions_for_planner')}"))
+                    manager.publish(f"Suggestions: {output.get('suggestions_for_planner')}")
 
                 if output.get("outputs_created"):
-                    asyncio.create_task(manager.broadcast(f"Outputs: {output.get('outputs_created')}"))
+                    manager.publish(f"Outputs: {output.get('outputs_created')}")
 
                 if output.get("next_step_context"):
-                    asyncio.create_task(manager.broadcast(f"Context for next step: {output.get('next_step_context')}"))
+                    manager.publish(f"Context for next step: {output.get('next_step_context')}")
 
         # Tool usage logs
         @crewai_event_bus.on(ToolUsageStartedEvent)
         def on_tool_started(source, event):
-            asyncio.create_task(manager.broadcast(f"Tool started: {event.tool_name} args={event.tool_args}"))
+            manager.publish(f"Tool started: {event.tool_name} args={event.tool_args}")
 
         @crewai_event_bus.on(ToolUsageFinishedEvent)
         def on_tool_completed(source, event):
-            asyncio.create_task(manager.broadcast(f"Tool finished: {event.tool_name}"))
+            manager.publish(f"Tool finished: {event.tool_name}")
 
 basic_listener = BasicListener()
@@ -1,10 +1,8 @@
 import asyncio
 from src.agents.crew import MasterCrew
-from src.agents.utils.browser_manager import BrowserManager
+from src.agents.utils.browser_manager import browser_manager
+from src.agents.utils.browser_loop import browser_loop
 from src.schema import schema
-import nest_asyncio
-
-nest_asyncio.apply()
 
 
 async def run(chatRequest:schema.ChatInput):
@@ -18,19 +16,17 @@ async def run(chatRequest:schema.ChatInput):
         "agents_list": agent_list,
     }
 
-    browser_manager = BrowserManager()
-    
-    try:
-        page = await browser_manager.start()
-        my_crew = MasterCrew(PAGE=page)
-        
-        result=my_crew.run_iterative_planner_executor(
-            user_request=inputs["user_request"])
+    # The lease lives on the browser loop; the crew blocks for the whole run, so it gets a
+    # worker thread of its own and this loop keeps serving other requests meanwhile
+    async with browser_loop.bridge(browser_manager.lease(user_id=chatRequest.user_id)) as lease:
+        print(f"Leased browser context (waited {lease.wait_time:.2f}s)")
+        result = await asyncio.to_thread(_run_crew, lease.page, inputs["user_request"], chatRequest.user_id)
         return  result
-        
-    finally:
-        print("Closing browser...")
-        await browser_manager.close()
+
+
+def _run_crew(page, user_request: str, user_id: str | None = None):
+    my_crew = MasterCrew(PAGE=page, USER_ID=user_id)
+    return my_crew.run_iterative_planner_executor(user_request=user_request)
 
 if __name__ == "__main__":
     asyncio.run(run())
\ No newline at end of file
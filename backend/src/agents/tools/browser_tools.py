@@ -1,239 +1,400 @@
 from crewai.tools import BaseTool
-from pydantic import BaseModel, Field
+from pydantic import BaseModel, Field, PrivateAttr
 from playwright.async_api import Page, Error as PlaywrightError
-from bs4 import BeautifulSoup, NavigableString, Comment
+from bs4 import NavigableString, Comment, Tag
+from collections import Counter
+import asyncio
+import json
+import math
+import os
 import re
-from typing import Dict, List, Optional
+import time
+import uuid
+from typing import Callable, Dict, Iterable, Iterator, List, Literal, Optional, Tuple
+from src.agents.tools.page_scripts import (
+    INTERACTIVE_ELEMENTS, CONTENT_ELEMENTS, LIST_ELEMENTS, INTERACTIVE_ATTRIBUTES, UNWANTED_TAGS,
+    ELEMENT_POSITIONS_JS, DISTILL_DOM_JS, OBSERVE_MUTATIONS_JS, DOM_FINGERPRINT_JS, VIEWPORT_JS, SCROLL_UNTIL_JS,
+    DETECT_ROWS_JS, EXTRACT_ROWS_JS, PAGE_TEXT_JS,
+)
+from src.agents.tools.html_parsers import get_parser_backend
+from src.agents.tools.snapshot_cache import snapshot_cache
+from src.agents.tools.token_budget import count_tokens
+from src.agents.tools.element_map import render_element_map, element_row, outline_line, element_number
+from src.agents.tools.element_registry import element_registry, StaleElementError
+from src.agents.tools.page_readiness import page_readiness, ReadinessStrategy
+from src.agents.utils.screenshot_pipeline import screenshot_pipeline
+from src.agents.utils.browser_loop import browser_loop
+from src.agents.utils.tab_manager import TabManager
+from src.agents.utils.action_trace import TraceRecorder
 
-class GoToPageSchema(BaseModel):
+# Marks produced by FetchAndCleanHTMLTool._mark_interactive
+INNERMOST = "innermost"
+CONTAINS_INNERMOST = "contains_innermost"
+
+WAIT_STRATEGY_DESCRIPTION = ("When the page counts as ready: 'domcontentloaded', 'network-quiet', 'dom-stable', "
+                             "'selector' (with wait_selector) or 'load'. Defaults to the configured strategy for the site.")
+
+class PageReadySchema(BaseModel):
+    wait_strategy: Optional[ReadinessStrategy] = Field(None, description=WAIT_STRATEGY_DESCRIPTION)
+    wait_selector: Optional[str] = Field(None, description="CSS selector to wait for with the 'selector' strategy.")
+
+class GoToPageSchema(PageReadySchema):
     url: str = Field(..., description="The full URL to navigate to (e.g., https://www.google.com).")
 
 class TakeScreenshotSchema(BaseModel):
     ss_name: str = Field(default="screenshot.png", description="The name of the screenshot file to be saved(e.g., notionloginpage.png).")
     full_page: bool = Field(default=False, description="Whether to capture the full page screenshot or just the viewport.")
+    image_format: Optional[Literal["jpeg", "webp", "png"]] = Field(None, description="Image format, defaults to the configured one (jpeg).")
+    quality: Optional[int] = Field(None, description="JPEG/WebP quality from 1 to 100.")
+    scale: Optional[float] = Field(None, description="Resize factor, e.g. 0.5 for half size.")
+
+ELEMENT_ID_DESCRIPTION = "The element id from the last Fetch and Clean HTML snapshot (data-cleaner-id, e.g. 12). Preferred over selector."
 
-class ClickElementSchema(BaseModel):
-    selector: str = Field(..., description="The CSS selector of the element to click.")
+class ClickElementSchema(PageReadySchema):
+    selector: Optional[str] = Field(None, description="The CSS selector of the element to click.")
+    element_id: Optional[str] = Field(None, description=ELEMENT_ID_DESCRIPTION)
     wait_for_navigation: bool = Field(False, description="Whether to wait for navigation after clicking the element.")
 
 class FillInputSchema(BaseModel):
-    selector: str = Field(..., description="The CSS selector of the input field to fill.")
+    selector: Optional[str] = Field(None, description="The CSS selector of the input field to fill.")
+    element_id: Optional[str] = Field(None, description=ELEMENT_ID_DESCRIPTION)
     value: str = Field(..., description="The value to fill into the input field.")
 
 class HoverElementInput(BaseModel):
-    selector: str
+    selector: Optional[str] = None
+    element_id: Optional[str] = Field(None, description=ELEMENT_ID_DESCRIPTION)
 
 class DoubleCLickSchema(BaseModel):
-    selector: str = Field(..., description="The CSS selector of the element to double-click.")
+    selector: Optional[str] = Field(None, description="The CSS selector of the element to double-click.")
+    element_id: Optional[str] = Field(None, description=ELEMENT_ID_DESCRIPTION)
 
 class ScrollPageSchema(BaseModel):
-    direction: str = Field(..., description="The direction to scroll the page ('up' or 'down').")
+    mode: Literal["viewport", "element", "bottom", "until"] = Field(
+        "viewport", description="'viewport' scrolls one screen, 'element' brings an element into view, 'bottom' scrolls "
+                                "to the end loading more content on the way, 'until' scrolls until min_items elements "
+                                "match item_selector or no new content appears.")
+    direction: Literal["up", "down"] = Field("down", description="For 'viewport': the direction to scroll ('up' or 'down').")
+    element_id: Optional[str] = Field(None, description="For 'element': " + ELEMENT_ID_DESCRIPTION)
+    selector: Optional[str] = Field(None, description="For 'element': CSS selector of the element, when there is no element id.")
+    item_selector: Optional[str] = Field(None, description="For 'until': CSS selector matching one result/item, e.g. 'article.post'.")
+    min_items: Optional[int] = Field(None, description="For 'until': stop once this many items match item_selector.")
+    idle_ms: Optional[int] = Field(None, description="For 'bottom' and 'until': stop after this long without new content.")
 
 class TextDeleteSchema(BaseModel):
     text: str = Field(..., description="The text to delete from the input field or textarea.")
 
 class FetchAndCleanHTMLSchema(BaseModel):
     url: str = Field(..., description="URL parameter (not used - tool works on current page content)")
+    full_snapshot: bool = Field(False, description="Return the whole page instead of only the changes since the last fetch.")
+    max_tokens: Optional[int] = Field(None, description="Token budget for the output; elements nearest the viewport are kept first. Defaults to the tool's budget.")
+    cursor: Optional[int] = Field(None, description="Continuation cursor from a previous truncated output, returns the next part of the page.")
+    output_format: Optional[Literal["html", "table"]] = Field(None, description="'html' for cleaned HTML, 'table' for a compact numbered element table plus a text outline.")
 
 class SelectDropdownInput(BaseModel):
-    selector: str
+    selector: Optional[str] = None
+    element_id: Optional[str] = Field(None, description=ELEMENT_ID_DESCRIPTION)
     option_value: Optional[str] = None
     option_label: Optional[str] = None
     option_index: Optional[int] = None
 
+class BrowserAction(BaseModel):
+    action: Literal["fill", "click", "select", "press", "wait"] = Field(..., description="What to do: fill, click, select, press or wait.")
+    element_id: Optional[str] = Field(None, description=ELEMENT_ID_DESCRIPTION)
+    selector: Optional[str] = Field(None, description="CSS selector of the target, when there is no element id.")
+    value: Optional[str] = Field(None, description="Text for fill, option value for select, key for press (e.g. 'Enter', 'Tab').")
+    option_label: Optional[str] = Field(None, description="Option label for select.")
+    option_index: Optional[int] = Field(None, description="Option index for select.")
+    timeout_ms: Optional[int] = Field(None, description="For wait: how long to pause, or how long to wait for the target to appear if one is given.")
+
+class BatchActionsSchema(BaseModel):
+    actions: List[BrowserAction] = Field(..., description="Actions to run in order; the batch stops at the first one that fails.")
+
+class ExtractDataSchema(BaseModel):
+    row_selector: Optional[str] = Field(None, description="CSS selector matching one element per row or item (e.g. 'table#prices tbody tr', 'div.product'). Leave empty to pick the largest table or repeated list on the page.")
+    fields: Optional[Dict[str, str]] = Field(None, description="Output column -> CSS selector inside the row, with @attr to read an attribute and '.' for the row itself, e.g. {\"title\": \"h2\", \"url\": \"a@href\", \"price\": \".price\"}. Defaults to the detected columns, or the row's text and link.")
+    max_rows: Optional[int] = Field(None, description="Stop after this many rows.")
+    name: Optional[str] = Field(None, description="Name of the output file, e.g. 'products'.")
+
+class ManageTabsSchema(BaseModel):
+    action: Literal["open", "switch", "close", "list"] = Field("list", description="open (and switch to) a new tab, switch to a tab, close a tab, or list the open tabs.")
+    tab: Optional[str] = Field(None, description="Tab name, e.g. 'amazon'. The first tab is 'main'.")
+    url: Optional[str] = Field(None, description="For open: the URL to load in the new tab.")
+
+class PageVisit(PageReadySchema):
+    url: str = Field(..., description="The full URL to visit.")
+    tab: Optional[str] = Field(None, description="Name for the page's tab, e.g. 'amazon'.")
+    row_selector: Optional[str] = Field(None, description="Extract rows matching this selector to a JSONL file, as Extract Data does.")
+    fields: Optional[Dict[str, str]] = Field(None, description="Field map for the extracted rows, as in Extract Data. Setting only fields detects the rows.")
+    max_rows: Optional[int] = Field(None, description="Stop after this many rows.")
+
+class VisitPagesSchema(BaseModel):
+    pages: List[PageVisit] = Field(..., description="Pages to visit at the same time, each in its own tab.")
+    keep_open: bool = Field(False, description="Keep the tabs open afterwards to keep working in them with Manage Tabs.")
+
 class EmptySchema(BaseModel):
     pass  
 
-class TakeScreenshotTool(BaseTool):
+def new_run_id() -> str:
+    """Directory name for the files a tool writes during one crew run"""
+    return f"{time.strftime('%Y%m%d-%H%M%S')}-{uuid.uuid4().hex[:8]}"
+
+
+class BrowserTool(BaseTool):
+    """Base for the tools that drive the page.
+
+    crewAI calls _run synchronously on the crew's thread; the tool's own _arun
+    coroutine is handed to the browser loop, where the page lives. With tabs set,
+    the tool acts on whichever tab is active; with a recorder, the call is added
+    to the run's action trace.
+    """
+    tabs: Optional[TabManager] = None
+    recorder: Optional[TraceRecorder] = None
+
+    def _run(self, *args, **kwargs) -> str:
+        if self.tabs is not None:
+            self.page = self.tabs.page
+        if self.recorder is not None:
+            return browser_loop.call(self.recorder.record(self, args, kwargs, self._arun(*args, **kwargs)))
+        return browser_loop.call(self._arun(*args, **kwargs))
+
+class TakeScreenshotTool(BrowserTool):
     name: str
     description: str
     args_schema: type[BaseModel] = TakeScreenshotSchema
     page: Page
+    # Screenshots of one crew run go to their own directory, see screenshot_pipeline
+    run_id: str = Field(default_factory=new_run_id)
 
-    async def _run(self, ss_name: str, full_page: bool) -> str:
+    async def _arun(self, ss_name: str = "screenshot.png", full_page: bool = False, image_format: Optional[str] = None,
+                   quality: Optional[int] = None, scale: Optional[float] = None) -> str:
         try:
-            screenshot_options = {
-                "full_page": full_page,
-                "path": ss_name if ss_name.endswith('.png') else f"{ss_name}.png"
-            }
-            screenshot_bytes = await self.page.screenshot(**screenshot_options)
-            # base64_image = base64.b64encode(screenshot_bytes).decode('utf-8')
-            # return f"""Image: data:image/png;base64,{base64_image}
-            # The screenshot shows the current state of the webpage. You can now:
-            # - Analyze the visual content and layout
-            # - Identify buttons, links, forms, and interactive elements
-            # - Read text content and navigation menus
-            # - Determine the next action to take
-            # - Locate specific elements for clicking or interaction"""
+            shot = await screenshot_pipeline.capture(self.page, self.run_id, ss_name, full_page,
+                                                     image_format, quality, scale)
+            size = f"{shot.width}x{shot.height} {shot.format}"
+            if shot.reused:
+                return (f"The page looks exactly as in an earlier screenshot, reusing {shot.handle} "
+                        f"({size}; capture {shot.capture_ms:.0f} ms, no re-encode).")
+            return (f"Screenshot '{ss_name}' saved as {shot.handle} ({size}, {shot.bytes / 1024:.1f} KB from a "
+                    f"{shot.raw_bytes / 1024:.1f} KB PNG; capture {shot.capture_ms:.0f} ms, encode {shot.encode_ms:.0f} ms).")
+        except ValueError as e:
+            return f"{e}"
         except PlaywrightError as e:
             return f"Failed to take screenshot due to browser error: {e}"
         except Exception as e:
             return f"An unexpected error occurred while taking screenshot: {e}"
 
-class HoverElementInput(BaseModel):
-    selector: str
+def _by_id(element_id: Optional[str]) -> bool:
+    return element_id is not None and bool(str(element_id).strip())
 
-class SelectDropdownInput(BaseModel):
-    selector: str
-    option_value: Optional[str] = None
-    option_label: Optional[str] = None
-    option_index: Optional[int] = None
+async def resolve_element(page: Page, selector: Optional[str], element_id: Optional[str]):
+    """Element handle and a description of the target, from a snapshot element id or a CSS selector.
 
-class FetchAndCleanHTMLSchema(BaseModel):
-    url: str = Field(..., description="URL parameter (not used - tool works on current page content)")
-class GoToPageTool(BaseTool):
+    Ids go through the element registry and raise StaleElementError when they no
+    longer resolve; a selector that matches nothing gives a None handle. Either
+    way the lookup is counted in the registry's miss rates.
+    """
+    if _by_id(element_id):
+        return await element_registry.resolve(page, element_id), f"element id {element_id}"
+    if not selector:
+        raise StaleElementError("Provide an element_id from the page snapshot or a CSS selector.")
+    element = await page.query_selector(selector)
+    element_registry.record_selector(element is not None)
+    return element, f"selector '{selector}'"
+
+def record_action_failure(element_id: Optional[str]):
+    """The target resolved but acting on it failed; counted as a miss of the id or the selector"""
+    element_registry.record_failure(_by_id(element_id))
+
+class GoToPageTool(BrowserTool):
     name: str 
     description: str
     args_schema: type[BaseModel] = GoToPageSchema
     page: Page
 
-    async def _run(self, url: str) -> str:
+    async def _arun(self, url: str, wait_strategy: Optional[str] = None, wait_selector: Optional[str] = None) -> str:
         try:
-            await self.page.goto(url, wait_until='load')
-            return f"Successfully navigated to {url}. The page content is now available."
+            readiness = await page_readiness.navigate(
+                self.page, lambda wait_until: self.page.goto(url, wait_until=wait_until), url, wait_strategy, wait_selector)
+            return f"Successfully navigated to {url}. The page content is now available ({readiness})."
+        except ValueError as e:
+            return f"{e}"
         except PlaywrightError as e:
            return f"Navigation failed due to browser error: {e}"
         except TimeoutError as e:
            return f"Navigation to {url} timed out: {e}"
         
-class ClickElementTool(BaseTool):
+class ClickElementTool(BrowserTool):
     name: str 
     description: str
     args_schema: type[BaseModel] = ClickElementSchema
     page: Page
 
-    async def _run(self, selector: str, wait_for_navigation: bool = False) -> str:
+    async def _arun(self, selector: Optional[str] = None, wait_for_navigation: bool = False,
+                   element_id: Optional[str] = None, wait_strategy: Optional[str] = None,
+                   wait_selector: Optional[str] = None) -> str:
         try:
-            element = await self.page.query_selector(selector)
+            element, target = await resolve_element(self.page, selector, element_id)
             if not element:
-                return f"Element with selector '{selector}' not found."
+                return f"Element with {target} not found."
             
-            await element.click()
-            if wait_for_navigation:
-                await self.page.wait_for_navigation(wait_until='load')
-            return f"Clicked on element with selector '{selector}'."
+            if not wait_for_navigation and not wait_strategy:
+                await element.click()
+                return f"Clicked on element with {target}."
+            readiness = await page_readiness.act(self.page, element.click, wait_strategy, wait_selector,
+                                                 expect_navigation=wait_for_navigation)
+            return f"Clicked on element with {target}; {readiness}."
+        except (StaleElementError, ValueError) as e:
+            return f"{e}"
         except PlaywrightError as e:
+            record_action_failure(element_id)
             return f"Click action failed due to browser error: {e}"
         except TimeoutError as e:
+            record_action_failure(element_id)
             return f"Click action timed out: {e}"
         
-class FillInputTool(BaseTool):
+class FillInputTool(BrowserTool):
     name: str 
     description: str
     args_schema: type[BaseModel] = FillInputSchema
     page: Page
 
-    async def _run(self, selector: str, value: str) -> str:
+    async def _arun(self, value: str, selector: Optional[str] = None, element_id: Optional[str] = None) -> str:
         try:
-            element = await self.page.query_selector(selector)
+            element, target = await resolve_element(self.page, selector, element_id)
             if not element:
-                return f"Input field with selector '{selector}' not found."
+                return f"Input field with {target} not found."
             
             await element.fill(value)
-            return f"Filled input field with selector '{selector}' with value '{value}'."
+            return f"Filled input field with {target} with value '{value}'."
+        except StaleElementError as e:
+            return f"{e}"
         except PlaywrightError as e:
+            record_action_failure(element_id)
             return f"Fill action failed due to browser error: {e}"
         except TimeoutError as e:
+            record_action_failure(element_id)
             return f"Fill action timed out: {e}"
         
-class GoBackTool(BaseTool):
+class GoBackTool(BrowserTool):
     name: str
     description: str
-    args_schema: type[BaseModel] = EmptySchema #no input is needed to go back
+    args_schema: type[BaseModel] = PageReadySchema
     page: Page
 
-    async def _run(self) -> str:
+    async def _arun(self, wait_strategy: Optional[str] = None, wait_selector: Optional[str] = None) -> str:
         try:
-            await self.page.go_back(wait_until='load')
-            return "Successfully went back to previous page."
+            readiness = await page_readiness.navigate(
+                self.page, lambda wait_until: self.page.go_back(wait_until=wait_until), self.page.url,
+                wait_strategy, wait_selector)
+            return f"Successfully went back to previous page ({readiness})."
+        except ValueError as e:
+            return f"{e}"
         except PlaywrightError as e:
             return f"Failed to go back due to error: {e}"
         except TimeoutError as e:
             return f"Going back timed out:{e}"
 
-class ReloadPageTool(BaseTool):
+class ReloadPageTool(BrowserTool):
     name: str
     description: str
-    args_schema: type[BaseModel] = EmptySchema #no input is needed for reload
+    args_schema: type[BaseModel] = PageReadySchema
     page: Page
 
-    async def _run(self) -> str:
+    async def _arun(self, wait_strategy: Optional[str] = None, wait_selector: Optional[str] = None) -> str:
         try:
-            await self.page.reload(wait_until= 'load')
-            return "Page reloaded successfully"
+            readiness = await page_readiness.navigate(
+                self.page, lambda wait_until: self.page.reload(wait_until=wait_until), self.page.url,
+                wait_strategy, wait_selector)
+            return f"Page reloaded successfully ({readiness})"
+        except ValueError as e:
+            return f"{e}"
         except PlaywrightError as e:
             return f"Reload failed due to browser error:{e}"
         except TimeoutError as e:
             return f"Page reload timed out: {e}"
         
 
-class GetCurrentURL(BaseTool):
+class GetCurrentURL(BrowserTool):
     name: str
     description: str
     args_schema: type[BaseModel]= EmptySchema #no input needed
     page: Page
 
-    async def _run(self) -> str:
+    async def _arun(self) -> str:
         try:
             return f"Current page URL: {self.page.url}"
         except PlaywrightError as e:
             return f"Failed to retrieve current URL due to broser error: {e}"        
         
 
-class HoverElementTool(BaseTool):
+class HoverElementTool(BrowserTool):
     name: str
     description: str
     args_schema: type[BaseModel]= HoverElementInput
     page: Page
 
-    async def _run(self, selector:str) -> str:
+    async def _arun(self, selector: Optional[str] = None, element_id: Optional[str] = None) -> str:
         try:
-            await self.page.hover(selector)
-            return f"Hovered over element: {selector}"
+            element, target = await resolve_element(self.page, selector, element_id)
+            if not element:
+                return f"Element with {target} not found."
+            await element.hover()
+            return f"Hovered over element with {target}."
+        except StaleElementError as e:
+            return f"{e}"
         except PlaywrightError as e:
+            record_action_failure(element_id)
             return f"Failed to hover due to browser error: {e}"
         except TimeoutError as e:
+            record_action_failure(element_id)
             return f"Hover action timed out: {e}"
 
 
-class SelectDropdownTool(BaseTool):
+class SelectDropdownTool(BrowserTool):
     name: str
     description: str
     args_schema: type[BaseModel] = SelectDropdownInput
     page: Page
 
-    async def _run(self, selector:str, option_value: Optional[str]= None, option_label: Optional[str]= None, option_index: Optional[int]= None) -> str:
+    async def _arun(self, selector: Optional[str] = None, option_value: Optional[str]= None, option_label: Optional[str]= None,
+                   option_index: Optional[int]= None, element_id: Optional[str] = None) -> str:
         try:
+            if not option_value and not option_label and option_index is None:
+                return "No valid option provided. Please specify value, label or index."
+            element, target = await resolve_element(self.page, selector, element_id)
+            if not element:
+                return f"Dropdown with {target} not found."
+
             if option_value:
-                await self.page.select_option(selector, value= option_value)
+                await element.select_option(value= option_value)
                 return f"Selected option with value: {option_value}"
             
             elif option_label:
-                await self.page.select_option(selector, label= option_label)
+                await element.select_option(label= option_label)
                 return f"Selected option with label: {option_label}"
             
-            elif option_index:
-                await self.page.select_option(selector, index= option_index)
-                return f"Selected option with index: {option_index}"
-            
             else:
-                return "No valid option provided. Please specify value, label or index."
-            
+                await element.select_option(index= option_index)
+                return f"Selected option with index: {option_index}"
 
+        except StaleElementError as e:
+            return f"{e}"
         except PlaywrightError as e:
+            record_action_failure(element_id)
             return f"Dropdown selection failed: {e}"
         except TimeoutError as e:
+            record_action_failure(element_id)
             return f"Timeout while selecting from dropdown: {e}"    
 
 
 
-class TextDeleteTool(BaseTool):
+class TextDeleteTool(BrowserTool):
     name: str
     description: str
     args_schema: type[BaseModel] = TextDeleteSchema
     page: Page
 
-    async def _run(self, text: str) -> str:
+    async def _arun(self, text: str) -> str:
         try:
             element = await self.page.query_selector('input[type="text"], textarea')
             await self.page.evaluate(f'element.innerText = element.innerText.replace("{text}", "");')
@@ -245,344 +406,973 @@ class TextDeleteTool(BaseTool):
 
 
 
-class DoubleClickTool(BaseTool):
+class DoubleClickTool(BrowserTool):
     name: str
     description: str
     args_schema: type[BaseModel] = DoubleCLickSchema
     page: Page
 
-    async def _run(self, selector: str) -> str:
+    async def _arun(self, selector: Optional[str] = None, element_id: Optional[str] = None) -> str:
         try:
-            element = await self.page.query_selector(selector)
+            element, target = await resolve_element(self.page, selector, element_id)
             if element:
                 await element.dblclick()
-                return f"Successfully double-clicked on the element with selector: {selector}"
+                return f"Successfully double-clicked on the element with {target}"
             else:
-                return f"No element found with selector: {selector}"
+                return f"No element found with {target}"
+        except StaleElementError as e:
+            return f"{e}"
         except PlaywrightError as e:
+            record_action_failure(element_id)
             return f"Failed to double-click due to browser error: {e}"
         except TimeoutError as e:
+            record_action_failure(element_id)
             return f"Double-click action timed out: {e}"
         
 
-class ScrollPageTool(BaseTool):
+class BatchActionsTool(BrowserTool):
+    name: str
+    description: str
+    args_schema: type[BaseModel] = BatchActionsSchema
+    page: Page
+    # Per-action timeout, so a missing element fails its action instead of stalling the batch
+    action_timeout_ms: int = Field(default_factory=lambda: int(os.getenv("BATCH_ACTION_TIMEOUT_MS", "10000")))
+
+    async def _arun(self, actions: List) -> str:
+        if not actions:
+            return "No actions provided."
+
+        lines = []
+        for index, action in enumerate(actions, 1):
+            if isinstance(action, dict):
+                action = BrowserAction.model_validate(action)
+            try:
+                lines.append(f"{index}. {await self._perform(action)}")
+            except (StaleElementError, ValueError) as e:
+                lines.append(f"{index}. {action.action} failed: {e}")
+            except (PlaywrightError, TimeoutError) as e:
+                if action.action != "wait":
+                    record_action_failure(action.element_id)
+                lines.append(f"{index}. {action.action} failed: {e}")
+            else:
+                continue
+
+            skipped = len(actions) - index
+            if skipped:
+                lines.append(f"Stopped at action {index}; the remaining {skipped} action(s) were not run.")
+            return f"Completed {index - 1} of {len(actions)} actions.\n" + "\n".join(lines)
+
+        return f"Completed all {len(actions)} actions.\n" + "\n".join(lines)
+
+    async def _perform(self, action: BrowserAction) -> str:
+        """Run one action, raising on failure, and describe what was done"""
+        timeout = self.action_timeout_ms
+        has_target = bool(action.selector or (action.element_id is not None and str(action.element_id).strip()))
+
+        if action.action == "wait":
+            if not has_target:
+                await self.page.wait_for_timeout(action.timeout_ms or 1000)
+                return f"waited {action.timeout_ms or 1000} ms"
+            if _by_id(action.element_id):
+                # The element may not be rendered yet, so wait on its stamp rather than resolving it once
+                cleaner_id = element_registry.normalize_id(action.element_id)
+                await self.page.wait_for_selector(f'[data-cleaner-id="{cleaner_id}"]', timeout=action.timeout_ms or timeout)
+                return f"element id {action.element_id} appeared"
+            await self.page.wait_for_selector(action.selector, timeout=action.timeout_ms or timeout)
+            return f"selector '{action.selector}' appeared"
+
+        if action.action == "press" and not has_target:
+            if not action.value:
+                raise ValueError("press needs a key in value")
+            await self.page.keyboard.press(action.value)
+            return f"pressed {action.value}"
+
+        element, target = await resolve_element(self.page, action.selector, action.element_id)
+        if not element:
+            raise ValueError(f"Element with {target} not found.")
+
+        if action.action == "fill":
+            await element.fill(action.value or "", timeout=timeout)
+            return f"filled {target} with '{action.value or ''}'"
+        if action.action == "click":
+            await element.click(timeout=timeout)
+            return f"clicked {target}"
+        if action.action == "press":
+            if not action.value:
+                raise ValueError("press needs a key in value")
+            await element.press(action.value, timeout=timeout)
+            return f"pressed {action.value} on {target}"
+
+        # select
+        if action.value is not None:
+            option = {"value": action.value}
+        elif action.option_label is not None:
+            option = {"label": action.option_label}
+        elif action.option_index is not None:
+            option = {"index": action.option_index}
+        else:
+            raise ValueError("select needs value, option_label or option_index")
+        await element.select_option(**option, timeout=timeout)
+        return f"selected {next(iter(option.values()))} in {target}"
+
+
+class ScrollPageTool(BrowserTool):
     name: str
     description: str
     args_schema: type[BaseModel] = ScrollPageSchema
     page: Page
 
-    async def _run(self, direction: str) -> str:
+    # Limits of a single 'bottom'/'until' call, all in the page's own loop
+    idle_ms: int = Field(default_factory=lambda: int(os.getenv("SCROLL_IDLE_MS", "1500")))
+    timeout_ms: int = Field(default_factory=lambda: int(os.getenv("SCROLL_TIMEOUT_MS", "30000")))
+    max_scrolls: int = Field(default_factory=lambda: int(os.getenv("SCROLL_MAX_STEPS", "200")))
+
+    async def _arun(self, mode: str = "viewport", direction: str = "down", element_id: Optional[str] = None,
+                    selector: Optional[str] = None, item_selector: Optional[str] = None,
+                    min_items: Optional[int] = None, idle_ms: Optional[int] = None) -> str:
+        start = time.perf_counter()
         try:
-            if direction not in ['up', 'down']:
-                return "Invalid scroll direction. Please use 'up' or 'down'."
+            if mode == "viewport":
+                if direction not in ['up', 'down']:
+                    return "Invalid scroll direction. Please use 'up' or 'down'."
+                await self.page.evaluate(f'window.scrollBy(0, {"" if direction == "down" else "-"}window.innerHeight * 0.9);')
+                viewport = await self.page.evaluate(VIEWPORT_JS)
+                return f"Successfully scrolled {direction} one screen, now at y={viewport['y']:.0f}."
 
-            await self.page.evaluate(f'window.scrollBy(0, {100 if direction == "down" else -100});')
-            return f"Successfully scrolled {direction}."
+            if mode == "element":
+                element, target = await resolve_element(self.page, selector, element_id)
+                if not element:
+                    return f"No element found with {target}."
+                await element.scroll_into_view_if_needed()
+                return f"Scrolled {target} into view in {(time.perf_counter() - start) * 1000:.0f} ms."
+
+            if mode == "until" and not (item_selector and min_items):
+                return "The 'until' mode needs an item_selector and min_items."
+            if mode not in ("bottom", "until"):
+                return f"Invalid scroll mode '{mode}'. Please use 'viewport', 'element', 'bottom' or 'until'."
+            result = await self.page.evaluate(SCROLL_UNTIL_JS, {
+                "itemSelector": item_selector if mode == "until" else None, "minItems": min_items,
+                "idleMs": idle_ms or self.idle_ms, "timeoutMs": self.timeout_ms,
+                "maxScrolls": self.max_scrolls, "pollMs": 100})
+            return self._describe(mode, result, item_selector, min_items)
+        except StaleElementError as e:
+            return f"{e}"
         except PlaywrightError as e:
             return f"Failed to scroll due to browser error: {e}"
         except TimeoutError as e:
             return f"Scroll action timed out: {e}"
 
+    def _describe(self, mode: str, result: Dict, item_selector: Optional[str], min_items: Optional[int]) -> str:
+        reasons = {
+            "target": "reached the target",
+            "idle": "no new content appeared",
+            "timeout": f"stopped after the {self.timeout_ms} ms limit",
+            "max_scrolls": f"stopped after {self.max_scrolls} scrolls",
+        }
+        summary = (f"Scrolled {result['scrolls']} time(s) in {result['elapsed_ms'] / 1000:.1f}s, "
+                   f"{reasons[result['reason']]}; page height {result['height']}px, at y={result['y']:.0f}.")
+        if mode == "until":
+            summary += (f" {result['items']} items matching '{item_selector}' loaded "
+                        f"({result['new_items']} new, {min_items} wanted).")
+        return summary
+
+
+def new_output_path(output_dir: str, run_id: str, name: Optional[str]) -> str:
+    """A new .jsonl file in the run's directory, never one written by an earlier call"""
+    run_dir = os.path.join(output_dir, run_id)
+    os.makedirs(run_dir, exist_ok=True)
+    stem = re.sub(r"[^\w-]+", "_", name or "extract").strip("_") or "extract"
+    path, n = os.path.join(run_dir, f"{stem}.jsonl"), 1
+    while os.path.exists(path):
+        n += 1
+        path = os.path.join(run_dir, f"{stem}-{n}.jsonl")
+    return path
+
+
+def _append_rows(path: str, rows: List[Dict]):
+    with open(path, "a", encoding="utf-8") as f:
+        f.writelines(json.dumps(row, ensure_ascii=False) + "\n" for row in rows)
+
 
-class FetchAndCleanHTMLTool(BaseTool):
+async def extract_rows(page: Page, path: str, row_selector: Optional[str], fields: Optional[Dict[str, str]],
+                       limit: int, chunk_rows: int) -> Optional[Dict]:
+    """Stream rows of the page into path as JSONL, chunk_rows at a time.
+
+    Without row_selector the largest table or repeated list is detected, and None
+    is returned when there is none. Returns the counts, the first row and a
+    description of where the rows came from.
+    """
+    source = f"rows matching '{row_selector}'"
+    if not row_selector:
+        detected = await page.evaluate(DETECT_ROWS_JS, {"minRows": 3, "key": uuid.uuid4().hex[:8]})
+        if not detected:
+            return None
+        row_selector = detected["rowSelector"]
+        fields = fields or detected["fields"]
+        source = f"{detected['description']} (row_selector '{row_selector}')"
+    fields = fields or {"text": ".", "link": "a[href]@href"}
+
+    written, total, sample = 0, 0, None
+    while written < limit:
+        chunk = await page.evaluate(EXTRACT_ROWS_JS, {
+            "rowSelector": row_selector, "fields": fields,
+            "offset": written, "limit": min(chunk_rows, limit - written)})
+        total = chunk["total"]
+        if not chunk["rows"]:
+            break
+        await asyncio.to_thread(_append_rows, path, chunk["rows"])
+        sample = sample or chunk["rows"][0]
+        written += len(chunk["rows"])
+        if written >= total:
+            break
+    return {"written": written, "total": total, "sample": sample, "source": source, "fields": list(fields)}
+
+
+def describe_extraction(extraction: Dict, path: str) -> str:
+    if not extraction["written"]:
+        return f"No rows found for {extraction['source']}."
+    summary = (f"Extracted {extraction['written']} rows with fields {', '.join(extraction['fields'])} "
+               f"from {extraction['source']} to {path}.")
+    if extraction["total"] > extraction["written"]:
+        summary += f" {extraction['total'] - extraction['written']} more rows matched; raise max_rows to get them."
+    return f"{summary} First row: {json.dumps(extraction['sample'], ensure_ascii=False)[:300]}"
+
+
+class ExtractDataTool(BrowserTool):
+    """Pulls rows out of the page into a JSONL file instead of the prompt.
+
+    Rows are read inside the page chunk_rows at a time and appended to
+    <output_dir>/<run_id>/<name>.jsonl as they come, so neither the browser call
+    nor the file write ever holds the whole result; the agent only gets the count,
+    the file and one sample row.
+    """
+    name: str
+    description: str
+    args_schema: type[BaseModel] = ExtractDataSchema
+    page: Page
+    output_dir: str = Field(default_factory=lambda: os.getenv("EXTRACT_DIR", "extractions"))
+    chunk_rows: int = Field(default_factory=lambda: int(os.getenv("EXTRACT_CHUNK_ROWS", "500")))
+    max_rows: int = Field(default_factory=lambda: int(os.getenv("EXTRACT_MAX_ROWS", "10000")))
+    run_id: str = Field(default_factory=new_run_id)
+
+    async def _arun(self, row_selector: Optional[str] = None, fields: Optional[Dict[str, str]] = None,
+                    max_rows: Optional[int] = None, name: Optional[str] = None) -> str:
+        start = time.perf_counter()
+        try:
+            path = new_output_path(self.output_dir, self.run_id, name)
+            extraction = await extract_rows(self.page, path, row_selector, fields,
+                                            min(max_rows or self.max_rows, self.max_rows), self.chunk_rows)
+            if extraction is None:
+                return "Found no table or repeated list on the page; pass a row_selector."
+            return f"{describe_extraction(extraction, path)} Took {time.perf_counter() - start:.1f}s."
+        except PlaywrightError as e:
+            return f"Failed to extract data due to browser error: {e}"
+        except TimeoutError as e:
+            return f"Data extraction timed out: {e}"
+        except OSError as e:
+            return f"Failed to write the extracted rows: {e}"
+
+
+class ManageTabsTool(BrowserTool):
+    name: str
+    description: str
+    args_schema: type[BaseModel] = ManageTabsSchema
+    page: Page
+
+    async def _arun(self, action: str = "list", tab: Optional[str] = None, url: Optional[str] = None) -> str:
+        if self.tabs is None:
+            return "Tabs are not available in this run."
+        try:
+            if action == "list":
+                return f"Open tabs: {self.tabs.describe()}"
+            if not tab:
+                return f"The '{action}' action needs a tab name."
+            if action == "open":
+                page = await self.tabs.open(tab)
+                self.tabs.switch(tab)
+                if not url:
+                    return f"Opened tab '{tab}' and switched to it."
+                readiness = await page_readiness.navigate(
+                    page, lambda wait_until: page.goto(url, wait_until=wait_until), url)
+                return f"Opened tab '{tab}' on {url} and switched to it ({readiness})."
+            if action == "switch":
+                page = self.tabs.switch(tab)
+                return f"Switched to tab '{tab}' ({page.url})."
+            if action == "close":
+                await self.tabs.close(tab)
+                return f"Closed tab '{tab}'. Open tabs: {self.tabs.describe()}"
+            return f"Unknown tab action '{action}'. Use open, switch, close or list."
+        except ValueError as e:
+            return f"{e}"
+        except PlaywrightError as e:
+            return f"Tab action failed due to browser error: {e}"
+        except TimeoutError as e:
+            return f"Tab action timed out: {e}"
+
+
+class VisitPagesTool(BrowserTool):
+    """Opens several URLs in their own tabs at once and reads or extracts from each.
+
+    The tabs run concurrently up to the run's TAB_CONCURRENCY; pages without a
+    row_selector come back as their title and the start of their visible text.
+    """
+    name: str
+    description: str
+    args_schema: type[BaseModel] = VisitPagesSchema
+    page: Page
+    output_dir: str = Field(default_factory=lambda: os.getenv("EXTRACT_DIR", "extractions"))
+    chunk_rows: int = Field(default_factory=lambda: int(os.getenv("EXTRACT_CHUNK_ROWS", "500")))
+    max_rows: int = Field(default_factory=lambda: int(os.getenv("EXTRACT_MAX_ROWS", "10000")))
+    text_chars: int = Field(default_factory=lambda: int(os.getenv("VISIT_TEXT_CHARS", "1500")))
+    run_id: str = Field(default_factory=new_run_id)
+
+    async def _arun(self, pages: List, keep_open: bool = False) -> str:
+        if self.tabs is None:
+            return "Tabs are not available in this run."
+        targets = [target if isinstance(target, PageVisit) else PageVisit(**target) for target in pages]
+        names = [target.tab or f"visit-{i + 1}" for i, target in enumerate(targets)]
+        if len(set(names)) != len(names):
+            return "Each page needs its own tab name."
+        new_tabs = len(set(names) - set(self.tabs.names()))
+        if keep_open and len(self.tabs.names()) + new_tabs > self.tabs.max_tabs:
+            return (f"Keeping {new_tabs} more tabs open would exceed the limit of {self.tabs.max_tabs}; "
+                    f"close some or visit without keep_open. Open tabs: {self.tabs.describe()}")
+
+        start = time.perf_counter()
+        results = await self.tabs.fan_out([
+            (name, lambda page, target=target, name=name: self._visit(page, target, name))
+            for name, target in zip(names, targets)], close_after=not keep_open)
+        elapsed = time.perf_counter() - start
+
+        lines = [f"Visited {len(targets)} page(s) in {elapsed:.1f}s, "
+                 f"{self.tabs.max_concurrency} at a time."]
+        for name, target, result in zip(names, targets, results):
+            if isinstance(result, ValueError):
+                result = f"{result}"
+            elif isinstance(result, (PlaywrightError, TimeoutError)):
+                result = f"failed: {result}"
+            elif isinstance(result, BaseException):
+                result = f"failed: {type(result).__name__}: {result}"
+            lines.append(f"[{name}] {target.url}: {result}")
+        if keep_open:
+            lines.append(f"Open tabs: {self.tabs.describe()}")
+        return "\n".join(lines)
+
+    async def _visit(self, page: Page, target: "PageVisit", name: str) -> str:
+        started = time.perf_counter()
+        readiness = await page_readiness.navigate(
+            page, lambda wait_until: page.goto(target.url, wait_until=wait_until), target.url,
+            target.wait_strategy, target.wait_selector)
+        if target.row_selector or target.fields:
+            path = new_output_path(self.output_dir, self.run_id, name)
+            extraction = await extract_rows(page, path, target.row_selector, target.fields,
+                                            min(target.max_rows or self.max_rows, self.max_rows), self.chunk_rows)
+            if extraction is None:
+                return f"found no table or repeated list ({readiness})."
+            return f"{describe_extraction(extraction, path)} ({readiness}, {time.perf_counter() - started:.1f}s)"
+        content = await page.evaluate(PAGE_TEXT_JS, self.text_chars)
+        return (f"\"{content['title']}\" ({readiness}, {time.perf_counter() - started:.1f}s): "
+                f"{content['text']}{'…' if content['truncated'] else ''}")
+
+
+class FetchAndCleanHTMLTool(BrowserTool):
     name: str 
     description: str 
     args_schema: type[BaseModel] = FetchAndCleanHTMLSchema
     page: Page
+    # "python" parses page.content() with BeautifulSoup, "browser" distills the DOM in-page
+    mode: Literal["python", "browser"] = Field(default_factory=lambda: os.getenv("HTML_CLEANER_MODE", "python"))
+    # Tree builder for the "python" mode, see html_parsers.PARSER_BACKENDS
+    parser_backend: str = Field(default_factory=lambda: os.getenv("HTML_PARSER_BACKEND", "html.parser"))
+    # Return only what changed since the previous fetch of the same document
+    delta_snapshots: bool = Field(default_factory=lambda: os.getenv("HTML_CLEANER_DELTAS", "true").lower() == "true")
+    # Default output budget in tokens, 0 for unbounded
+    max_tokens: int = Field(default_factory=lambda: int(os.getenv("HTML_CLEANER_MAX_TOKENS", "8000")))
+    # Default output format, see element_map for "table"
+    output_format: Literal["html", "table"] = Field(default_factory=lambda: os.getenv("HTML_CLEANER_FORMAT", "html"))
+    # Last snapshot of the page: url, items (complete unless the walk stopped at the budget),
+    # interactive items by data-cleaner-id, text item counts, and for a budget-trimmed
+    # output the viewport it was ordered by and the cursor of the part left out (trimmed, next_cursor)
+    _snapshot: Optional[Dict] = PrivateAttr(default=None)
+    # In-page timing reported by the last ELEMENT_POSITIONS_JS run
+    _positions_timing: Optional[Dict] = PrivateAttr(default=None)
 
-    async def _run(self, url: str) -> str:
+    async def _arun(self, url: str, full_snapshot: bool = False, max_tokens: Optional[int] = None,
+                   cursor: Optional[int] = None, output_format: Optional[str] = None) -> str:
         try:
+            budget = self.max_tokens if max_tokens is None else max_tokens
+            output_format = output_format or self.output_format
+            if not self.delta_snapshots:
+                result, complete = await self._extract_items(self._page_budget(budget, output_format, False, cursor))
+                self._snapshot = self._index_snapshot(result, complete)
+                return await self._render_page(result, output_format, False, budget, cursor)
+
+            try:
+                observed = await self.page.evaluate(OBSERVE_MUTATIONS_JS)
+            except Exception:
+                observed = {"fresh": True, "mutations": 0}
+            previous = self._snapshot
+            # A new document has no observer yet, so `fresh` means we navigated
+            same_document = (previous is not None and not observed["fresh"]
+                             and previous["page"] is self.page and previous["url"] == self.page.url)
+            unchanged = same_document and observed["mutations"] == 0
+            if unchanged and cursor and previous["complete"]:
+                # Continue paging through the snapshot the cursor was issued for
+                return await self._render_page(previous["items"], output_format, True, budget, cursor)
+            if unchanged and not full_snapshot and not cursor:
+                if not previous.get("trimmed"):
+                    return self._render_no_changes(output_format)
+                # The last output was trimmed around the viewport it had; after a scroll
+                # the items now nearest to it may be among those left out
+                if await self._get_viewport() == previous.get("viewport"):
+                    return self._render_no_changes(output_format, previous.get("next_cursor"))
+                if previous["complete"]:
+                    previous.pop("order", None)
+                    return await self._render_page(previous["items"], output_format, True, budget)
+
+            # A delta needs both snapshots whole; anything else is rendered as a page
+            diff = same_document and not full_snapshot and not cursor and previous["complete"]
+            page_budget = None if diff else self._page_budget(budget, output_format, True, cursor)
+            result, complete = await self._extract_items(page_budget)
+            self._snapshot = self._index_snapshot(result, complete)
+            if diff and result is not None:
+                delta = self._render_delta(previous, self._snapshot, result, output_format)
+                if delta is not None and (not budget or count_tokens(delta) <= budget):
+                    # What was left out of the previous page output is still left out
+                    self._snapshot.update(viewport=previous.get("viewport"), trimmed=previous.get("trimmed", False))
+                    return delta
+            return await self._render_page(result, output_format, True, budget, cursor)
+
+        except Exception as e:
+            return f"Failed to clean HTML from current page. Error: {e}"
+
+    def _page_budget(self, max_tokens: int, output_format: str, with_ids: bool,
+                     cursor: Optional[int]) -> Optional[Tuple[int, str, bool]]:
+        """What _extract_items may stop the walk at: only a first page has an order known up front"""
+        if not max_tokens or cursor or self.mode != "python":
+            return None
+        return max_tokens, output_format, with_ids
+
+    async def _extract_items(self, page_budget: Optional[Tuple[int, str, bool]] = None) -> Tuple[Optional[List], bool]:
+        """Run the configured cleaning mode and return its item list, cached by DOM fingerprint.
+
+        With page_budget (max_tokens, output_format, with_ids) the Python walk stops
+        as soon as the rest of the page can't reach the first budgeted page, see
+        _take_for_budget. The second value says whether the list is complete; only
+        complete lists are cached.
+        """
+        key = await self._snapshot_key()
+        if key:
+            hit, items = snapshot_cache.get(key)
+            if hit:
+                # The key covers the stamps and id counter, so re-stamping (cheap next to
+                # parsing) leaves the page with the ids the cached items refer to
+                await self._get_element_positions()
+                return items, True
+
+        complete = True
+        if self.mode == "browser":
+            items = await self.page.evaluate(DISTILL_DOM_JS)
+        else:
             # Get element positions from current page
             element_positions = await self._get_element_positions()
-            
+
             # Get HTML content from current page
             html_content = await self.page.content()
-            
-            # Clean HTML
-            cleaned_html = self._clean_html(html_content, element_positions)
-            
-            return cleaned_html
-            
-        except Exception as e:
-            return f"Failed to clean HTML from current page. Error: {e}"
+
+            viewport = await self._get_viewport() if page_budget else None
+            items, complete = self._cleaned_items(html_content, element_positions, viewport, page_budget)
+
+        if key and complete:
+            snapshot_cache.put(key, items)
+            # Extraction stamped new ids; keep the stamped state so an immediate re-fetch hits too
+            stamped_key = await self._snapshot_key()
+            if stamped_key and stamped_key != key:
+                snapshot_cache.put(stamped_key, items)
+        return items, complete
+
+    def _take_for_budget(self, items: Iterator, element_positions: Dict, viewport: Dict, max_tokens: int,
+                         output_format: str, with_ids: bool) -> Tuple[List, bool]:
+        """Consume the walk only as far as the first budgeted page can reach.
+
+        _render_budgeted fills the budget by viewport distance (in whole viewport
+        heights). element_positions is in document order, so the nearest distance
+        of anything not walked yet is known; once the items walked that are nearer
+        than that already overflow the budget, the rest of the page can't make it
+        onto the first page and is never cleaned. Returns the items and whether the
+        walk finished.
+        """
+        distance = self._viewport_distance(viewport)
+        ids = list(element_positions)
+        # ahead[i]: nearest distance among the positioned elements from the i-th on
+        ahead = [math.inf] * (len(ids) + 1)
+        for i in range(len(ids) - 1, -1, -1):
+            position = element_positions[ids[i]]
+            ahead[i] = min(ahead[i + 1], distance(position['y'], position['h']))
+        order = {cleaner_id: i for i, cleaner_id in enumerate(ids)}
+
+        spare = max_tokens - count_tokens(self._render_snapshot([], output_format, with_ids)) - 40
+        cost_by_distance = Counter()
+        # Text before the first interactive element takes that element's y, see _viewport_order
+        unplaced, last_y = 0, None
+        taken = []
+        for element in items:
+            interactive = isinstance(element, dict) and element.get('type') == 'interactive'
+            if interactive:
+                last_y = element['attributes'].get('y', last_y)
+                if unplaced and last_y is not None:
+                    cost_by_distance[distance(last_y, 0)] += unplaced
+                    unplaced = 0
+                nearest = ahead[order[element['cleaner_id']]] if element.get('cleaner_id') in order else 0
+                if sum(cost for d, cost in cost_by_distance.items() if d < nearest) > spare:
+                    return taken, False
+
+            line = self._render_line(element, output_format, with_ids)
+            if line:
+                cost = count_tokens(line) + 1
+                if output_format == "table" and interactive:
+                    cost += 3  # its [#N] marker in the text outline
+                if last_y is None:
+                    unplaced += cost
+                elif interactive:
+                    cost_by_distance[distance(last_y, element['attributes'].get('h', 0))] += cost
+                else:
+                    cost_by_distance[distance(last_y, 0)] += cost
+            taken.append(element)
+        return taken, True
+
+    async def _snapshot_key(self) -> Optional[tuple]:
+        if not snapshot_cache.enabled:
+            return None
+        try:
+            return self.page.url, await self.page.evaluate(DOM_FINGERPRINT_JS), self.mode
+        except Exception:
+            return None
 
     async def _get_element_positions(self) -> Dict[str, Dict]:
         """Get positions of interactive elements"""
-        js_code = """
-        () => {
-            const positions = {};
-            const interactiveSelectors = [
-                'a', 'button', 'input', 'textarea', 'select', 'form', 
-                'label', 'details', 'summary', 'dialog'
-            ];
-            
-            // Also check for elements with button-like classes
-            const buttonClassIndicators = ['button', 'btn', 'clickable', 'link-button'];
-            
-            let elementCounter = 0;
-            
-            // Get traditional interactive elements
-            interactiveSelectors.forEach(selector => {
-                const elements = document.querySelectorAll(selector);
-                elements.forEach((el) => {
-                    const rect = el.getBoundingClientRect();
-                    const style = window.getComputedStyle(el);
-                    if (rect.width > 0 && rect.height > 0 && style.opacity > 0 && style.visibility !== 'hidden') {
-                        const uniqueId = el.getAttribute('data-cleaner-id') || `cleaner-id-${elementCounter}`;
-                        if (!el.getAttribute('data-cleaner-id')) {
-                            el.setAttribute('data-cleaner-id', uniqueId);
-                        }
-                        
-                        positions[uniqueId] = {
-                            x: Math.round(rect.left + window.scrollX),
-                            y: Math.round(rect.top + window.scrollY),
-                            w: Math.round(rect.width),
-                            h: Math.round(rect.height),
-                            tag: el.tagName.toLowerCase(),
-                            text: el.textContent.trim().replace(/\\s+/g, ' '),
-                        };
-                        elementCounter++;
-                    }
-                });
-            });
-            
-            // Get elements with button-like classes
-            buttonClassIndicators.forEach(indicator => {
-                const elements = document.querySelectorAll(`[class*="${indicator}"]`);
-                elements.forEach((el) => {
-                    // Skip if already processed
-                    if (el.getAttribute('data-cleaner-id')) return;
-                    
-                    const rect = el.getBoundingClientRect();
-                    const style = window.getComputedStyle(el);
-                    if (rect.width > 0 && rect.height > 0 && style.opacity > 0 && style.visibility !== 'hidden') {
-                        const uniqueId = `cleaner-id-${elementCounter}`;
-                        el.setAttribute('data-cleaner-id', uniqueId);
-                        
-                        positions[uniqueId] = {
-                            x: Math.round(rect.left + window.scrollX),
-                            y: Math.round(rect.top + window.scrollY),
-                            w: Math.round(rect.width),
-                            h: Math.round(rect.height),
-                            tag: el.tagName.toLowerCase(),
-                            text: el.textContent.trim().replace(/\\s+/g, ' '),
-                        };
-                        elementCounter++;
-                    }
-                });
-            });
-            
-            return positions;
-        }
-        """
         
         try:
-            positions = await self.page.evaluate(js_code)
-            return positions
+            result = await self.page.evaluate(ELEMENT_POSITIONS_JS)
+            self._positions_timing = result['timing']
+            return result['positions']
         except Exception as e:
             return {}
 
     def _clean_html(self, html_content: str, element_positions: Dict) -> str:
         """Clean HTML content for LLM consumption"""
-        # Define element sets
-        interactive_elements = {
-            'a', 'button', 'input', 'textarea', 'select', 'option', 
-            'form', 'label', 'details', 'summary', 'dialog'
-        }
-        
-        content_elements = {
-            'h1', 'h2', 'h3', 'h4', 'h5', 'h6', 'p', 'span', 'div',
-            'article', 'section', 'main', 'aside', 'nav', 'header', 'footer',
-            'ul', 'ol', 'li', 'dl', 'dt', 'dd', 'blockquote', 'pre', 'code',
-            'strong', 'em', 'b', 'i', 'mark', 'small', 'sub', 'sup'
-        }
-        
-        list_elements = {'ul', 'ol', 'li'}
-        
-        interactive_attributes = {
-            'id', 'name', 'type', 'value', 'placeholder', 'href',
-            'action', 'method', 'for', 'role', 'aria-label', 'title',
-            'disabled', 'readonly', 'required', 'checked', 'selected', 'class'
-        }
+        return self._render_cleaned_html(self._cleaned_items(html_content, element_positions)[0])
 
-        soup = BeautifulSoup(html_content, 'html.parser')
-        
-        # Remove unwanted elements
-        unwanted_tags = [
-            'script', 'style', 'link', 'meta', 'noscript', 'iframe',
-            'embed', 'object', 'applet', 'canvas', 'svg', 'audio', 'video'
-        ]
-        
-        for tag_name in unwanted_tags:
-            for tag in soup.find_all(tag_name):
-                tag.decompose()
-        
-        # Handle images
-        for img_tag in soup.find_all('img'):
-            alt_text = img_tag.get('alt', '').strip()
-            if alt_text:
-                img_tag.insert_before(f"[Image: {alt_text}]")
-            img_tag.decompose()
-        
-        # Remove comments
-        for comment in soup.find_all(string=lambda text: isinstance(text, Comment)):
-            comment.extract()
+    def _cleaned_items(self, html_content: str, element_positions: Dict, viewport: Optional[Dict] = None,
+                       page_budget: Optional[Tuple[int, str, bool]] = None) -> Tuple[Optional[List], bool]:
+        """The cleaned item list (None if the document has no body) and whether it is complete.
+
+        With page_budget, see _page_budget, the walk stops once the first budgeted
+        page around viewport is settled (_take_for_budget).
+        """
+        items = self._iter_cleaned_items(html_content, element_positions)
+        if items is None:
+            return None, True
+        if page_budget:
+            return self._take_for_budget(items, element_positions, viewport, *page_budget)
+        return list(items), True
+
+    def _iter_cleaned_items(self, html_content: str, element_positions: Dict) -> Optional[Iterator]:
+        """Parse and prune the document, then lazily walk it; None if the document has no body"""
+        soup = get_parser_backend(self.parser_backend).parse(html_content)
+
+        # Remove unwanted elements and comments, replace images with their alt text.
+        # One walk that never descends into removed subtrees, instead of a find_all per tag.
+        unwanted_tags = set(UNWANTED_TAGS)
+        stack = [soup]
+        while stack:
+            for child in list(stack.pop().contents):
+                if isinstance(child, Comment):
+                    child.extract()
+                elif not isinstance(child, Tag):
+                    continue
+                elif child.name in unwanted_tags:
+                    child.decompose()
+                elif child.name == 'img':
+                    alt_text = child.get('alt', '').strip()
+                    if alt_text:
+                        child.insert_before(f"[Image: {alt_text}]")
+                    child.decompose()
+                else:
+                    stack.append(child)
 
         if not soup.body:
-            return "<!DOCTYPE html>\n<html>\n<head>\n<meta charset=\"UTF-8\">\n<title>Cleaned for LLM</title>\n</head>\n<body>\n</body>\n</html>"
-        
-        # Find innermost interactive elements
-        innermost_interactive = set()
-        all_interactive = []
-        
-        # Get traditional interactive elements
-        for tag_name in interactive_elements:
-            all_interactive.extend(soup.body.find_all(tag_name))
-        
-        # Also find elements with button-like classes
-        button_class_indicators = ['button', 'btn', 'clickable', 'link-button', 'ui button']
-        for indicator in button_class_indicators:
-            elements_with_class = soup.body.find_all(class_=lambda x: x and indicator in ' '.join(x).lower())
-            all_interactive.extend(elements_with_class)
-        
-        for element in all_interactive:
-            has_interactive_children = False
-            for child_tag in interactive_elements:
-                if element.find_all(child_tag):
-                    has_interactive_children = True
-                    break
-            
-            if not has_interactive_children:
-                innermost_interactive.add(element)
-
-        # Process elements
-        result = []
-        for element in soup.body.children:
-            self._process_element(element, result, element_positions, innermost_interactive, 
-                                interactive_elements, content_elements, list_elements, interactive_attributes)
-        
-        # Create final HTML
-        html_parts = [
-            '<!DOCTYPE html>',
-            '<html>',
-            '<head>',
-            '<meta charset="UTF-8">',
-            '<title>Cleaned for LLM</title>',
-            '</head>',
-            '<body>'
-        ]
+            return None
         
+        # Find innermost interactive elements and the elements that contain them
+        interactive_marks = self._mark_interactive(soup.body, INTERACTIVE_ELEMENTS)
+
+        return self._walk_elements(soup.body.children, element_positions, interactive_marks)
+
+    def _render_snapshot(self, result: Optional[List], output_format: str, with_ids: bool,
+                         note: Optional[str] = None) -> str:
+        """Render a full snapshot in the requested output format"""
+        if output_format == "table":
+            return render_element_map(result, note)
+        return self._render_cleaned_html(result, with_ids, note)
+
+    def _render_line(self, element, output_format: str, with_ids: bool) -> Optional[str]:
+        """The line one item contributes to a snapshot, used to cost it against the budget"""
+        if output_format == "table":
+            if isinstance(element, dict) and element.get('type') == 'interactive':
+                return element_row(element)
+            return outline_line(element)
+        return self._render_item(element, with_ids)
+
+    @staticmethod
+    def _wrap_note(note: str, output_format: str) -> str:
+        return f'Note: {note}' if output_format == "table" else f'<!-- {note} -->'
+
+    def _render_cleaned_html(self, result: Optional[Iterable], with_ids: bool = False, note: Optional[str] = None) -> str:
+        """Render the cleaned element list (from either cleaning mode) as HTML"""
+        if result is None:
+            return "<!DOCTYPE html>\n<html>\n<head>\n<meta charset=\"UTF-8\">\n<title>Cleaned for LLM</title>\n</head>\n<body>\n</body>\n</html>"
+        return '\n'.join(self._iter_html_lines(result, with_ids, note))
+
+    def _iter_html_lines(self, result: Iterable, with_ids: bool = False, note: Optional[str] = None) -> Iterator[str]:
+        """Lines of the cleaned HTML document, rendered as the items arrive"""
+        yield from ('<!DOCTYPE html>', '<html>', '<head>', '<meta charset="UTF-8">',
+                    '<title>Cleaned for LLM</title>', '</head>', '<body>')
         for element in result:
-            try:
-                if isinstance(element, dict) and element.get('type') == 'interactive':
-                    tag = element.get('tag', '')
-                    attrs = element.get('attributes', {})
-                    text = element.get('text', '')
-                    
-                    attr_string = ''
-                    for key, value in attrs.items():
-                        escaped_value = str(value).replace('"', '&quot;')
-                        attr_string += f' {key}="{escaped_value}"'
-                    
-                    if tag in ['input', 'img', 'br', 'hr']:
-                        html_parts.append(f'<{tag}{attr_string}/>')
-                    else:
-                        escaped_text = str(text).replace('<', '&lt;').replace('>', '&gt;')
-                        html_parts.append(f'<{tag}{attr_string}>{escaped_text}</{tag}>')
+            line = self._render_item(element, with_ids)
+            if line:
+                yield line
+        if note:
+            yield self._wrap_note(note, "html")
+        yield '</body>'
+        yield '</html>'
+
+    def _render_item(self, element, with_id: bool = False) -> Optional[str]:
+        """Render one cleaned item as a line of HTML, None if there is nothing to show"""
+        try:
+            if isinstance(element, dict) and element.get('type') == 'interactive':
+                tag = element.get('tag', '')
+                attrs = element.get('attributes', {})
+                text = element.get('text', '')
+                if with_id and element.get('cleaner_id'):
+                    attrs = {'data-cleaner-id': element['cleaner_id'], **attrs}
                 
-                elif isinstance(element, dict) and 'tag' in element and 'text' in element:
-                    tag = element['tag']
-                    text = element['text']
-                    if text.strip():
-                        escaped_text = text.replace('<', '&lt;').replace('>', '&gt;')
-                        html_parts.append(f'<{tag}>{escaped_text}</{tag}>')
+                attr_string = ''
+                for key, value in attrs.items():
+                    escaped_value = str(value).replace('"', '&quot;')
+                    attr_string += f' {key}="{escaped_value}"'
                 
-                elif isinstance(element, str):
-                    if element.strip():
-                        escaped_text = element.replace('<', '&lt;').replace('>', '&gt;')
-                        if len(escaped_text.strip()) < 10:
-                            html_parts.append(f'<span>{escaped_text}</span>')
-                        else:
-                            html_parts.append(f'<p>{escaped_text}</p>')
-            except Exception as e:
-                continue
-        
-        html_parts.extend(['</body>', '</html>'])
+                if tag in ['input', 'img', 'br', 'hr']:
+                    return f'<{tag}{attr_string}/>'
+                escaped_text = str(text).replace('<', '&lt;').replace('>', '&gt;')
+                return f'<{tag}{attr_string}>{escaped_text}</{tag}>'
+            
+            elif isinstance(element, dict) and 'tag' in element and 'text' in element:
+                tag = element['tag']
+                text = element['text']
+                if text.strip():
+                    escaped_text = text.replace('<', '&lt;').replace('>', '&gt;')
+                    return f'<{tag}>{escaped_text}</{tag}>'
+            
+            elif isinstance(element, str):
+                if element.strip():
+                    escaped_text = element.replace('<', '&lt;').replace('>', '&gt;')
+                    if len(escaped_text.strip()) < 10:
+                        return f'<span>{escaped_text}</span>'
+                    return f'<p>{escaped_text}</p>'
+        except Exception as e:
+            pass
+        return None
+
+    def _index_snapshot(self, result: Optional[List], complete: bool = True) -> Dict:
+        """Index a cleaned item list so the next fetch can be diffed against it"""
+        interactive = {}
+        text = Counter()
+        for element in result or []:
+            if isinstance(element, dict) and element.get('type') == 'interactive' and element.get('cleaner_id'):
+                interactive[element['cleaner_id']] = element
+            else:
+                line = self._render_item(element)
+                if line:
+                    text[line] += 1
+        element_registry.record_snapshot(self.page, interactive)
+        return {'url': self.page.url, 'page': self.page, 'items': result, 'interactive': interactive, 'text': text,
+                'complete': complete}
+
+    async def _render_page(self, result: Optional[List], output_format: str, with_ids: bool, max_tokens: int,
+                           cursor: Optional[int] = None) -> str:
+        """Render a full snapshot, trimmed to max_tokens with the elements nearest the viewport first"""
+        snapshot = self._snapshot if self._snapshot and self._snapshot['items'] is result else {}
+        complete = snapshot.get('complete', True)
+        if complete:
+            rendered = self._render_snapshot(result, output_format, with_ids)
+            if not max_tokens or result is None or (not cursor and count_tokens(rendered) <= max_tokens):
+                snapshot.update(trimmed=False, next_cursor=None)
+                return rendered
+
+        # Keep the priority order with the snapshot so every cursor pages through the same sequence
+        order = snapshot.get('order')
+        if order is None:
+            snapshot['viewport'] = await self._get_viewport()
+            order = self._viewport_order(result, snapshot['viewport'])
+            snapshot['order'] = order
+        rendered, next_cursor = self._render_budgeted(result, order, output_format, with_ids, max_tokens,
+                                                      cursor or 0, complete)
+        snapshot.update(trimmed=next_cursor is not None, next_cursor=next_cursor)
+        return rendered
+
+    async def _get_viewport(self) -> Dict:
+        try:
+            return await self.page.evaluate(VIEWPORT_JS)
+        except Exception:
+            size = self.page.viewport_size or {'width': 1280, 'height': 720}
+            return {'x': 0, 'y': 0, 'w': size['width'], 'h': size['height']}
+
+    def _viewport_order(self, result: List, viewport: Dict) -> List[int]:
+        """Indices of result by distance from the viewport, interactive elements first at equal distance"""
+        # Text items have no position of their own; give them the y of the closest interactive element before them
+        ys, last_y = [], None
+        for element in result:
+            if isinstance(element, dict) and element.get('type') == 'interactive':
+                last_y = element['attributes'].get('y', last_y)
+            ys.append(last_y)
+        first_y = next((y for y in ys if y is not None), 0)
+
+        distance = self._viewport_distance(viewport)
+
+        def priority(index: int):
+            element = result[index]
+            y = ys[index] if ys[index] is not None else first_y
+            interactive = isinstance(element, dict) and element.get('type') == 'interactive'
+            h = element['attributes'].get('h', 0) if interactive else 0
+            return distance(y, h), not interactive, index
+
+        return sorted(range(len(result)), key=priority)
+
+    @staticmethod
+    def _viewport_distance(viewport: Dict) -> Callable[[float, float], int]:
+        """Distance of a box (top y, height h) from the viewport, in whole viewport heights"""
+        top = viewport['y']
+        height = max(viewport['h'], 1)
+        bottom = top + height
+
+        def distance(y: float, h: float) -> int:
+            # Whole viewport heights away, so nearby text is not pushed behind far-off links
+            return math.ceil((top - (y + h) if y + h < top else max(y - bottom, 0)) / height)
+
+        return distance
+
+    def _render_budgeted(self, result: List, order: List[int], output_format: str, with_ids: bool,
+                         max_tokens: int, cursor: int, complete: bool = True) -> Tuple[str, Optional[int]]:
+        """Render the items of order[cursor:] that fit in max_tokens, in document order.
+
+        Returns the output and the cursor of the next part, None when nothing is
+        left. An incomplete result is a walk stopped by _take_for_budget: it holds
+        the first page but not the rest, so the note can't count what is left.
+        """
+        lines = {}
+        for index in order:
+            line = self._render_line(result[index], output_format, with_ids)
+            if line:
+                lines[index] = line
+        order = [index for index in order if index in lines]
+
+        used = count_tokens(self._render_snapshot([], output_format, with_ids)) + 40  # room for the continuation note
+        selected = set()
+        position = min(cursor, len(order))
+        while position < len(order):
+            element = result[order[position]]
+            cost = count_tokens(lines[order[position]]) + 1
+            if output_format == "table" and isinstance(element, dict) and element.get('type') == 'interactive':
+                cost += 3  # its [#N] marker in the text outline
+            if used + cost > max_tokens and selected:
+                break
+            selected.add(order[position])
+            used += cost
+            position += 1
+
+        note = None
+        remaining = order[position:]
+        if not complete:
+            note = (f'Showing {len(selected)} elements (closest to the viewport first); the rest of the page '
+                    f'was not processed. Call again with cursor={position} for the next part.')
+        elif remaining:
+            interactive = sum(1 for index in remaining
+                              if isinstance(result[index], dict) and result[index].get('type') == 'interactive')
+            note = (f'Showing {len(selected)} of {len(order)} elements (closest to the viewport first, '
+                    f'{cursor} shown before). {len(remaining)} more not shown: {interactive} interactive, '
+                    f'{len(remaining) - interactive} text. Call again with cursor={position} for the next part.')
+        elif cursor:
+            note = f'End of page: the last {len(selected)} of {len(order)} elements.'
+        next_cursor = position if remaining or not complete else None
+        return self._render_snapshot([result[index] for index in sorted(selected)], output_format, with_ids, note), next_cursor
+
+    @staticmethod
+    def _interactive_key(element: Dict):
+        # Layout shifts move everything below an opened dropdown; only report real changes
+        attrs = {k: v for k, v in element.get('attributes', {}).items() if k not in ('x', 'y', 'w', 'h')}
+        return element.get('tag'), element.get('text'), sorted(attrs.items())
+
+    def _render_delta(self, previous: Dict, current: Dict, result: List, output_format: str = "html") -> Optional[str]:
+        """Render the interactive elements and text added, changed or removed since `previous`,
+        None if a full snapshot would be as small"""
+        old, new = previous['interactive'], current['interactive']
+        added, changed = [], []
+        new_text = current['text'] - previous['text']
+        removed_text = sum((previous['text'] - current['text']).values())
+        for element in result:
+            if isinstance(element, dict) and element.get('type') == 'interactive' and element.get('cleaner_id'):
+                before = old.get(element['cleaner_id'])
+                if before is None:
+                    added.append(element)
+                elif self._interactive_key(before) != self._interactive_key(element):
+                    changed.append(element)
+            else:
+                line = self._render_item(element)
+                if line and new_text[line] > 0:
+                    new_text[line] -= 1
+                    added.append(element)
+        removed = [cleaner_id for cleaner_id in old if cleaner_id not in new]
+
+        if not (added or changed or removed or removed_text):
+            return self._render_no_changes(output_format)
+        # A delta touching most of the page is no cheaper than the page itself
+        if 2 * (len(added) + len(changed)) > len(result):
+            return None
+
+        summary = self._wrap_note(
+            f'Changes since the last snapshot of {current["url"]}: {len(added)} added, '
+            f'{len(changed)} changed, {len(removed) + removed_text} removed. '
+            'Elements not listed are unchanged. Pass full_snapshot=true for the whole page.',
+            output_format
+        )
+        if output_format == "table":
+            parts = [summary]
+            for title, items in (('Added', added), ('Changed', changed)):
+                if items:
+                    parts.append(f'{title}:')
+                    parts.extend(line for line in (self._render_line(e, "table", True) for e in items) if line)
+            if removed or removed_text:
+                numbers = ' '.join(element_number({'cleaner_id': cleaner_id}) for cleaner_id in removed)
+                parts.append(f'Removed: elements {numbers or "(none)"}; {removed_text} text blocks')
+            return '\n'.join(parts)
+
+        html_parts = [summary]
+        if added:
+            html_parts.append('<added>')
+            html_parts.extend(line for line in (self._render_item(e, with_id=True) for e in added) if line)
+            html_parts.append('</added>')
+        if changed:
+            html_parts.append('<changed>')
+            html_parts.extend(line for line in (self._render_item(e, with_id=True) for e in changed) if line)
+            html_parts.append('</changed>')
+        if removed or removed_text:
+            html_parts.append(f'<removed data-cleaner-ids="{" ".join(removed)}" text-blocks="{removed_text}"/>')
         return '\n'.join(html_parts)
 
-    def _process_element(self, element, result: List, element_positions: Dict, innermost_interactive: set,
-                        interactive_elements: set, content_elements: set, list_elements: set, interactive_attributes: set):
-        """Process a single element"""
-        # Handle text nodes
-        if isinstance(element, NavigableString):
-            text = str(element).strip()
-            if text:
-                result.append(text)
-            return
+    def _render_no_changes(self, output_format: str = "html", next_cursor: Optional[int] = None) -> str:
+        note = f'No changes on {self.page.url} since the last snapshot; it is still current. '
+        if next_cursor is not None:
+            note += f'Pass cursor={next_cursor} for the part left out of the last output, or '
+        else:
+            note += 'Pass '
+        return self._wrap_note(note + 'full_snapshot=true for the whole page.', output_format)
 
-        # Skip non-element nodes
-        if not hasattr(element, 'name') or not element.name:
-            return
+    def _mark_interactive(self, body, interactive_elements: set) -> Dict[int, str]:
+        """Mark innermost interactive elements and their ancestors in one bottom-up pass.
 
-        tag_name = element.name.lower()
-        
-        # If this is an innermost interactive element, process it
-        if element in innermost_interactive:
-            interactive_data = self._create_interactive_element(element, element_positions, interactive_attributes)
-            if interactive_data:
-                result.append(interactive_data)
-            return
-        
-        # If this is a non-innermost interactive element, skip it and process children
-        if tag_name in interactive_elements:
-            for child in element.children:
-                self._process_element(child, result, element_positions, innermost_interactive,
-                                    interactive_elements, content_elements, list_elements, interactive_attributes)
-            return
-        
-        # Handle list elements specially - merge if text-only
-        if tag_name in list_elements:
-            if not self._contains_innermost_interactive(element, innermost_interactive):
+        Returns a map of id(element) to INNERMOST for interactive elements with no
+        interactive descendants, or CONTAINS_INNERMOST for elements that have one.
+        """
+        marks = {}
+        has_interactive_descendant = set()
+        # Reversed document order visits every descendant before its ancestors
+        for element in reversed(body.find_all(True)):
+            key = id(element)
+            is_interactive = element.name in interactive_elements
+            if is_interactive and key not in has_interactive_descendant:
+                marks[key] = INNERMOST
+
+            parent_key = id(element.parent)
+            if is_interactive or key in has_interactive_descendant:
+                has_interactive_descendant.add(parent_key)
+            if key in marks:
+                marks[parent_key] = CONTAINS_INNERMOST
+        return marks
+
+    def _walk_elements(self, nodes: Iterable, element_positions: Dict,
+                       interactive_marks: Dict[int, str]) -> Iterator:
+        """Yield the cleaned items of nodes and their descendants in document order.
+
+        Keeps an explicit stack of child iterators rather than recursing, so deeply
+        nested documents cost stack entries instead of Python frames.
+        """
+        stack = [iter(nodes)]
+        while stack:
+            element = next(stack[-1], None)
+            if element is None:
+                stack.pop()
+                continue
+
+            # Handle text nodes
+            if isinstance(element, NavigableString):
+                text = str(element).strip()
+                if text:
+                    yield text
+                continue
+
+            # Skip non-element nodes
+            if not hasattr(element, 'name') or not element.name:
+                continue
+
+            tag_name = element.name.lower()
+
+            # If this is an innermost interactive element, emit it
+            if interactive_marks.get(id(element)) == INNERMOST:
+                interactive_data = self._create_interactive_element(element, element_positions, INTERACTIVE_ATTRIBUTES)
+                if interactive_data:
+                    yield interactive_data
+                continue
+
+            # A non-innermost interactive element only contributes its children
+            if tag_name in INTERACTIVE_ELEMENTS:
+                stack.append(iter(element.children))
+                continue
+
+            # Handle list elements specially - merge if text-only
+            if tag_name in LIST_ELEMENTS and not self._contains_innermost_interactive(element, interactive_marks):
                 list_text = self._extract_list_text(element)
                 if list_text:
-                    result.append({
+                    yield {
                         'tag': tag_name,
                         'text': list_text,
                         'attributes': {}
-                    })
-                return
-        
-        # Handle content elements
-        if tag_name in content_elements:
-            if not self._contains_innermost_interactive(element, innermost_interactive):
+                    }
+                continue
+
+            # Handle content elements without interactive descendants as one block of text
+            if tag_name in CONTENT_ELEMENTS and not self._contains_innermost_interactive(element, interactive_marks):
                 text_content = element.get_text(strip=True)
-                if text_content:
-                    if len(text_content) > 200 and tag_name == 'div':
-                        chunks = self._split_long_text(text_content)
-                        for chunk in chunks:
-                            if chunk.strip():
-                                result.append({
-                                    'tag': 'p',
-                                    'text': re.sub(r'\s+', ' ', chunk.strip()),
-                                    'attributes': {}
-                                })
-                    else:
-                        result.append({
-                            'tag': tag_name,
-                            'text': re.sub(r'\s+', ' ', text_content),
-                            'attributes': {}
-                        })
-                return
-            else:
-                for child in element.children:
-                    self._process_element(child, result, element_positions, innermost_interactive,
-                                        interactive_elements, content_elements, list_elements, interactive_attributes)
-                return
-        
-        # For other elements, just process children
-        for child in element.children:
-            self._process_element(child, result, element_positions, innermost_interactive,
-                                interactive_elements, content_elements, list_elements, interactive_attributes)
+                if not text_content:
+                    continue
+                if len(text_content) > 200 and tag_name == 'div':
+                    for chunk in self._split_long_text(text_content):
+                        if chunk.strip():
+                            yield {
+                                'tag': 'p',
+                                'text': re.sub(r'\s+', ' ', chunk.strip()),
+                                'attributes': {}
+                            }
+                else:
+                    yield {
+                        'tag': tag_name,
+                        'text': re.sub(r'\s+', ' ', text_content),
+                        'attributes': {}
+                    }
+                continue
+
+            # Containers with interactive descendants and everything else: walk the children
+            stack.append(iter(element.children))
 
     def _extract_list_text(self, element) -> str:
         """Extract and format text from list elements"""
@@ -637,12 +1427,9 @@ class FetchAndCleanHTMLTool(BaseTool):
         
         return final_chunks if final_chunks else [text]
 
-    def _contains_innermost_interactive(self, element, innermost_interactive: set) -> bool:
+    def _contains_innermost_interactive(self, element, interactive_marks: Dict[int, str]) -> bool:
         """Check if element contains any innermost interactive elements"""
-        for interactive_el in innermost_interactive:
-            if interactive_el in element.descendants:
-                return True
-        return False
+        return interactive_marks.get(id(element)) == CONTAINS_INNERMOST
 
     def _create_interactive_element(self, element, element_positions: Dict, interactive_attributes: set) -> Optional[Dict]:
         """Create a cleaned interactive element with position data"""
@@ -683,7 +1470,8 @@ class FetchAndCleanHTMLTool(BaseTool):
             'tag': tag_name,
             'attributes': attrs,
             'text': text_content,
-            'type': 'interactive'
+            'type': 'interactive',
+            'cleaner_id': cleaner_id
         }
 
 
@@ -0,0 +1,93 @@
+import re
+from typing import Dict, List, Optional
+
+# Compact "table" output of FetchAndCleanHTMLTool: one row per interactive element
+# plus a text outline, instead of pseudo-HTML with every attribute repeated.
+LABEL_LIMIT = 60
+VALUE_LIMIT = 60
+LABEL_ATTRIBUTES = ('aria-label', 'placeholder', 'title', 'value', 'name')
+KEY_ATTRIBUTES = ('type', 'name', 'id', 'href', 'placeholder', 'value', 'for', 'action', 'method')
+FLAG_ATTRIBUTES = ('disabled', 'readonly', 'required', 'checked', 'selected')
+HEADINGS = {'h1', 'h2', 'h3', 'h4', 'h5', 'h6'}
+LISTS = {'ul', 'ol', 'li'}
+
+ELEMENTS_HEADER = ('Elements (id | role | label | attributes | x,y,w,h). '
+                   'Target element N with element_id N, or the selector [data-cleaner-id="cleaner-id-N"].')
+OUTLINE_HEADER = 'Text outline ([#N] marks where elements appear):'
+
+
+def _short(text: str, limit: int) -> str:
+    text = re.sub(r'\s+', ' ', str(text)).strip().replace('|', '/')
+    return text if len(text) <= limit else text[:limit - 1] + '…'
+
+
+def element_number(item: Dict) -> str:
+    """The N of data-cleaner-id="cleaner-id-N", used as the row id"""
+    cleaner_id = item.get('cleaner_id') or ''
+    return cleaner_id.rsplit('-', 1)[-1] if cleaner_id else '?'
+
+
+def element_row(item: Dict) -> str:
+    attrs = item.get('attributes', {})
+    tag = item.get('tag', '')
+    role = f"{tag}:{attrs['role']}" if attrs.get('role') else tag
+
+    label_source = None
+    label = item.get('text', '')
+    if not label:
+        label_source = next((name for name in LABEL_ATTRIBUTES if attrs.get(name)), None)
+        label = attrs.get(label_source, '') if label_source else ''
+
+    key_attrs = []
+    for name in KEY_ATTRIBUTES:
+        value = attrs.get(name)
+        if value and name != label_source:
+            key_attrs.append(f'{name}={_short(value, VALUE_LIMIT)}')
+    key_attrs.extend(name for name in FLAG_ATTRIBUTES if name in attrs)
+
+    bbox = ','.join(str(attrs.get(key, '')) for key in ('x', 'y', 'w', 'h'))
+    return f"{element_number(item)} | {role} | {_short(label, LABEL_LIMIT)} | {' '.join(key_attrs)} | {bbox}"
+
+
+def outline_line(item) -> Optional[str]:
+    """One line of the text outline, None for items without text"""
+    if isinstance(item, str):
+        tag, text = '', item
+    else:
+        tag, text = item.get('tag', ''), item.get('text', '')
+    text = re.sub(r'\s+', ' ', text).strip()
+    if not text:
+        return None
+    if tag in HEADINGS:
+        return f"{'#' * int(tag[1])} {text}"
+    if tag in LISTS:
+        return f'- {text}'
+    return text
+
+
+def is_interactive(item) -> bool:
+    return isinstance(item, dict) and item.get('type') == 'interactive'
+
+
+def render_element_map(items: Optional[List], note: Optional[str] = None) -> str:
+    """Render a cleaned item list as an element table followed by the text outline"""
+    rows, outline, pending_refs = [], [], []
+    for item in items or []:
+        if is_interactive(item):
+            rows.append(element_row(item))
+            pending_refs.append(f'#{element_number(item)}')
+            continue
+        line = outline_line(item)
+        if not line:
+            continue
+        if pending_refs:
+            outline.append(f"[{' '.join(pending_refs)}]")
+            pending_refs = []
+        outline.append(line)
+    if pending_refs:
+        outline.append(f"[{' '.join(pending_refs)}]")
+
+    parts = [ELEMENTS_HEADER, *(rows or ['(none)']), '', OUTLINE_HEADER, *(outline or ['(none)'])]
+    if note:
+        parts.extend(['', f'Note: {note}'])
+    return '\n'.join(parts)
@@ -0,0 +1,109 @@
+from playwright.async_api import Page, ElementHandle
+from typing import Dict, Optional
+import re
+import weakref
+
+# Checked on every id lookup: the element must still be in the document and be the same kind of element
+_HANDLE_STATE_JS = "el => el.isConnected ? el.localName : null"
+
+
+class StaleElementError(Exception):
+    """The id is not in the last snapshot, or its element has left the page since"""
+
+
+class ElementRegistry:
+    """Resolves element ids from the last FetchAndCleanHTMLTool snapshot of each page.
+
+    Every snapshot records the data-cleaner-id and tag of the elements it showed;
+    handles are looked up lazily by that attribute and kept per page until the page
+    navigates. A handle that got detached, or an element of a different tag, is
+    reported as stale instead of acting on whatever the selector now finds.
+    Selector and id lookups are counted so their miss rates can be compared.
+    """
+
+    def __init__(self):
+        self._pages: "weakref.WeakKeyDictionary[Page, Dict]" = weakref.WeakKeyDictionary()
+        self._metrics = {
+            "selector_attempts": 0,
+            "selector_misses": 0,
+            "id_attempts": 0,
+            "id_misses": 0,
+            "stale_handles": 0,
+        }
+
+    @staticmethod
+    def normalize_id(element_id) -> str:
+        """Accept 12, "12", "#12" or "cleaner-id-12" """
+        match = re.fullmatch(r'\s*#?(?:cleaner-id-)?(\d+)\s*', str(element_id))
+        if not match:
+            raise StaleElementError(f"'{element_id}' is not an element id from the page snapshot.")
+        return f"cleaner-id-{match.group(1)}"
+
+    def record_snapshot(self, page: Page, elements: Dict[str, Dict]):
+        """Remember the elements (cleaner_id -> item) shown by the latest snapshot of page"""
+        entry = self._pages.get(page)
+        if entry is None or entry["url"] != page.url:
+            entry = {"url": page.url, "tags": {}, "handles": {}}
+            self._pages[page] = entry
+        entry["tags"] = {cleaner_id: item.get("tag") for cleaner_id, item in elements.items()}
+
+    async def resolve(self, page: Page, element_id) -> ElementHandle:
+        self._metrics["id_attempts"] += 1
+        try:
+            return await self._resolve(page, self.normalize_id(element_id))
+        except StaleElementError:
+            self._metrics["id_misses"] += 1
+            raise
+
+    async def _resolve(self, page: Page, cleaner_id: str) -> ElementHandle:
+        entry = self._pages.get(page)
+        if entry is None or cleaner_id not in entry["tags"]:
+            raise StaleElementError(f"Element {cleaner_id} is not in the last page snapshot. Fetch the page again.")
+        if entry["url"] != page.url:
+            self._metrics["stale_handles"] += 1
+            raise StaleElementError(f"Element {cleaner_id} is stale: the page navigated to {page.url} "
+                                    "since the last snapshot. Fetch the page again.")
+
+        expected_tag = entry["tags"][cleaner_id]
+        handle = entry["handles"].get(cleaner_id)
+        if handle is not None and await self._handle_tag(handle) != expected_tag:
+            # Detached by a re-render; the attribute lookup below finds a replacement if there is one
+            entry["handles"].pop(cleaner_id, None)
+            handle = None
+        if handle is None:
+            handle = await page.query_selector(f'[data-cleaner-id="{cleaner_id}"]')
+            if handle is None or await self._handle_tag(handle) != expected_tag:
+                self._metrics["stale_handles"] += 1
+                raise StaleElementError(f"Element {cleaner_id} is stale: it is no longer on the page. "
+                                        "Fetch the page again.")
+            entry["handles"][cleaner_id] = handle
+        return handle
+
+    @staticmethod
+    async def _handle_tag(handle: ElementHandle) -> Optional[str]:
+        try:
+            return await handle.evaluate(_HANDLE_STATE_JS)
+        except Exception:
+            return None
+
+    def record_selector(self, found: bool):
+        self._metrics["selector_attempts"] += 1
+        if not found:
+            self._metrics["selector_misses"] += 1
+
+    def record_failure(self, by_id: bool):
+        """The target resolved but the action on it still failed"""
+        self._metrics["id_misses" if by_id else "selector_misses"] += 1
+
+    def stats(self) -> dict:
+        selector_attempts = self._metrics["selector_attempts"]
+        id_attempts = self._metrics["id_attempts"]
+        return {
+            **self._metrics,
+            "selector_miss_rate": self._metrics["selector_misses"] / selector_attempts if selector_attempts else 0.0,
+            "id_miss_rate": self._metrics["id_misses"] / id_attempts if id_attempts else 0.0,
+            "pages": len(self._pages),
+        }
+
+
+element_registry = ElementRegistry()
@@ -0,0 +1,50 @@
+from bs4 import BeautifulSoup
+import logging
+import os
+
+logger = logging.getLogger(__name__)
+
+
+class ParserBackend:
+    """Builds the BeautifulSoup tree that FetchAndCleanHTMLTool._clean_html walks"""
+    name = "html.parser"
+
+    def is_available(self) -> bool:
+        return True
+
+    def parse(self, html_content: str) -> BeautifulSoup:
+        return BeautifulSoup(html_content, self.name)
+
+
+class LxmlParserBackend(ParserBackend):
+    """libxml2-based tree builder.
+
+    Usually faster than html.parser, but not on every page: deeply nested pages,
+    and in some runs the 10k-node corpus page, clean slower with it. Check with
+    `python -m benchmarks.parser_parity` before switching a deployment over.
+    """
+    name = "lxml"
+
+    def is_available(self) -> bool:
+        try:
+            import lxml  # noqa: F401
+        except ImportError:
+            return False
+        return True
+
+
+PARSER_BACKENDS = {
+    backend.name: backend for backend in (ParserBackend(), LxmlParserBackend())
+}
+
+
+def get_parser_backend(name: str | None = None) -> ParserBackend:
+    """Resolve a backend by name (default: HTML_PARSER_BACKEND), falling back to html.parser"""
+    name = name or os.getenv("HTML_PARSER_BACKEND", "html.parser")
+    backend = PARSER_BACKENDS.get(name)
+    if backend is None:
+        raise ValueError(f"Unknown HTML parser backend '{name}', expected one of {list(PARSER_BACKENDS)}")
+    if not backend.is_available():
+        logger.warning(f"HTML parser backend '{name}' is not installed, falling back to html.parser")
+        return PARSER_BACKENDS["html.parser"]
+    return backend
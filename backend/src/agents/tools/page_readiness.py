@@ -0,0 +1,207 @@
+from playwright.async_api import Page, Request, Error as PlaywrightError, TimeoutError as PlaywrightTimeoutError
+from src.agents.tools.page_scripts import DOM_STABLE_JS
+from typing import Awaitable, Callable, Dict, Literal, Optional, Tuple, get_args
+from urllib.parse import urlparse
+import asyncio
+import os
+import time
+import weakref
+
+# "load" is the old behaviour; the others return as soon as the part of the page the
+# agent needs is there instead of waiting for every image, font and iframe.
+ReadinessStrategy = Literal["load", "domcontentloaded", "network-quiet", "dom-stable", "selector"]
+STRATEGIES = get_args(ReadinessStrategy)
+
+# Lifecycle event the navigation call itself waits for, before the strategy's own wait
+NAVIGATION_EVENTS = {
+    "load": "load",
+    "domcontentloaded": "domcontentloaded",
+    "network-quiet": "domcontentloaded",
+    "dom-stable": "domcontentloaded",
+    "selector": "commit",
+}
+
+# Streams that stay open for the life of the page and would never let the network go quiet
+LONG_LIVED_TYPES = {"eventsource", "websocket"}
+
+
+def _parse_domain_rules(value: str) -> Dict[str, Tuple[str, Optional[str]]]:
+    """'github.com=dom-stable;example.org=selector:#content' -> {domain: (strategy, selector)}"""
+    rules = {}
+    for entry in value.split(";"):
+        if "=" not in entry:
+            continue
+        domain, rule = (part.strip() for part in entry.split("=", 1))
+        strategy, _, selector = rule.partition(":")
+        strategy = strategy.strip()
+        if strategy not in STRATEGIES:
+            raise ValueError(f"Unknown readiness strategy '{strategy}' for {domain}, expected one of {list(STRATEGIES)}")
+        rules[domain.lower()] = (strategy, selector.strip() or None)
+    return rules
+
+
+class _NetworkTracker:
+    """Counts a page's in-flight requests and when that count last changed"""
+
+    def __init__(self, page: Page):
+        self.inflight = set()
+        self.last_change = time.monotonic()
+        page.on("request", self._started)
+        page.on("requestfinished", self._finished)
+        page.on("requestfailed", self._finished)
+        # Requests of the previous document may never report back once it is gone
+        page.on("framenavigated", lambda frame: frame.parent_frame is None and self.inflight.clear())
+
+    def _started(self, request: Request):
+        if request.resource_type not in LONG_LIVED_TYPES:
+            self.inflight.add(request)
+            self.last_change = time.monotonic()
+
+    def _finished(self, request: Request):
+        if request in self.inflight:
+            self.inflight.discard(request)
+            self.last_change = time.monotonic()
+
+    async def wait_quiet(self, quiet_ms: int, timeout_ms: int, max_inflight: int) -> bool:
+        deadline = time.monotonic() + timeout_ms / 1000
+        while True:
+            now = time.monotonic()
+            if len(self.inflight) <= max_inflight and (now - self.last_change) * 1000 >= quiet_ms:
+                return True
+            if now >= deadline:
+                return False
+            await asyncio.sleep(0.05)
+
+
+class PageReadiness:
+    """Decides when a page is ready after a navigation or an action.
+
+    The strategy comes from the tool call, else from the first PAGE_READY_DOMAINS
+    rule matching the URL's host (or a parent domain), else PAGE_READY_STRATEGY
+    (domcontentloaded). Waiting past PAGE_READY_TIMEOUT_MS is not an error: the
+    page is used as it is and the timeout is counted. dom-stable has its own, shorter
+    cap (PAGE_READY_STABLE_MAX_MS), since tickers, carousels and chat widgets keep
+    some pages from ever going quiet. Wait durations are recorded per strategy.
+    """
+
+    def __init__(self, default_strategy: Optional[str] = None, domain_rules: Optional[Dict] = None,
+                 timeout_ms: Optional[int] = None, quiet_ms: Optional[int] = None,
+                 max_inflight: Optional[int] = None, stable_max_ms: Optional[int] = None):
+        self.default_strategy = default_strategy or os.getenv("PAGE_READY_STRATEGY", "domcontentloaded")
+        if self.default_strategy not in STRATEGIES or self.default_strategy == "selector":
+            raise ValueError(f"Invalid default readiness strategy '{self.default_strategy}'")
+        self.domain_rules = domain_rules if domain_rules is not None else _parse_domain_rules(os.getenv("PAGE_READY_DOMAINS", ""))
+        self.timeout_ms = timeout_ms or int(os.getenv("PAGE_READY_TIMEOUT_MS", "10000"))
+        self.quiet_ms = quiet_ms or int(os.getenv("PAGE_READY_QUIET_MS", "500"))
+        self.stable_max_ms = min(stable_max_ms or int(os.getenv("PAGE_READY_STABLE_MAX_MS", "2500")), self.timeout_ms)
+        self.max_inflight = max_inflight if max_inflight is not None else int(os.getenv("PAGE_READY_MAX_INFLIGHT", "0"))
+        self._trackers: "weakref.WeakKeyDictionary[Page, _NetworkTracker]" = weakref.WeakKeyDictionary()
+        self._metrics: Dict[str, Dict] = {}
+
+    def resolve(self, url: str, strategy: Optional[str] = None,
+                selector: Optional[str] = None) -> Tuple[str, Optional[str]]:
+        """The (strategy, selector) to use for url"""
+        if strategy:
+            if strategy not in STRATEGIES:
+                raise ValueError(f"Unknown readiness strategy '{strategy}', expected one of {list(STRATEGIES)}")
+        else:
+            parts = (urlparse(url).hostname or "").lower().split(".")
+            rule = next((self.domain_rules[".".join(parts[i:])] for i in range(len(parts))
+                         if ".".join(parts[i:]) in self.domain_rules), None)
+            strategy, rule_selector = rule if rule else (self.default_strategy, None)
+            selector = selector or rule_selector
+        if strategy == "selector" and not selector:
+            raise ValueError("The 'selector' readiness strategy needs a wait_selector.")
+        return strategy, selector
+
+    def track(self, page: Page):
+        """Start counting the page's requests; needed before a network-quiet wait"""
+        if page not in self._trackers:
+            self._trackers[page] = _NetworkTracker(page)
+
+    async def navigate(self, page: Page, navigate: Callable[[str], Awaitable], url: str,
+                       strategy: Optional[str] = None, selector: Optional[str] = None) -> str:
+        """Run navigate(wait_until) for url, wait until the page is ready and describe the wait"""
+        strategy, selector = self.resolve(url, strategy, selector)
+        if strategy == "network-quiet":
+            self.track(page)
+        start = time.perf_counter()
+        await navigate(NAVIGATION_EVENTS[strategy])
+        ready = await self._settle(page, strategy, selector)
+        return self._record(strategy, start, ready)
+
+    async def act(self, page: Page, action: Callable[[], Awaitable], strategy: Optional[str] = None,
+                  selector: Optional[str] = None, expect_navigation: bool = False) -> str:
+        """Run an action that may navigate or re-render the page, then wait until it is ready.
+
+        With expect_navigation the navigation listener is set up before the action runs,
+        so a fast navigation can't complete before it is waited for.
+        """
+        strategy, selector = self.resolve(page.url, strategy, selector)
+        if strategy == "network-quiet":
+            self.track(page)
+        start = time.perf_counter()
+        if not expect_navigation:
+            await action()
+        else:
+            acted = False
+            try:
+                async with page.expect_navigation(wait_until=NAVIGATION_EVENTS[strategy], timeout=self.timeout_ms):
+                    await action()
+                    acted = True
+            except PlaywrightTimeoutError:
+                if not acted:
+                    raise
+                self._record(strategy, start, False)
+                return f"no navigation within {self.timeout_ms} ms"
+        ready = await self._settle(page, strategy, selector)
+        return self._record(strategy, start, ready)
+
+    async def _settle(self, page: Page, strategy: str, selector: Optional[str]) -> bool:
+        try:
+            if strategy == "network-quiet":
+                return await self._trackers[page].wait_quiet(self.quiet_ms, self.timeout_ms, self.max_inflight)
+            if strategy == "dom-stable":
+                wait = {"quietMs": self.quiet_ms, "timeoutMs": self.stable_max_ms}
+                try:
+                    result = await page.evaluate(DOM_STABLE_JS, wait)
+                except PlaywrightError:
+                    # A client-side redirect replaced the document mid-wait; watch the new one
+                    await page.wait_for_load_state("domcontentloaded", timeout=self.timeout_ms)
+                    result = await page.evaluate(DOM_STABLE_JS, wait)
+                return result["stable"]
+            if strategy == "selector":
+                await page.wait_for_selector(selector, timeout=self.timeout_ms)
+        except PlaywrightTimeoutError:
+            return False
+        return True
+
+    def _record(self, strategy: str, start: float, ready: bool) -> str:
+        elapsed_ms = (time.perf_counter() - start) * 1000
+        metrics = self._metrics.setdefault(strategy, {"waits": 0, "timeouts": 0, "total_ms": 0.0, "max_ms": 0.0})
+        metrics["waits"] += 1
+        metrics["total_ms"] += elapsed_ms
+        metrics["max_ms"] = max(metrics["max_ms"], elapsed_ms)
+        if not ready:
+            metrics["timeouts"] += 1
+            return f"page not ready after {elapsed_ms:.0f} ms ({strategy}), continuing with it as it is"
+        return f"page ready after {elapsed_ms:.0f} ms ({strategy})"
+
+    def stats(self) -> dict:
+        return {
+            "default_strategy": self.default_strategy,
+            "dom_stable_max_ms": self.stable_max_ms,
+            "domain_rules": len(self.domain_rules),
+            "strategies": {
+                strategy: {
+                    "waits": metrics["waits"],
+                    "timeouts": metrics["timeouts"],
+                    "avg_ms": round(metrics["total_ms"] / metrics["waits"], 1),
+                    "max_ms": round(metrics["max_ms"], 1),
+                }
+                for strategy, metrics in self._metrics.items()
+            },
+        }
+
+
+page_readiness = PageReadiness()
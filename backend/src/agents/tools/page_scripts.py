@@ -0,0 +1,576 @@
+import json
+
+# Element sets shared by the Python cleaner (FetchAndCleanHTMLTool._clean_html)
+# and the in-browser distillation script below, so both modes agree.
+INTERACTIVE_ELEMENTS = {
+    'a', 'button', 'input', 'textarea', 'select', 'option',
+    'form', 'label', 'details', 'summary', 'dialog'
+}
+
+CONTENT_ELEMENTS = {
+    'h1', 'h2', 'h3', 'h4', 'h5', 'h6', 'p', 'span', 'div',
+    'article', 'section', 'main', 'aside', 'nav', 'header', 'footer',
+    'ul', 'ol', 'li', 'dl', 'dt', 'dd', 'blockquote', 'pre', 'code',
+    'strong', 'em', 'b', 'i', 'mark', 'small', 'sub', 'sup'
+}
+
+LIST_ELEMENTS = {'ul', 'ol', 'li'}
+
+INTERACTIVE_ATTRIBUTES = {
+    'id', 'name', 'type', 'value', 'placeholder', 'href',
+    'action', 'method', 'for', 'role', 'aria-label', 'title',
+    'disabled', 'readonly', 'required', 'checked', 'selected', 'class'
+}
+
+UNWANTED_TAGS = [
+    'script', 'style', 'link', 'meta', 'noscript', 'iframe',
+    'embed', 'object', 'applet', 'canvas', 'svg', 'audio', 'video'
+]
+
+# Stamps data-cleaner-id on visible interactive elements and returns their positions
+# plus the script's own timing. One TreeWalker pass collects the candidates, then every
+# layout read happens before the first attribute write, so the page is laid out once.
+ELEMENT_POSITIONS_JS = """
+() => {
+    const start = performance.now();
+    const interactiveTags = new Set(""" + json.dumps(sorted(INTERACTIVE_ELEMENTS - {'option'})) + """);
+
+    // Also check for elements with button-like classes
+    const buttonClassIndicators = ['button', 'btn', 'clickable', 'link-button'];
+
+    // Fallback label only, wrappers can hold the text of the whole page
+    const TEXT_LIMIT = 200;
+
+    const candidates = [];
+    if (document.documentElement) {
+        const walker = document.createTreeWalker(document.documentElement, NodeFilter.SHOW_ELEMENT);
+        for (let el = walker.currentNode; el; el = walker.nextNode()) {
+            if (interactiveTags.has(el.localName)) {
+                candidates.push(el);
+                continue;
+            }
+            const className = el.getAttribute('class');
+            if (className && buttonClassIndicators.some((indicator) => className.includes(indicator))) {
+                candidates.push(el);
+            }
+        }
+    }
+    const collected = performance.now();
+
+    const boundedText = (el) => {
+        let raw = '';
+        const texts = document.createTreeWalker(el, NodeFilter.SHOW_TEXT);
+        while (raw.length < TEXT_LIMIT * 4 && texts.nextNode()) raw += texts.currentNode.data;
+        return raw.trim().replace(/\\s+/g, ' ').slice(0, TEXT_LIMIT).trim();
+    };
+
+    // Reads only
+    const scrollX = window.scrollX, scrollY = window.scrollY;
+    const visible = [];
+    for (const el of candidates) {
+        const rect = el.getBoundingClientRect();
+        if (!(rect.width > 0 && rect.height > 0)) continue;
+        const style = window.getComputedStyle(el);
+        if (!(style.opacity > 0 && style.visibility !== 'hidden')) continue;
+        visible.push({
+            el,
+            id: el.getAttribute('data-cleaner-id'),
+            position: {
+                x: Math.round(rect.left + scrollX),
+                y: Math.round(rect.top + scrollY),
+                w: Math.round(rect.width),
+                h: Math.round(rect.height),
+                tag: el.localName,
+                text: boundedText(el),
+            },
+        });
+    }
+    const measured = performance.now();
+
+    // Writes only. Numbering continues across calls so elements added later never reuse an id
+    const positions = {};
+    let elementCounter = window.__cleanerIdCounter || 0;
+    for (const item of visible) {
+        if (!item.id) {
+            item.id = `cleaner-id-${elementCounter++}`;
+            item.el.setAttribute('data-cleaner-id', item.id);
+        }
+        positions[item.id] = item.position;
+    }
+    window.__cleanerIdCounter = elementCounter;
+    const stamped = performance.now();
+
+    return {
+        positions,
+        timing: {
+            collect_ms: collected - start,
+            measure_ms: measured - collected,
+            stamp_ms: stamped - measured,
+            total_ms: stamped - start,
+            candidates: candidates.length,
+            elements: visible.length,
+        },
+    };
+}
+"""
+
+# Runs the whole cleaning pipeline inside the page and returns the same item list
+# FetchAndCleanHTMLTool._clean_html builds, without shipping the document to Python.
+# Nothing in the page is modified apart from the data-cleaner-id stamps.
+DISTILL_DOM_JS = """
+() => {
+    const positions = (""" + ELEMENT_POSITIONS_JS + """)().positions;
+    const body = document.body;
+    if (!body) return null;
+
+    const INTERACTIVE = new Set(""" + json.dumps(sorted(INTERACTIVE_ELEMENTS)) + """);
+    const CONTENT = new Set(""" + json.dumps(sorted(CONTENT_ELEMENTS)) + """);
+    const LISTS = new Set(""" + json.dumps(sorted(LIST_ELEMENTS)) + """);
+    const ATTRIBUTES = new Set(""" + json.dumps(sorted(INTERACTIVE_ATTRIBUTES)) + """);
+    const UNWANTED = new Set(""" + json.dumps(UNWANTED_TAGS) + """);
+    const TEXT_INPUTS = new Set(['input', 'textarea', 'select']);
+
+    // Python's str.strip()/\\s whitespace, which differs slightly from JS trim()
+    const WS = '\\t\\n\\v\\f\\r \\x1c-\\x1f\\x85\\xa0\\u1680\\u2000-\\u200a\\u2028\\u2029\\u202f\\u205f\\u3000';
+    const stripRe = new RegExp(`^[${WS}]+|[${WS}]+$`, 'g');
+    const wsRunRe = new RegExp(`[${WS}]+`, 'g');
+    const sentenceRe = new RegExp(`[.!?]+[${WS}]+`);
+    const strip = (s) => s.replace(stripRe, '');
+    const collapse = (s) => s.replace(wsRunRe, ' ');
+    const len = (s) => Array.from(s).length;
+
+    // The walks below keep explicit stacks of { items, index } rather than recursing,
+    // like the Python walker, so deeply nested pages can't overflow the JS call stack.
+
+    // Build a cleaned view of the body: unwanted subtrees and comments dropped,
+    // images replaced by their alt text, innermost interactive elements marked.
+    const build = (root) => {
+        const open = (el) => {
+            const node = { name: el.nodeName.toLowerCase(), el, children: [], hasInteractive: false, innermost: false, containsInnermost: false };
+            const items = node.name === 'template' && el.content ? el.content.childNodes : el.childNodes;
+            return { node, items, index: 0, previousWasText: false };
+        };
+        const top = open(root);
+        const stack = [top];
+        while (stack.length) {
+            const frame = stack[stack.length - 1];
+            const node = frame.node;
+            if (frame.index >= frame.items.length) {
+                // All children built: mark the node and let its parent know
+                stack.pop();
+                node.innermost = INTERACTIVE.has(node.name) && !node.hasInteractive;
+                if (stack.length) {
+                    const parent = stack[stack.length - 1].node;
+                    if (INTERACTIVE.has(node.name) || node.hasInteractive) parent.hasInteractive = true;
+                    if (node.innermost || node.containsInnermost) parent.containsInnermost = true;
+                }
+                continue;
+            }
+            const child = frame.items[frame.index++];
+            if (child.nodeType === Node.TEXT_NODE || child.nodeType === Node.CDATA_SECTION_NODE) {
+                // Adjacent DOM text nodes serialize (and re-parse) as one string
+                if (frame.previousWasText) node.children[node.children.length - 1] += child.data;
+                else node.children.push(child.data);
+                frame.previousWasText = true;
+                continue;
+            }
+            frame.previousWasText = false;
+            if (child.nodeType !== Node.ELEMENT_NODE) continue;
+            const name = child.nodeName.toLowerCase();
+            if (UNWANTED.has(name)) continue;
+            if (name === 'img') {
+                const alt = strip(child.getAttribute('alt') || '');
+                if (alt) node.children.push(`[Image: ${alt}]`);
+                continue;
+            }
+            const childFrame = open(child);
+            node.children.push(childFrame.node);
+            stack.push(childFrame);
+        }
+        return top.node;
+    };
+
+    const getText = (node) => {
+        const parts = [];
+        const stack = [{ items: node.children, index: 0 }];
+        while (stack.length) {
+            const frame = stack[stack.length - 1];
+            if (frame.index >= frame.items.length) {
+                stack.pop();
+                continue;
+            }
+            const child = frame.items[frame.index++];
+            if (typeof child === 'string') {
+                const text = strip(child);
+                if (text) parts.push(text);
+            } else {
+                stack.push({ items: child.children, index: 0 });
+            }
+        }
+        return parts.join('');
+    };
+
+    const listText = (node) => {
+        if (node.name === 'ul' || node.name === 'ol') {
+            const items = [];
+            for (const child of node.children) {
+                if (typeof child !== 'string' && child.name === 'li') {
+                    const text = getText(child);
+                    if (text) items.push(text);
+                }
+            }
+            return items.join(' | ');
+        }
+        return getText(node);
+    };
+
+    const splitLongText = (text) => {
+        const chunks = [];
+        let current = '';
+        for (let sentence of text.split(sentenceRe)) {
+            sentence = strip(sentence);
+            if (!sentence) continue;
+            if (len(current) + len(sentence) > 150 && current) {
+                chunks.push(current);
+                current = sentence;
+            } else {
+                current = current ? current + '. ' + sentence : sentence;
+            }
+        }
+        if (current) chunks.push(current);
+
+        const finalChunks = [];
+        for (const chunk of chunks) {
+            if (len(chunk) > 150) {
+                let temp = '';
+                for (const part of chunk.split(/(?=[A-Z][a-z])/)) {
+                    if (len(temp) + len(part) > 150 && temp) {
+                        finalChunks.push(strip(temp));
+                        temp = part;
+                    } else {
+                        temp += part;
+                    }
+                }
+                if (temp) finalChunks.push(strip(temp));
+            } else {
+                finalChunks.push(chunk);
+            }
+        }
+        return finalChunks.length ? finalChunks : [text];
+    };
+
+    const interactiveItem = (node) => {
+        const position = positions[node.el.getAttribute('data-cleaner-id')];
+        if (!position) return null;
+        const attributes = { x: position.x, y: position.y, w: position.w, h: position.h };
+        for (const attr of node.el.attributes) {
+            if (!ATTRIBUTES.has(attr.name)) continue;
+            attributes[attr.name] = attr.name === 'class'
+                ? attr.value.split(wsRunRe).filter(Boolean).join(' ')
+                : attr.value;
+        }
+        const text = getText(node) || position.text || '';
+        if (!text && !TEXT_INPUTS.has(node.name)) return null;
+        return { tag: node.name, attributes, text, type: 'interactive', cleaner_id: node.el.getAttribute('data-cleaner-id') };
+    };
+
+    const result = [];
+    const stack = [{ items: build(body).children, index: 0 }];
+    while (stack.length) {
+        const frame = stack[stack.length - 1];
+        if (frame.index >= frame.items.length) {
+            stack.pop();
+            continue;
+        }
+        const node = frame.items[frame.index++];
+        if (typeof node === 'string') {
+            const text = strip(node);
+            if (text) result.push(text);
+            continue;
+        }
+        const name = node.name;
+        if (node.innermost) {
+            const item = interactiveItem(node);
+            if (item) result.push(item);
+            continue;
+        }
+        if (LISTS.has(name) && !INTERACTIVE.has(name) && !node.containsInnermost) {
+            const text = listText(node);
+            if (text) result.push({ tag: name, text, attributes: {} });
+            continue;
+        }
+        if (CONTENT.has(name) && !INTERACTIVE.has(name) && !node.containsInnermost) {
+            const text = getText(node);
+            if (!text) continue;
+            if (len(text) > 200 && name === 'div') {
+                for (const chunk of splitLongText(text)) {
+                    if (strip(chunk)) result.push({ tag: 'p', text: collapse(strip(chunk)), attributes: {} });
+                }
+            } else {
+                result.push({ tag: name, text: collapse(text), attributes: {} });
+            }
+            continue;
+        }
+        // Interactive elements that aren't innermost, and everything else, contribute their children
+        stack.push({ items: node.children, index: 0 });
+    }
+    return result;
+}
+"""
+
+# Installs a MutationObserver on the first call and, on later calls, returns how many
+# mutations happened since the previous one. A new document has no observer yet, so
+# `fresh` doubles as the navigation signal for FetchAndCleanHTMLTool's delta snapshots.
+OBSERVE_MUTATIONS_JS = """
+() => {
+    const state = window.__cleanerObserver;
+    if (!state) {
+        const created = { mutations: 0 };
+        created.observer = new MutationObserver((records) => {
+            for (const record of records) {
+                // Our own id stamps are not page changes
+                if (record.type === 'attributes' && record.attributeName === 'data-cleaner-id') continue;
+                created.mutations++;
+            }
+        });
+        created.observer.observe(document, { subtree: true, childList: true, attributes: true, characterData: true });
+        window.__cleanerObserver = created;
+        return { fresh: true, mutations: 0 };
+    }
+    const mutations = state.mutations + state.observer.takeRecords()
+        .filter((record) => !(record.type === 'attributes' && record.attributeName === 'data-cleaner-id')).length;
+    state.mutations = 0;
+    return { fresh: false, mutations };
+}
+"""
+
+# Cheap content hash of the rendered DOM (tags, attributes, text) plus the viewport and
+# the data-cleaner-id counter, i.e. everything the cleaned output and its id stamps
+# depend on. Used as the snapshot cache key so an unchanged page skips page.content()
+# and parsing altogether.
+DOM_FINGERPRINT_JS = """
+() => {
+    let h1 = 0xdeadbeef, h2 = 0x41c6ce57, nodes = 0;
+    const feed = (s) => {
+        for (let i = 0; i < s.length; i++) {
+            const c = s.charCodeAt(i);
+            h1 = Math.imul(h1 ^ c, 2654435761);
+            h2 = Math.imul(h2 ^ c, 1597334677);
+        }
+        h1 = Math.imul(h1 ^ 0x1f, 2654435761);
+    };
+    feed(`${window.innerWidth}x${window.innerHeight}:${window.__cleanerIdCounter || 0}`);
+    const root = document.documentElement;
+    if (root) {
+        const walker = document.createTreeWalker(root, NodeFilter.SHOW_ELEMENT | NodeFilter.SHOW_TEXT);
+        for (let node = walker.currentNode; node; node = walker.nextNode()) {
+            nodes++;
+            if (node.nodeType === Node.TEXT_NODE) {
+                feed(node.data);
+                continue;
+            }
+            feed(node.tagName);
+            for (const attr of node.attributes) {
+                feed(attr.name);
+                feed(attr.value);
+            }
+        }
+    }
+    h1 = Math.imul(h1 ^ (h1 >>> 16), 2246822507) ^ Math.imul(h2 ^ (h2 >>> 13), 3266489909);
+    h2 = Math.imul(h2 ^ (h2 >>> 16), 2246822507) ^ Math.imul(h1 ^ (h1 >>> 13), 3266489909);
+    return `${(h2 >>> 0).toString(16).padStart(8, '0')}${(h1 >>> 0).toString(16).padStart(8, '0')}-${nodes}`;
+}
+"""
+
+# Scroll offset and size of the viewport, in the same document coordinates as the positions
+VIEWPORT_JS = """
+() => ({ x: window.scrollX, y: window.scrollY, w: window.innerWidth, h: window.innerHeight })
+"""
+
+# Resolves once the DOM has had no structural or text change for quietMs, or with
+# stable=false after timeoutMs. Attribute changes are ignored so that CSS animations
+# and carousels driven through inline styles don't keep the page from settling.
+DOM_STABLE_JS = """
+({ quietMs, timeoutMs }) => new Promise((resolve) => {
+    const start = performance.now();
+    let mutations = 0;
+    let quietTimer = null;
+    let hardTimer = null;
+    const observer = new MutationObserver((records) => {
+        mutations += records.length;
+        clearTimeout(quietTimer);
+        quietTimer = setTimeout(() => finish(true), quietMs);
+    });
+    const finish = (stable) => {
+        observer.disconnect();
+        clearTimeout(quietTimer);
+        clearTimeout(hardTimer);
+        resolve({ stable, mutations, elapsed_ms: performance.now() - start });
+    };
+    observer.observe(document, { childList: true, subtree: true, characterData: true });
+    quietTimer = setTimeout(() => finish(true), quietMs);
+    hardTimer = setTimeout(() => finish(false), timeoutMs);
+})
+"""
+
+# Keeps scrolling to the bottom of the page so infinite feeds load more, until
+# minItems elements match itemSelector ("target"), neither the page height nor the
+# item count changed for idleMs ("idle"), timeoutMs passed ("timeout") or maxScrolls
+# scrolls were made ("max_scrolls"). Without itemSelector it just scrolls to the end.
+SCROLL_UNTIL_JS = """
+({ itemSelector, minItems, idleMs, timeoutMs, maxScrolls, pollMs }) => new Promise((resolve) => {
+    const start = performance.now();
+    const scroller = document.scrollingElement || document.documentElement;
+    const count = () => itemSelector ? document.querySelectorAll(itemSelector).length : 0;
+    const startItems = count();
+    let scrolls = 0;
+    let lastHeight = -1;
+    let lastItems = -1;
+    let lastChange = start;
+    const tick = () => {
+        const now = performance.now();
+        const items = count();
+        const height = scroller.scrollHeight;
+        if (height !== lastHeight || items !== lastItems) {
+            lastHeight = height;
+            lastItems = items;
+            lastChange = now;
+        }
+        const finish = (reason) => resolve({
+            reason, items, new_items: items - startItems, scrolls, height,
+            y: window.scrollY, elapsed_ms: now - start,
+        });
+        if (itemSelector && minItems && items >= minItems) return finish("target");
+        if (now - lastChange >= idleMs) return finish("idle");
+        if (now - start >= timeoutMs) return finish("timeout");
+        if (scrolls >= maxScrolls) return finish("max_scrolls");
+        if (window.scrollY + window.innerHeight < height - 1) {
+            window.scrollTo(0, height);
+            scrolls += 1;
+        }
+        setTimeout(tick, pollMs);
+    };
+    tick();
+})
+"""
+
+# Finds the biggest table or run of same-looking siblings (same tag and classes, at
+# least minRows of them) and stamps its rows with data-extract-row so the rows can
+# be read back in chunks with EXTRACT_ROWS_JS. Table columns become fields named
+# after the header cells; list items get their text, first link and first image.
+DETECT_ROWS_JS = """
+({ minRows, key }) => {
+    const skip = new Set(['SCRIPT', 'STYLE', 'NOSCRIPT', 'TEMPLATE', 'OPTION', 'BR', 'HR', 'svg']);
+    const describe = (el) => el.tagName.toLowerCase() + (el.id ? `#${el.id}` : '')
+        + Array.from(el.classList).slice(0, 3).map((c) => `.${c}`).join('');
+    let best = null;
+
+    for (const table of document.querySelectorAll('table')) {
+        const rows = Array.from(table.rows).filter((row) => row.closest('table') === table && row.querySelector(':scope > td'));
+        if (rows.length >= minRows && (!best || rows.length > best.rows.length)) {
+            best = { kind: 'table', container: table, rows };
+        }
+    }
+
+    for (const parent of document.body ? document.body.querySelectorAll('*') : []) {
+        if (parent.children.length < minRows || parent.tagName === 'TABLE' || parent.tagName === 'TBODY') continue;
+        const groups = new Map();
+        for (const child of parent.children) {
+            if (skip.has(child.tagName) || !child.children.length || !child.textContent.trim()) continue;
+            const signature = child.tagName + '.' + Array.from(child.classList).sort().join('.');
+            if (!groups.has(signature)) groups.set(signature, []);
+            groups.get(signature).push(child);
+        }
+        for (const rows of groups.values()) {
+            if (rows.length >= minRows && (!best || rows.length > best.rows.length)) {
+                best = { kind: 'list', container: parent, rows };
+            }
+        }
+    }
+    if (!best) return null;
+
+    best.rows.forEach((row) => row.setAttribute('data-extract-row', key));
+    const fields = {};
+    if (best.kind === 'table') {
+        const header = best.container.tHead?.rows[0]
+            || Array.from(best.container.rows).find((row) => !row.querySelector(':scope > td'));
+        const width = Math.max(...best.rows.slice(0, 20).map((row) => row.cells.length));
+        for (let i = 0; i < width; i++) {
+            let name = (header?.cells[i]?.textContent || '').trim().toLowerCase()
+                .replace(/[^a-z0-9]+/g, '_').replace(/^_+|_+$/g, '') || `column_${i + 1}`;
+            while (name in fields) name += '_';
+            fields[name] = `:scope > :nth-child(${i + 1})`;
+        }
+    } else {
+        fields.text = '.';
+        if (best.rows[0].querySelector('a[href]')) fields.link = 'a[href]@href';
+        if (best.rows[0].querySelector('img[src]')) fields.image = 'img[src]@src';
+    }
+    return {
+        kind: best.kind,
+        description: best.kind === 'table'
+            ? `${best.rows.length} rows of ${describe(best.container)}`
+            : `${best.rows.length} × ${describe(best.rows[0])} under ${describe(best.container)}`,
+        rowSelector: `[data-extract-row="${key}"]`,
+        fields,
+    };
+}
+"""
+
+# Reads rows offset..offset+limit of rowSelector. fields maps a name to a CSS
+# selector inside the row ('.' for the row itself), optionally followed by @attr
+# to read an attribute instead of the text; href and src come back absolute.
+EXTRACT_ROWS_JS = """
+({ rowSelector, fields, offset, limit }) => {
+    const specs = Object.entries(fields).map(([name, spec]) => {
+        const at = spec.lastIndexOf('@');
+        const selector = (at >= 0 ? spec.slice(0, at) : spec).trim();
+        return [name, selector === '.' ? '' : selector, at >= 0 ? spec.slice(at + 1).trim() : null];
+    });
+    const read = (row, selector, attr) => {
+        const el = selector ? row.querySelector(selector) : row;
+        if (!el) return null;
+        if (!attr) return el.textContent.replace(/\\s+/g, ' ').trim();
+        if ((attr === 'href' || attr === 'src') && typeof el[attr] === 'string' && el[attr]) return el[attr];
+        return el.getAttribute(attr);
+    };
+    const rows = document.querySelectorAll(rowSelector);
+    const chunk = [];
+    for (let i = offset; i < Math.min(rows.length, offset + limit); i++) {
+        chunk.push(Object.fromEntries(specs.map(([name, selector, attr]) => [name, read(rows[i], selector, attr)])));
+    }
+    return { total: rows.length, rows: chunk };
+}
+"""
+
+# Title and the start of the visible text of a page, whitespace collapsed
+PAGE_TEXT_JS = """
+(maxChars) => {
+    const text = (document.body ? document.body.innerText : '').replace(/\\s+/g, ' ').trim();
+    return { title: document.title, text: text.slice(0, maxChars), truncated: text.length > maxChars };
+}
+"""
+
+# Day-to-day stable identity of a page for replaying recorded actions: host and path
+# with digit runs masked (dates, ids), plus a hash over the form controls and buttons
+# (tag, id, name, type). Links and text are left out since they change with content.
+PAGE_SIGNATURE_JS = """
+() => {
+    const parts = [];
+    for (const el of document.querySelectorAll('form, input, select, textarea, button, [role="button"]')) {
+        if (el.type === 'hidden') continue;
+        parts.push([el.tagName, el.id, el.getAttribute('name') || '', el.getAttribute('type') || ''].join('|'));
+    }
+    let h = 0x811c9dc5;
+    const joined = parts.join('\\n');
+    for (let i = 0; i < joined.length; i++) {
+        h ^= joined.charCodeAt(i);
+        h = Math.imul(h, 0x01000193);
+    }
+    return {
+        location: (location.host + location.pathname).replace(/\\d+/g, '#'),
+        controls: parts.length,
+        structure: (h >>> 0).toString(16).padStart(8, '0'),
+    };
+}
+"""
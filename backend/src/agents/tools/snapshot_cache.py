@@ -0,0 +1,66 @@
+from collections import OrderedDict
+import json
+import os
+
+
+class SnapshotCache:
+    """LRU cache of cleaned page snapshots keyed by URL and an in-page DOM fingerprint.
+
+    Entries are the cleaned item lists FetchAndCleanHTMLTool renders from, so a
+    page that has not changed since it was last cleaned (a retry, a re-parse, a
+    GoBack to an earlier page) skips page.content() and parsing. The cache is
+    bounded by entry count and by the approximate size of the stored items.
+    """
+
+    def __init__(self, max_entries: int | None = None, max_bytes: int | None = None):
+        self.max_entries = max_entries or int(os.getenv("HTML_CACHE_MAX_ENTRIES", "256"))
+        self.max_bytes = max_bytes or int(os.getenv("HTML_CACHE_MAX_BYTES", str(32 * 1024 * 1024)))
+        self._entries: OrderedDict[tuple, tuple[list | None, int]] = OrderedDict()
+        self._bytes = 0
+        self._metrics = {"hits": 0, "misses": 0, "evictions": 0}
+
+    @property
+    def enabled(self) -> bool:
+        return self.max_entries > 0 and self.max_bytes > 0
+
+    def get(self, key: tuple) -> tuple[bool, list | None]:
+        """Return (hit, items); items are shared, callers must not mutate them"""
+        entry = self._entries.get(key)
+        if entry is None:
+            self._metrics["misses"] += 1
+            return False, None
+        self._entries.move_to_end(key)
+        self._metrics["hits"] += 1
+        return True, entry[0]
+
+    def put(self, key: tuple, items: list | None):
+        size = len(json.dumps(items, ensure_ascii=False)) if items is not None else 0
+        if not self.enabled or size > self.max_bytes:
+            return
+        old = self._entries.pop(key, None)
+        if old is not None:
+            self._bytes -= old[1]
+        self._entries[key] = (items, size)
+        self._bytes += size
+        while len(self._entries) > self.max_entries or self._bytes > self.max_bytes:
+            _, (_, evicted_size) = self._entries.popitem(last=False)
+            self._bytes -= evicted_size
+            self._metrics["evictions"] += 1
+
+    def clear(self):
+        self._entries.clear()
+        self._bytes = 0
+
+    def stats(self) -> dict:
+        lookups = self._metrics["hits"] + self._metrics["misses"]
+        return {
+            "entries": len(self._entries),
+            "bytes": self._bytes,
+            "max_entries": self.max_entries,
+            "max_bytes": self.max_bytes,
+            "hit_rate": self._metrics["hits"] / lookups if lookups else 0.0,
+            **self._metrics,
+        }
+
+
+snapshot_cache = SnapshotCache()
@@ -0,0 +1,33 @@
+from functools import lru_cache
+import logging
+import os
+
+logger = logging.getLogger(__name__)
+
+
+@lru_cache(maxsize=None)
+def _get_encoding():
+    name = os.getenv("HTML_TOKEN_ENCODING", "cl100k_base")
+    try:
+        import tiktoken
+        return tiktoken.get_encoding(name)
+    except Exception as e:
+        # tiktoken downloads its BPE files on first use, which fails offline
+        logger.warning(f"Could not load tiktoken encoding '{name}', estimating tokens from length: {e}")
+        return None
+
+
+def count_tokens(text: str) -> int:
+    """Token count of text with tiktoken, or a ~4 characters per token estimate without it"""
+    if not text:
+        return 0
+    encoding = _get_encoding()
+    if encoding is None:
+        return len(text) // 4 + 1
+    return len(encoding.encode(text, disallowed_special=()))
+
+
+def encoding_name() -> str | None:
+    """Name of the tiktoken encoding in use, None when counts are estimated"""
+    encoding = _get_encoding()
+    return encoding.name if encoding is not None else None
@@ -0,0 +1,102 @@
+from crewai.tools import BaseTool
+from playwright.async_api import Page
+from typing import Dict, Optional
+import os
+import threading
+from src.agents.tools.browser_tools import (
+    GoToPageTool, TakeScreenshotTool, FetchAndCleanHTMLTool, HoverElementTool, GetCurrentURL, GoBackTool,
+    ReloadPageTool, SelectDropdownTool, ScrollPageTool, DoubleClickTool, TextDeleteTool, ClickElementTool,
+    FillInputTool, BatchActionsTool, ExtractDataTool, ManageTabsTool, VisitPagesTool, new_run_id,
+)
+from src.agents.utils.config_cache import config_cache
+from src.agents.utils.tab_manager import TabManager
+
+TOOLS_CONFIG = os.path.join(os.path.dirname(os.path.dirname(__file__)), "config", "tools.yaml")
+
+# tools.yaml key -> tool class, in the order the executor agent lists them
+EXECUTOR_TOOLS = {
+    "goto_page_tool": GoToPageTool,
+    "take_screenshot_tool": TakeScreenshotTool,
+    "fetch_and_clean_html_tool": FetchAndCleanHTMLTool,
+    "hover_element_tool": HoverElementTool,
+    "get_current_url": GetCurrentURL,
+    "go_back_tool": GoBackTool,
+    "reload_page_tool": ReloadPageTool,
+    "select_dropdown_tool": SelectDropdownTool,
+    "scroll_page_tool": ScrollPageTool,
+    "double_click_tool": DoubleClickTool,
+    "text_delete_tool": TextDeleteTool,
+    "click_element_tool": ClickElementTool,
+    "fill_input_tool": FillInputTool,
+    "batch_actions_tool": BatchActionsTool,
+    "extract_data_tool": ExtractDataTool,
+    "manage_tabs_tool": ManageTabsTool,
+    "visit_pages_tool": VisitPagesTool,
+}
+
+
+class ToolRegistry:
+    """Hands every run its browser tools without validating them again.
+
+    Each tool is validated once per version of tools.yaml, which is also when
+    crewAI renders its description from the args schema. A run gets shallow
+    copies of these prototypes bound to its page, tabs and run id, with the other
+    fields that have a default factory (env settings) produced afresh, so a copy
+    starts out like a newly constructed tool. Every tool that writes files gets
+    the same run id, so one run's screenshots, extractions and visits share a
+    directory name.
+    """
+
+    def __init__(self, config_path: str = TOOLS_CONFIG, tool_classes: Dict[str, type[BaseTool]] = EXECUTOR_TOOLS):
+        self.config_path = config_path
+        self.tool_classes = tool_classes
+        self._lock = threading.Lock()
+        self._version = None
+        self._prototypes: Dict[str, BaseTool] = {}
+        self._metrics = {"builds": 0, "prototype_builds": 0}
+
+    def build(self, page: Page, tabs: Optional[TabManager] = None,
+              run_id: Optional[str] = None) -> Dict[str, BaseTool]:
+        """The run's tools by tools.yaml key, sharing run_id (a new one if not given)"""
+        run_id = run_id or new_run_id()
+        version = config_cache.version(self.config_path)
+        with self._lock:
+            if version != self._version:
+                self._prototypes = self._build_prototypes(page)
+                self._version = version
+                self._metrics["prototype_builds"] += 1
+            prototypes = self._prototypes
+            self._metrics["builds"] += 1
+        return {key: self._bind(prototype, page, tabs, run_id) for key, prototype in prototypes.items()}
+
+    def _build_prototypes(self, page: Page) -> Dict[str, BaseTool]:
+        tools_config = config_cache.load(self.config_path)
+        prototypes = {}
+        for key, tool_class in self.tool_classes.items():
+            # A real page is needed to pass validation; it is dropped right after
+            prototype = tool_class(name=tools_config[key]["name"], description=tools_config[key]["description"],
+                                   page=page)
+            prototype.page = None
+            prototypes[key] = prototype
+        return prototypes
+
+    @staticmethod
+    def _bind(prototype: BaseTool, page: Page, tabs: Optional[TabManager], run_id: str) -> BaseTool:
+        fields = type(prototype).model_fields
+        fresh = {name: field.default_factory() for name, field in fields.items()
+                 if field.default_factory is not None and name not in BaseTool.model_fields and name != "run_id"}
+        if "run_id" in fields:
+            fresh["run_id"] = run_id
+        return prototype.model_copy(update={**fresh, "page": page, "tabs": tabs})
+
+    def clear(self):
+        """Drop the prototypes; the next build validates every tool again"""
+        with self._lock:
+            self._version = None
+            self._prototypes = {}
+
+    def stats(self) -> dict:
+        return {"tools": len(self._prototypes), **self._metrics}
+
+
+tool_registry = ToolRegistry()
@@ -0,0 +1,195 @@
+from cryptography.fernet import Fernet, InvalidToken
+from dataclasses import dataclass, field, asdict
+from playwright.async_api import Page, Error as PlaywrightError
+from typing import Dict, List, Optional
+import base64
+import hashlib
+import json
+import os
+import re
+import time
+from src.agents.tools.page_scripts import PAGE_SIGNATURE_JS
+
+MODES = ("off", "record", "replay")
+
+# First line of a tool result that reports a failure: a missing or stale element, a
+# timeout, a browser error, a batch stopped part-way, or arguments the tool refused
+FAILED_RESULT = re.compile(
+    r"not found|no element found|stale|not in the last page snapshot|not an element id|provide an element_id"
+    r"|no valid option|\bfailed\b|\berror\b|timed out|timeout|^completed \d+ of \d+ actions|^invalid |^unknown ",
+    re.IGNORECASE)
+# Arguments of Fill Input, Select Dropdown and the fill/select actions of a batch that get typed into the page
+TYPED_ARGS = ("value", "option_value", "option_label")
+
+
+def normalize_request(user_request: str) -> str:
+    """'  Download yesterday's report from Portal X! ' -> "download yesterday's report from portal x" """
+    return re.sub(r"\s+", " ", user_request).strip().strip(".!?").strip().lower()
+
+
+def request_domain(user_request: str) -> str:
+    """First host named in the request, without www., or '' """
+    match = re.search(r"(?:https?://)?((?:[a-z0-9-]+\.)+[a-z]{2,})(?![a-z0-9-])", user_request.lower())
+    return match.group(1).removeprefix("www.") if match else ""
+
+
+async def page_fingerprint(page: Page) -> Dict:
+    """PAGE_SIGNATURE_JS of the page; just the URL while it is navigating or closed"""
+    try:
+        return await page.evaluate(PAGE_SIGNATURE_JS)
+    except PlaywrightError:
+        return {"location": re.sub(r"\d+", "#", re.sub(r"^\w+://", "", page.url).split("?")[0].split("#")[0]),
+                "controls": None, "structure": None}
+
+
+def fingerprints_match(current: Dict, recorded: Dict) -> bool:
+    if current["location"] != recorded["location"]:
+        return False
+    # A fingerprint taken mid-navigation has no structure to compare
+    return current["structure"] is None or recorded["structure"] is None or current["structure"] == recorded["structure"]
+
+
+def result_failed(result: str) -> bool:
+    lines = str(result).strip().splitlines()
+    return bool(lines) and FAILED_RESULT.search(lines[0]) is not None
+
+
+@dataclass
+class TraceStep:
+    tool: str
+    args: Dict
+    before: Dict
+    after: Dict
+    result: str
+
+    def typed_values(self) -> List[str]:
+        """Text the step types or selects on the page"""
+        values = [self.args[name] for name in TYPED_ARGS if name in self.args]
+        for action in self.args.get("actions") or []:
+            if isinstance(action, dict) and action.get("action") in ("fill", "select"):
+                values.extend(action[name] for name in TYPED_ARGS if name in action)
+        return [str(value) for value in values if value is not None]
+
+    def unchecked_value(self, user_request: str) -> Optional[str]:
+        """A typed value with digits the request doesn't spell out, e.g. a date or id.
+
+        Fingerprints mask digits, so the page can't tell whether such a value still
+        applies (yesterday's date, an order number read off the page); only values
+        written in the request itself are the same on every run of it.
+        """
+        return next((value for value in self.typed_values()
+                     if re.search(r"\d", value) and value not in user_request), None)
+
+
+@dataclass
+class ActionTrace:
+    request: str
+    domain: str
+    steps: List[TraceStep]
+    recorded_at: float = field(default_factory=time.time)
+
+    @classmethod
+    def from_dict(cls, data: Dict) -> "ActionTrace":
+        return cls(**{**data, "steps": [TraceStep(**step) for step in data["steps"]]})
+
+
+class TraceRecorder:
+    """Collects a run's tool calls with the page fingerprint before and after each.
+
+    Set as `recorder` on the run's browser tools, which pass every call through
+    record() on the browser loop.
+    """
+
+    def __init__(self):
+        self.steps: List[TraceStep] = []
+        # Only keyword calls can be replayed; crewAI never passes positional args
+        self.replayable = True
+
+    async def record(self, tool, args: tuple, kwargs: Dict, call):
+        if args:
+            self.replayable = False
+        before = await page_fingerprint(tool.page)
+        result = await call
+        after = await page_fingerprint(tool.tabs.page if tool.tabs is not None else tool.page)
+        self.steps.append(TraceStep(tool=tool.name, args=kwargs, before=before, after=after, result=str(result)[:500]))
+        return result
+
+
+class TraceStore:
+    """Encrypted on-disk action traces of successful runs, per user and request.
+
+    A trace is keyed by the user, the normalized request and the domain it names,
+    and is a Fernet token like the storage state cache's entries: the recorded
+    steps hold whatever the agent typed, passwords included, so without TRACE_KEY
+    (or SECRET_KEY) nothing is recorded. Like the storage state cache, traces are
+    only kept for authenticated users; anonymous runs would all share one key.
+    Opt-in: TRACE_MODE is "off" unless set to "record" or "replay" (record and
+    replay); Fernet's timestamp gives the TRACE_TTL.
+    """
+
+    def __init__(self, trace_dir: str | None = None, mode: str | None = None, ttl: int | None = None):
+        self.trace_dir = trace_dir or os.getenv("TRACE_DIR", ".traces")
+        self.mode = mode or os.getenv("TRACE_MODE", "off")
+        if self.mode not in MODES:
+            raise ValueError(f"Unknown TRACE_MODE '{self.mode}', expected one of {list(MODES)}")
+        self.ttl = ttl or int(os.getenv("TRACE_TTL", str(30 * 24 * 3600)))
+        key = os.getenv("TRACE_KEY")
+        if not key and os.getenv("SECRET_KEY"):
+            key = base64.urlsafe_b64encode(hashlib.sha256(b"traces:" + os.getenv("SECRET_KEY").encode()).digest())
+        self.fernet = Fernet(key) if key else None
+        self._metrics = {"recorded": 0, "replayed": 0, "diverged": 0, "expired": 0}
+
+    @property
+    def recording(self) -> bool:
+        return self.fernet is not None and self.mode != "off"
+
+    @property
+    def replaying(self) -> bool:
+        return self.fernet is not None and self.mode == "replay"
+
+    def _path(self, user_request: str, user_id: str) -> str:
+        key = f"{user_id}\n{request_domain(user_request)}\n{normalize_request(user_request)}"
+        return os.path.join(self.trace_dir, hashlib.sha256(key.encode()).hexdigest()[:32])
+
+    def load(self, user_request: str, user_id: str | None) -> Optional[ActionTrace]:
+        if not self.replaying or not user_id:
+            return None
+        path = self._path(user_request, user_id)
+        if not os.path.exists(path):
+            return None
+        try:
+            with open(path, "rb") as f:
+                return ActionTrace.from_dict(json.loads(self.fernet.decrypt(f.read(), ttl=self.ttl)))
+        except InvalidToken:
+            # Expired or written with another key
+            self._metrics["expired"] += 1
+            os.remove(path)
+        except (OSError, ValueError, TypeError, KeyError):
+            pass
+        return None
+
+    def save(self, user_request: str, user_id: str | None, recorder: TraceRecorder):
+        if not self.recording or not user_id or not recorder.replayable or not recorder.steps:
+            return
+        domain = request_domain(user_request) or next(
+            (step.after["location"].split("/")[0] for step in recorder.steps if step.after["location"]), "")
+        trace = ActionTrace(request=user_request, domain=domain, steps=recorder.steps)
+        os.makedirs(self.trace_dir, mode=0o700, exist_ok=True)
+        path = self._path(user_request, user_id)
+        with open(f"{path}.tmp", "wb") as f:
+            f.write(self.fernet.encrypt(json.dumps(asdict(trace)).encode()))
+        os.replace(f"{path}.tmp", path)
+        self._metrics["recorded"] += 1
+
+    def count_replay(self, diverged: bool):
+        self._metrics["diverged" if diverged else "replayed"] += 1
+
+    def stats(self) -> dict:
+        if self.mode == "off":
+            mode = "off (set TRACE_MODE to record or replay)"
+        else:
+            mode = self.mode if self.fernet else "off (no TRACE_KEY/SECRET_KEY)"
+        return {"mode": mode, **self._metrics}
+
+
+trace_store = TraceStore()
@@ -0,0 +1,114 @@
+from contextlib import asynccontextmanager
+from typing import Any, Coroutine
+import asyncio
+import concurrent.futures
+import threading
+import time
+
+
+class BrowserLoop:
+    """Event loop thread that owns Playwright and everything bound to it.
+
+    Playwright objects only work on the loop that created them, while crewAI runs
+    tools synchronously on the crew's thread. The browser pool is started on this
+    loop, crews run in worker threads, and tools hand their coroutines over with
+    call(). Async code on other loops (the FastAPI server, a farm worker) uses
+    run() and bridge(). That way a multi-minute crew run never blocks the server's
+    loop, and several runs can share the browser at once.
+    """
+
+    def __init__(self):
+        self._loop: asyncio.AbstractEventLoop | None = None
+        self._thread: threading.Thread | None = None
+        self._lock = threading.Lock()
+        # Calls are submitted from crew threads and finish on the loop thread
+        self._metrics_lock = threading.Lock()
+        self._metrics = {"calls": 0, "in_flight": 0, "call_time_total": 0.0, "call_time_max": 0.0}
+
+    def start(self) -> asyncio.AbstractEventLoop:
+        with self._lock:
+            if self._loop is None or not self._thread.is_alive():
+                loop = asyncio.new_event_loop()
+                ready = threading.Event()
+                thread = threading.Thread(target=self._serve, args=(loop, ready), name="browser-loop", daemon=True)
+                thread.start()
+                ready.wait()
+                self._loop, self._thread = loop, thread
+        return self._loop
+
+    @staticmethod
+    def _serve(loop: asyncio.AbstractEventLoop, ready: threading.Event):
+        asyncio.set_event_loop(loop)
+        loop.call_soon(ready.set)
+        loop.run_forever()
+
+    def in_loop(self) -> bool:
+        return self._thread is not None and threading.get_ident() == self._thread.ident
+
+    def submit(self, coro: Coroutine) -> concurrent.futures.Future:
+        """Schedule coro on the browser loop from any thread"""
+        loop = self.start()
+        with self._metrics_lock:
+            self._metrics["calls"] += 1
+            self._metrics["in_flight"] += 1
+        started = time.monotonic()
+        future = asyncio.run_coroutine_threadsafe(coro, loop)
+        future.add_done_callback(lambda _: self._finished(started))
+        return future
+
+    def _finished(self, started: float):
+        elapsed = time.monotonic() - started
+        with self._metrics_lock:
+            self._metrics["in_flight"] -= 1
+            self._metrics["call_time_total"] += elapsed
+            self._metrics["call_time_max"] = max(self._metrics["call_time_max"], elapsed)
+
+    def call(self, coro: Coroutine, timeout: float | None = None) -> Any:
+        """Run coro on the browser loop and block the calling thread until it finishes"""
+        if self.in_loop():
+            coro.close()
+            raise RuntimeError("BrowserLoop.call() would deadlock on the browser loop itself; await the coroutine instead")
+        return self.submit(coro).result(timeout)
+
+    async def run(self, coro: Coroutine) -> Any:
+        """Await coro on the browser loop from another event loop"""
+        if self.in_loop():
+            return await coro
+        return await asyncio.wrap_future(self.submit(coro))
+
+    @asynccontextmanager
+    async def bridge(self, manager):
+        """Enter and exit an async context manager on the browser loop, e.g. browser_manager.lease()"""
+        value = await self.run(manager.__aenter__())
+        try:
+            yield value
+        except BaseException as e:
+            if not await self.run(manager.__aexit__(type(e), e, e.__traceback__)):
+                raise
+        else:
+            await self.run(manager.__aexit__(None, None, None))
+
+    def stop(self, timeout: float = 10):
+        with self._lock:
+            loop, thread = self._loop, self._thread
+            self._loop = self._thread = None
+        if loop is None:
+            return
+        loop.call_soon_threadsafe(loop.stop)
+        thread.join(timeout)
+        if not thread.is_alive():
+            loop.close()
+
+    def stats(self) -> dict:
+        calls = self._metrics["calls"]
+        done = calls - self._metrics["in_flight"]
+        return {
+            "running": self._thread is not None and self._thread.is_alive(),
+            "calls": calls,
+            "in_flight": self._metrics["in_flight"],
+            "call_time_avg": self._metrics["call_time_total"] / done if done else 0.0,
+            "call_time_max": self._metrics["call_time_max"],
+        }
+
+
+browser_loop = BrowserLoop()
@@ -1,30 +1,398 @@
-from playwright.async_api import async_playwright, Page, Browser
+from playwright.async_api import async_playwright, Page, Browser, BrowserContext
+from src.agents.utils.resource_blocker import ResourceBlocker
+from src.agents.utils.storage_state_cache import StorageStateCache
+from contextlib import asynccontextmanager
+from dataclasses import dataclass, field
+import asyncio
+import os
+import time
 import traceback
+import uuid
+
+
+@dataclass
+class BrowserLease:
+    """An isolated context/page handed out to a single run"""
+    context: BrowserContext
+    page: Page
+    browser: Browser
+    wait_time: float
+    blocker: ResourceBlocker | None = None
+    user_id: str | None = None
+    # Sites the context navigated to, recorded for the storage state cache
+    visited_sites: set[str] = field(default_factory=set)
+    acquired_at: float = field(default_factory=time.monotonic)
+
+
+def _find_process(marker: str) -> int | None:
+    """Pid of the outermost process whose command line contains marker (Linux only, via /proc)"""
+    try:
+        entries = [entry for entry in os.listdir("/proc") if entry.isdigit()]
+    except OSError:
+        return None
+    marked = {}
+    for entry in entries:
+        try:
+            with open(f"/proc/{entry}/cmdline", "rb") as f:
+                if marker.encode() not in f.read():
+                    continue
+            with open(f"/proc/{entry}/stat") as f:
+                stat = f.read()
+        except OSError:
+            continue
+        marked[int(entry)] = int(stat[stat.rfind(")") + 2:].split()[1])
+    return next((pid for pid, ppid in marked.items() if ppid not in marked), None)
+
+
+def _process_tree_rss_mb(root_pid: int) -> float | None:
+    """Sum the RSS of root_pid and every descendant (Linux only, via /proc)"""
+    try:
+        children: dict[int, list[int]] = {}
+        rss_pages: dict[int, int] = {}
+        for entry in os.listdir("/proc"):
+            if not entry.isdigit():
+                continue
+            try:
+                with open(f"/proc/{entry}/stat") as f:
+                    stat = f.read()
+            except OSError:
+                continue
+            # comm may contain spaces, the fields we need come after the closing paren
+            fields = stat[stat.rfind(")") + 2:].split()
+            pid = int(entry)
+            children.setdefault(int(fields[1]), []).append(pid)
+            rss_pages[pid] = int(fields[21])
+    except OSError:
+        return None
+    if root_pid not in rss_pages:
+        return None
+
+    total = 0
+    stack = [root_pid]
+    while stack:
+        pid = stack.pop()
+        total += rss_pages.get(pid, 0)
+        stack.extend(children.get(pid, []))
+    return total * os.sysconf("SC_PAGE_SIZE") / (1024 * 1024)
+
 
 class BrowserManager:
-    
-    def __init__(self):
+    """Process-wide Chromium pool.
+
+    Chromium is launched once (from the FastAPI lifespan) and every run leases
+    its own BrowserContext, so runs stay isolated without paying a cold start.
+    A few contexts are kept pre-warmed, a background probe checks their health,
+    and the browser is recycled after `recycle_after` leases or once its
+    process tree grows past `rss_limit_mb`. Leases taken for a user start with
+    that user's cached cookies/localStorage and save them back on release.
+    """
+
+    def __init__(self, pool_size: int | None = None, headless: bool | None = None,
+                 warm_size: int | None = None, recycle_after: int | None = None,
+                 rss_limit_mb: float | None = None, health_interval: float | None = None):
         self.p = None
         self.browser: Browser | None = None
-        self.page: Page | None = None
+        self.pool_size = pool_size or int(os.getenv("BROWSER_POOL_SIZE", "4"))
+        if headless is None:
+            headless = os.getenv("BROWSER_HEADLESS", "false").lower() == "true"
+        self.headless = headless
+        self.warm_size = warm_size if warm_size is not None else int(os.getenv("BROWSER_WARM_CONTEXTS", "2"))
+        self.recycle_after = recycle_after or int(os.getenv("BROWSER_RECYCLE_AFTER", "50"))
+        self.rss_limit_mb = rss_limit_mb or float(os.getenv("BROWSER_RSS_LIMIT_MB", "1500"))
+        self.health_interval = health_interval or float(os.getenv("BROWSER_HEALTH_INTERVAL", "30"))
+        self.viewport = {
+            "width": int(os.getenv("BROWSER_VIEWPORT_WIDTH", "1280")),
+            "height": int(os.getenv("BROWSER_VIEWPORT_HEIGHT", "720")),
+        }
+        self._slots: asyncio.Semaphore | None = None
+        self._start_lock: asyncio.Lock | None = None
+        self._recycle_lock: asyncio.Lock | None = None
+        self._leases: dict[int, BrowserLease] = {}
+        self._warm: list[tuple[BrowserContext, Page]] = []
+        self._filling = False
+        self._fill_task: asyncio.Task | None = None
+        self._retiring: list[Browser] = []
+        self._browser_leases = 0
+        self._browser_pid: int | None = None
+        self._health_task: asyncio.Task | None = None
+        self.storage_cache = StorageStateCache()
+        self._metrics = {
+            "leases_total": 0,
+            "warm_hits": 0,
+            "wait_time_total": 0.0,
+            "wait_time_max": 0.0,
+            "lease_duration_total": 0.0,
+            "lease_duration_max": 0.0,
+            "recycles": 0,
+            "health_failures": 0,
+            "rss_mb": None,
+            "blocked_requests": 0,
+            "allowed_requests": 0,
+            "transferred_bytes": 0,
+        }
+
+    async def start(self) -> Browser:
+        if self._start_lock is None:
+            self._start_lock = asyncio.Lock()
+            self._recycle_lock = asyncio.Lock()
+        async with self._start_lock:
+            if self.browser and self.browser.is_connected():
+                return self.browser
+            try:
+                if self.p is None:
+                    self.p = await async_playwright().start()
+                self.browser = await self._launch()
+                # Kept across restarts: leases from before a crash release into it
+                if self._slots is None:
+                    self._slots = asyncio.Semaphore(self.pool_size)
+            except Exception as e:
+                traceback.print_exc()  # This prints the real error to console
+                await self.close()
+                raise RuntimeError(f"Failed to start browser session {e}") from e
+
+        await self._fill_warm()
+        if self._health_task is None or self._health_task.done():
+            self._health_task = asyncio.create_task(self._health_loop())
+        print(f"Browser pool started (size={self.pool_size}, warm={self.warm_size}, headless={self.headless}).")
+        return self.browser
+
+    async def _launch(self) -> Browser:
+        # Chromium ignores unknown switches; this one lets the health check find
+        # this browser's process tree and not the driver's or a retiring browser's
+        marker = f"--browser-pool-instance={uuid.uuid4().hex}"
+        browser = await self.p.chromium.launch(headless=self.headless, args=[marker])
+        self._browser_leases = 0
+        self._browser_pid = _find_process(marker)
+        return browser
+
+    async def _new_context(self, browser: Browser) -> tuple[BrowserContext, Page]:
+        context = await browser.new_context(viewport=self.viewport)
+        page = await context.new_page()
+        return context, page
 
-    async def start(self) -> Page:
+    async def _fill_warm(self):
+        if self._filling:
+            return
+        self._filling = True
         try:
-            self.p = await async_playwright().start()
-            self.browser = await self.p.chromium.launch(headless=False)
-            self.page = await self.browser.new_page()
+            while len(self._warm) < self.warm_size and self.browser and self.browser.is_connected():
+                browser = self.browser
+                context, page = await self._new_context(browser)
+                if browser is not self.browser:
+                    # Recycled (or closed) meanwhile: this context belongs to a retiring browser
+                    try:
+                        await context.close()
+                    except Exception:
+                        pass
+                    continue
+                self._warm.append((context, page))
         except Exception as e:
-            traceback.print_exc()  # This prints the real error to console
-            await self.close()
-            raise RuntimeError(f"Failed to start browser session {e}") from e
-        return self.page
+            print(f"Failed to pre-warm browser context: {e}")
+        finally:
+            self._filling = False
+
+    async def _take_context(self) -> tuple[Browser, BrowserContext, Page]:
+        """A context and its page, with the browser it belongs to"""
+        while self._warm:
+            context, page = self._warm.pop(0)
+            if not page.is_closed():
+                self._metrics["warm_hits"] += 1
+                # _recycle empties the warm list, so these are always the current browser's
+                return self.browser, context, page
+        # Taken before the await: a recycle meanwhile must not retire this context's browser under it
+        browser = self.browser
+        context, page = await self._new_context(browser)
+        return browser, context, page
+
+    async def acquire(self, profile: str | None = None, user_id: str | None = None) -> BrowserLease:
+        if not (self.browser and self.browser.is_connected()):
+            await self.start()
+
+        requested_at = time.monotonic()
+        await self._slots.acquire()
+        wait_time = time.monotonic() - requested_at
+
+        try:
+            if self._browser_leases >= self.recycle_after:
+                await self._recycle(f"served {self._browser_leases} leases", self.browser)
+            browser, context, page = await self._take_context()
+            blocker = ResourceBlocker(profile)
+            await blocker.attach(context)
+            visited_sites = set()
+            if user_id and self.storage_cache.enabled:
+                visited_sites = await self.storage_cache.restore_into(context, user_id)
+        except Exception as e:
+            self._slots.release()
+            raise RuntimeError(f"Failed to lease browser context {e}") from e
+
+        lease = BrowserLease(context=context, page=page, browser=browser,
+                             wait_time=wait_time, blocker=blocker, user_id=user_id, visited_sites=visited_sites)
+        self._leases[id(lease)] = lease
+        self._browser_leases += 1
+        self._metrics["leases_total"] += 1
+        self._metrics["wait_time_total"] += wait_time
+        self._metrics["wait_time_max"] = max(self._metrics["wait_time_max"], wait_time)
+        if self._fill_task is None or self._fill_task.done():
+            # Held so the task isn't garbage-collected before it finishes
+            self._fill_task = asyncio.create_task(self._fill_warm())
+        return lease
+
+    async def release(self, lease: BrowserLease):
+        if self._leases.pop(id(lease), None) is None:
+            return
+        duration = time.monotonic() - lease.acquired_at
+        self._metrics["lease_duration_total"] += duration
+        self._metrics["lease_duration_max"] = max(self._metrics["lease_duration_max"], duration)
+        if lease.blocker:
+            for key in ("blocked_requests", "allowed_requests", "transferred_bytes"):
+                self._metrics[key] += lease.blocker.stats[key]
+        if lease.user_id and self.storage_cache.enabled:
+            try:
+                await self.storage_cache.save_from(lease.context, lease.user_id, lease.visited_sites)
+            except Exception as e:
+                print(f"Failed to cache storage state: {e}")
+        try:
+            await lease.context.close()
+        except Exception as e:
+            print(f"Failed to close browser context: {e}")
+        finally:
+            if self._slots:
+                self._slots.release()
+        await self._close_retired()
+
+    @asynccontextmanager
+    async def lease(self, profile: str | None = None, user_id: str | None = None):
+        lease = await self.acquire(profile, user_id)
+        try:
+            yield lease
+        finally:
+            await self.release(lease)
+
+    async def _recycle(self, reason: str, browser: Browser | None):
+        """Swap a fresh Chromium in for browser; the old one closes once its leases are returned"""
+        async with self._recycle_lock:
+            # Another caller got the lock first and already replaced it
+            if browser is not self.browser:
+                return
+            print(f"Recycling browser: {reason}")
+            old_browser = self.browser
+            old_warm, self._warm = self._warm, []
+            self.browser = await self._launch()
+            self._metrics["recycles"] += 1
+            for context, _ in old_warm:
+                try:
+                    await context.close()
+                except Exception:
+                    pass
+            if old_browser:
+                self._retiring.append(old_browser)
+            await self._close_retired()
+        await self._fill_warm()
+
+    async def _close_retired(self):
+        in_use = {id(lease.browser) for lease in self._leases.values()}
+        for browser in list(self._retiring):
+            if id(browser) in in_use:
+                continue
+            self._retiring.remove(browser)
+            try:
+                await browser.close()
+            except Exception as e:
+                print(f"Failed to close retired browser: {e}")
+
+    async def _probe(self, page: Page) -> bool:
+        try:
+            await asyncio.wait_for(page.evaluate("1"), timeout=5)
+            return True
+        except Exception:
+            return False
+
+    async def _health_loop(self):
+        while True:
+            await asyncio.sleep(self.health_interval)
+            try:
+                await self.check_health()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                print(f"Browser health check failed: {e}")
+
+    async def check_health(self):
+        if not (self.browser and self.browser.is_connected()):
+            self._metrics["health_failures"] += 1
+            await self._recycle("browser disconnected", self.browser)
+            return
+
+        healthy = []
+        for context, page in self._warm:
+            if not page.is_closed() and await self._probe(page):
+                healthy.append((context, page))
+                continue
+            self._metrics["health_failures"] += 1
+            try:
+                await context.close()
+            except Exception:
+                pass
+        self._warm = healthy
+
+        rss_mb = _process_tree_rss_mb(self._browser_pid) if self._browser_pid else None
+        self._metrics["rss_mb"] = rss_mb
+        if rss_mb is not None and rss_mb > self.rss_limit_mb and not self._recycle_lock.locked():
+            await self._recycle(f"RSS {rss_mb:.0f}MB over {self.rss_limit_mb:.0f}MB", self.browser)
+            return
+
+        await self._fill_warm()
+
+    def stats(self) -> dict:
+        leases_total = self._metrics["leases_total"]
+        completed = leases_total - len(self._leases)
+        return {
+            "pool_size": self.pool_size,
+            "in_use": len(self._leases),
+            "available": self.pool_size - len(self._leases),
+            "warm_contexts": len(self._warm),
+            "browser_connected": bool(self.browser and self.browser.is_connected()),
+            "browser_leases": self._browser_leases,
+            "retiring_browsers": len(self._retiring),
+            "leases_total": leases_total,
+            "warm_hits": self._metrics["warm_hits"],
+            "wait_time_avg": self._metrics["wait_time_total"] / leases_total if leases_total else 0.0,
+            "wait_time_max": self._metrics["wait_time_max"],
+            "lease_duration_avg": self._metrics["lease_duration_total"] / completed if completed else 0.0,
+            "lease_duration_max": self._metrics["lease_duration_max"],
+            "recycles": self._metrics["recycles"],
+            "health_failures": self._metrics["health_failures"],
+            "rss_mb": self._metrics["rss_mb"],
+            "blocked_requests": self._metrics["blocked_requests"],
+            "allowed_requests": self._metrics["allowed_requests"],
+            "transferred_bytes": self._metrics["transferred_bytes"],
+            "storage_state": self.storage_cache.stats,
+        }
 
     async def close(self):
+        if self._health_task:
+            self._health_task.cancel()
+            self._health_task = None
+        if self._fill_task:
+            self._fill_task.cancel()
+            self._fill_task = None
+        self._warm = []
+        for browser in self._retiring:
+            try:
+                await browser.close()
+            except Exception:
+                pass
+        self._retiring = []
         if self.browser:
             await self.browser.close()
             self.browser = None
         if self.p:
             await self.p.stop()
             self.p = None
-        self.page = None
-        print("Browser session closed.")
\ No newline at end of file
+        # Outstanding leases still return their slot when released
+        if not self._leases:
+            self._slots = None
+        print("Browser session closed.")
+
+
+browser_manager = BrowserManager()
@@ -0,0 +1,62 @@
+from pathlib import Path
+import os
+import threading
+import yaml
+
+
+def _copy(value):
+    """Copy of a parsed YAML document; only dicts and lists can be mutated"""
+    if isinstance(value, dict):
+        return {key: _copy(item) for key, item in value.items()}
+    if isinstance(value, list):
+        return [_copy(item) for item in value]
+    return value
+
+
+class ConfigCache:
+    """Parses each YAML config file once per process.
+
+    A file is parsed again when its mtime or size changes, so edits to the
+    prompts are picked up without a restart. Callers get their own copy, because
+    crewAI writes agent and task objects back into the config dicts it is given.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        # path -> (mtime_ns, size, parsed document)
+        self._entries: dict[str, tuple[int, int, object]] = {}
+        self._metrics = {"hits": 0, "loads": 0}
+
+    def load(self, path: str | os.PathLike):
+        """The parsed contents of path"""
+        return _copy(self._parsed(path)[1])
+
+    def version(self, path: str | os.PathLike) -> tuple[int, int]:
+        """Changes whenever the file is parsed again"""
+        return self._parsed(path)[0]
+
+    def _parsed(self, path) -> tuple[tuple[int, int], object]:
+        path = str(Path(path).resolve())
+        stat = os.stat(path)
+        key = (stat.st_mtime_ns, stat.st_size)
+        with self._lock:
+            entry = self._entries.get(path)
+            if entry and entry[:2] == key:
+                self._metrics["hits"] += 1
+                return key, entry[2]
+        with open(path, "r", encoding="utf-8") as file:
+            document = yaml.safe_load(file)
+        with self._lock:
+            self._entries[path] = (*key, document)
+            self._metrics["loads"] += 1
+        return key, document
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> dict:
+        return {"files": len(self._entries), **self._metrics}
+
+
+config_cache = ConfigCache()
@@ -0,0 +1,98 @@
+from playwright.async_api import Route, Request, Response
+from urllib.parse import urlparse
+import os
+
+# "full" is the default: screenshots and the visual tools need the page as the user
+# sees it. The other profiles are opt-in (BROWSER_BLOCK_PROFILE) for text-only
+# deployments, where FetchAndCleanHTMLTool drops images and media anyway.
+# Stylesheets are always let through because visibility and the x/y/w/h positions
+# the cleaner reports depend on layout.
+RESOURCE_PROFILES = {
+    "full": {
+        "block_types": set(),
+        "block_trackers": False,
+    },
+    "no-media": {
+        "block_types": {"image", "media"},
+        "block_trackers": False,
+    },
+    "minimal": {
+        "block_types": {"image", "media", "font", "texttrack", "manifest"},
+        "block_trackers": True,
+    },
+}
+
+TRACKER_DOMAINS = {
+    "google-analytics.com", "googletagmanager.com", "doubleclick.net",
+    "googlesyndication.com", "adservice.google.com", "facebook.net",
+    "connect.facebook.net", "hotjar.com", "segment.io", "segment.com",
+    "mixpanel.com", "scorecardresearch.com", "quantserve.com", "criteo.com",
+    "taboola.com", "outbrain.com", "newrelic.com", "nr-data.net",
+}
+
+
+def _domains_from_env(name: str) -> set[str]:
+    return {d.strip().lower() for d in os.getenv(name, "").split(",") if d.strip()}
+
+
+def _matches(host: str, domains: set[str]) -> bool:
+    """True if host is one of domains or a subdomain of one"""
+    parts = host.split(".")
+    return any(".".join(parts[i:]) in domains for i in range(len(parts)))
+
+
+class ResourceBlocker:
+    """Route handler that aborts requests the agent has no use for.
+
+    Allow-listed domains are never blocked, deny-listed domains always are,
+    everything else is decided by the profile's resource types.
+    """
+
+    def __init__(self, profile: str | None = None, allow_domains: set[str] | None = None,
+                 deny_domains: set[str] | None = None):
+        profile = profile or os.getenv("BROWSER_BLOCK_PROFILE", "full")
+        if profile not in RESOURCE_PROFILES:
+            raise ValueError(f"Unknown resource profile '{profile}', expected one of {list(RESOURCE_PROFILES)}")
+        self.profile = profile
+        self.block_types = RESOURCE_PROFILES[profile]["block_types"]
+        self.allow_domains = allow_domains if allow_domains is not None else _domains_from_env("BROWSER_BLOCK_ALLOW_DOMAINS")
+        self.deny_domains = deny_domains if deny_domains is not None else _domains_from_env("BROWSER_BLOCK_DENY_DOMAINS")
+        if RESOURCE_PROFILES[profile]["block_trackers"]:
+            self.deny_domains = self.deny_domains | TRACKER_DOMAINS
+        self.stats = {
+            "profile": profile,
+            "allowed_requests": 0,
+            "blocked_requests": 0,
+            "blocked_by_type": {},
+            "transferred_bytes": 0,
+        }
+
+    def should_block(self, url: str, resource_type: str) -> bool:
+        host = (urlparse(url).hostname or "").lower()
+        if host and _matches(host, self.allow_domains):
+            return False
+        if host and _matches(host, self.deny_domains):
+            return True
+        return resource_type in self.block_types
+
+    async def handle(self, route: Route, request: Request):
+        if self.should_block(request.url, request.resource_type):
+            self.stats["blocked_requests"] += 1
+            by_type = self.stats["blocked_by_type"]
+            by_type[request.resource_type] = by_type.get(request.resource_type, 0) + 1
+            await route.abort("blockedbyclient")
+            return
+        self.stats["allowed_requests"] += 1
+        await route.continue_()
+
+    def on_response(self, response: Response):
+        # Aborted requests never download, so only the allowed side has a byte count
+        try:
+            self.stats["transferred_bytes"] += int(response.headers.get("content-length", 0))
+        except (TypeError, ValueError):
+            pass
+
+    async def attach(self, context):
+        if self.block_types or self.deny_domains:
+            await context.route("**/*", self.handle)
+        context.on("response", self.on_response)
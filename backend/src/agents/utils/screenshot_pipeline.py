@@ -0,0 +1,150 @@
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, asdict
+from PIL import Image
+from playwright.async_api import Page
+import asyncio
+import hashlib
+import io
+import json
+import os
+import threading
+import time
+
+FORMATS = {"jpeg": ("JPEG", ".jpg"), "webp": ("WEBP", ".webp"), "png": ("PNG", ".png")}
+# Runs whose frames are remembered for dedupe; older runs are forgotten, their files stay
+TRACKED_RUNS = 64
+
+
+@dataclass
+class Screenshot:
+    """Where a capture ended up and what it cost"""
+    handle: str
+    format: str
+    width: int
+    height: int
+    bytes: int
+    raw_bytes: int
+    capture_ms: float
+    encode_ms: float
+    reused: bool = False
+
+
+class ScreenshotPipeline:
+    """Captures screenshots to memory and encodes them off the event loop.
+
+    Chromium returns a PNG, which a worker thread hashes, scales and re-encodes as
+    JPEG/WebP before writing it under <SCREENSHOT_DIR>/<run_id>/, named after the
+    hash of the encoded bytes. A frame whose PNG is byte-identical to one already
+    taken in the same run (same pixels) is not decoded or encoded again; the earlier
+    file is returned instead.
+    """
+
+    def __init__(self, base_dir: str | None = None, image_format: str | None = None,
+                 quality: int | None = None, scale: float | None = None, workers: int | None = None):
+        self.base_dir = base_dir or os.getenv("SCREENSHOT_DIR", "screenshots")
+        self.format = image_format or os.getenv("SCREENSHOT_FORMAT", "jpeg")
+        if self.format not in FORMATS:
+            raise ValueError(f"Unknown screenshot format '{self.format}', expected one of {list(FORMATS)}")
+        self.quality = quality or int(os.getenv("SCREENSHOT_QUALITY", "70"))
+        self.scale = scale or float(os.getenv("SCREENSHOT_SCALE", "1.0"))
+        self._executor = ThreadPoolExecutor(max_workers=workers or int(os.getenv("SCREENSHOT_WORKERS", "2")),
+                                            thread_name_prefix="screenshot")
+        self._lock = threading.Lock()
+        # run_id -> {hash of the raw PNG + encoding options: Screenshot}, least recently used run first
+        self._frames: OrderedDict[str, dict[str, Screenshot]] = OrderedDict()
+        self._metrics = {"captures": 0, "reused": 0, "raw_bytes": 0, "written_bytes": 0,
+                         "capture_ms": 0.0, "encode_ms": 0.0}
+
+    async def capture(self, page: Page, run_id: str, label: str | None = None, full_page: bool = False,
+                      image_format: str | None = None, quality: int | None = None,
+                      scale: float | None = None) -> Screenshot:
+        image_format = image_format or self.format
+        if image_format not in FORMATS:
+            raise ValueError(f"Unknown screenshot format '{image_format}', expected one of {list(FORMATS)}")
+        start = time.perf_counter()
+        raw = await page.screenshot(type="png", full_page=full_page)
+        capture_ms = (time.perf_counter() - start) * 1000
+
+        loop = asyncio.get_running_loop()
+        shot = await loop.run_in_executor(
+            self._executor, self._store, raw, run_id, label, image_format,
+            quality or self.quality, scale or self.scale, capture_ms)
+
+        self._metrics["captures"] += 1
+        self._metrics["capture_ms"] += capture_ms
+        self._metrics["raw_bytes"] += len(raw)
+        if shot.reused:
+            self._metrics["reused"] += 1
+        else:
+            self._metrics["encode_ms"] += shot.encode_ms
+            self._metrics["written_bytes"] += shot.bytes
+        return shot
+
+    def _store(self, raw: bytes, run_id: str, label: str | None, image_format: str, quality: int,
+               scale: float, capture_ms: float) -> Screenshot:
+        """Runs on the pool: dedupe, encode, write"""
+        frame_key = f"{hashlib.blake2b(raw, digest_size=16).hexdigest()}:{image_format}:{quality}:{scale}"
+        with self._lock:
+            previous = self._frames.get(run_id, {}).get(frame_key)
+        if previous:
+            shot = Screenshot(**{**asdict(previous), "capture_ms": capture_ms, "encode_ms": 0.0, "reused": True})
+            self._index(run_id, label, shot)
+            return shot
+
+        start = time.perf_counter()
+        image = Image.open(io.BytesIO(raw))
+        if scale != 1.0:
+            image = image.resize((max(1, round(image.width * scale)), max(1, round(image.height * scale))),
+                                 Image.Resampling.LANCZOS)
+        pil_format, extension = FORMATS[image_format]
+        if pil_format == "JPEG":
+            image = image.convert("RGB")
+        buffer = io.BytesIO()
+        if pil_format == "PNG":
+            image.save(buffer, pil_format, optimize=True)
+        else:
+            image.save(buffer, pil_format, quality=quality)
+        data = buffer.getvalue()
+
+        run_dir = os.path.join(self.base_dir, run_id)
+        os.makedirs(run_dir, exist_ok=True)
+        path = os.path.join(run_dir, hashlib.sha256(data).hexdigest()[:20] + extension)
+        if not os.path.exists(path):
+            with open(path, "wb") as f:
+                f.write(data)
+        shot = Screenshot(handle=path, format=image_format, width=image.width, height=image.height,
+                          bytes=len(data), raw_bytes=len(raw), capture_ms=capture_ms,
+                          encode_ms=(time.perf_counter() - start) * 1000)
+        with self._lock:
+            self._frames.setdefault(run_id, {})[frame_key] = shot
+            self._frames.move_to_end(run_id)
+            while len(self._frames) > TRACKED_RUNS:
+                self._frames.popitem(last=False)
+        self._index(run_id, label, shot)
+        return shot
+
+    def _index(self, run_id: str, label: str | None, shot: Screenshot):
+        """Append the label -> file mapping to the run's index.jsonl"""
+        run_dir = os.path.join(self.base_dir, run_id)
+        os.makedirs(run_dir, exist_ok=True)
+        with open(os.path.join(run_dir, "index.jsonl"), "a") as f:
+            f.write(json.dumps({"label": label, "time": time.time(), **asdict(shot)}) + "\n")
+
+    def stats(self) -> dict:
+        captures = self._metrics["captures"]
+        encoded = captures - self._metrics["reused"]
+        return {
+            "format": self.format,
+            "quality": self.quality,
+            "scale": self.scale,
+            "captures": captures,
+            "reused": self._metrics["reused"],
+            "raw_bytes": self._metrics["raw_bytes"],
+            "written_bytes": self._metrics["written_bytes"],
+            "avg_capture_ms": round(self._metrics["capture_ms"] / captures, 1) if captures else 0.0,
+            "avg_encode_ms": round(self._metrics["encode_ms"] / encoded, 1) if encoded else 0.0,
+        }
+
+
+screenshot_pipeline = ScreenshotPipeline()
@@ -0,0 +1,191 @@
+from cryptography.fernet import Fernet, InvalidToken
+from typing import Iterable
+from urllib.parse import urlparse
+import asyncio
+import base64
+import hashlib
+import json
+import os
+import threading
+
+
+def _site(host: str) -> str:
+    """Full host of a cookie domain or origin (.github.com -> github.com).
+
+    Not collapsed any further: without a public suffix list, bbc.co.uk and
+    amazon.co.uk (or two *.github.io pages) would end up in the same entry.
+    """
+    return host.lstrip(".").lower()
+
+
+def _digest(value: str) -> str:
+    return hashlib.sha256(value.encode()).hexdigest()[:32]
+
+
+class StorageStateCache:
+    """Encrypted on-disk cache of Playwright storage state per user and site.
+
+    Every (user, host) entry is a Fernet token holding that host's cookies and
+    localStorage; Fernet's own timestamp gives the TTL, and file mtimes (bumped
+    on every read) drive LRU eviction once `max_entries` is exceeded. An entry
+    is only written again when its state changed, so restoring and saving the
+    same cookies doesn't keep them alive past the TTL. A site the context visited
+    that has no state left (logged out, or cleared by the site) loses its entry.
+    The file and Fernet work runs in a thread, off the shared browser loop.
+    """
+
+    def __init__(self, cache_dir: str | None = None, ttl: int | None = None, max_entries: int | None = None):
+        self.cache_dir = cache_dir or os.getenv("STORAGE_STATE_DIR", ".storage_state")
+        self.ttl = ttl or int(os.getenv("STORAGE_STATE_TTL", str(7 * 24 * 3600)))
+        self.max_entries = max_entries or int(os.getenv("STORAGE_STATE_MAX_ENTRIES", "500"))
+        key = os.getenv("STORAGE_STATE_KEY")
+        if not key and os.getenv("SECRET_KEY"):
+            key = base64.urlsafe_b64encode(hashlib.sha256(os.getenv("SECRET_KEY").encode()).digest())
+        # Without a key nothing is cached: session cookies must never hit the disk in plain text
+        self.fernet = Fernet(key) if key else None
+        self.stats = {"restored": 0, "saved": 0, "unchanged": 0, "cleared": 0, "expired": 0, "evicted": 0}
+
+    @property
+    def enabled(self) -> bool:
+        return self.fernet is not None
+
+    def _user_dir(self, user_id: str) -> str:
+        return os.path.join(self.cache_dir, _digest(str(user_id)))
+
+    def load(self, user_id: str) -> dict:
+        """Merged storage state of every unexpired site cached for this user"""
+        state = {"cookies": [], "origins": []}
+        user_dir = self._user_dir(user_id)
+        if not self.enabled or not os.path.isdir(user_dir):
+            return state
+        for name in os.listdir(user_dir):
+            path = os.path.join(user_dir, name)
+            try:
+                with open(path, "rb") as f:
+                    entry = json.loads(self.fernet.decrypt(f.read(), ttl=self.ttl))
+            except InvalidToken:
+                # Expired or written with another key
+                self.stats["expired"] += 1
+                os.remove(path)
+                continue
+            except (OSError, ValueError):
+                continue
+            os.utime(path)
+            state["cookies"].extend(entry.get("cookies", []))
+            state["origins"].extend(entry.get("origins", []))
+            self.stats["restored"] += 1
+        return state
+
+    def _path(self, user_id: str, site: str) -> str:
+        return os.path.join(self._user_dir(user_id), f"{_digest(site)}.bin")
+
+    def save(self, user_id: str, storage_state: dict, visited: Iterable[str] = ()):
+        """Write the state per site; `visited` are the sites the context opened"""
+        if not self.enabled:
+            return
+        sites: dict[str, dict] = {}
+        for cookie in storage_state.get("cookies", []):
+            sites.setdefault(_site(cookie.get("domain", "")), {"cookies": [], "origins": []})["cookies"].append(cookie)
+        for origin in storage_state.get("origins", []):
+            host = urlparse(origin.get("origin", "")).hostname or ""
+            sites.setdefault(_site(host), {"cookies": [], "origins": []})["origins"].append(origin)
+
+        visited = set(visited)
+        for site in visited - set(sites):
+            # Logged out or cleared by the site: don't bring the old session back next run
+            try:
+                os.remove(self._path(user_id, site))
+                self.stats["cleared"] += 1
+            except OSError:
+                pass
+
+        os.makedirs(self._user_dir(user_id), mode=0o700, exist_ok=True)
+        for site, entry in sites.items():
+            if not site:
+                continue
+            path = self._path(user_id, site)
+            stored = self._stored(path)
+            if stored is not None and site not in visited:
+                # localStorage only shows up in the state for origins the context opened
+                seen = {origin.get("origin") for origin in entry["origins"]}
+                entry["origins"].extend(origin for origin in json.loads(stored).get("origins", [])
+                                        if origin.get("origin") not in seen)
+            entry["cookies"].sort(key=lambda cookie: (cookie.get("domain", ""), cookie.get("path", ""), cookie.get("name", "")))
+            entry["origins"].sort(key=lambda origin: origin.get("origin", ""))
+            payload = json.dumps(entry, sort_keys=True).encode()
+            if stored == payload:
+                self.stats["unchanged"] += 1
+                continue
+            # Two leases of the same user can save at once, each from its own thread
+            tmp_path = f"{path}.{threading.get_ident()}.tmp"
+            with open(tmp_path, "wb") as f:
+                f.write(self.fernet.encrypt(payload))
+            os.replace(tmp_path, path)
+            self.stats["saved"] += 1
+        self._evict()
+
+    def _stored(self, path: str) -> bytes | None:
+        """Plaintext of the unexpired entry at path, if any"""
+        try:
+            with open(path, "rb") as f:
+                return self.fernet.decrypt(f.read(), ttl=self.ttl)
+        except (OSError, InvalidToken):
+            return None
+
+    def _evict(self):
+        entries = []
+        for user in os.listdir(self.cache_dir):
+            user_dir = os.path.join(self.cache_dir, user)
+            if not os.path.isdir(user_dir):
+                continue
+            for name in os.listdir(user_dir):
+                path = os.path.join(user_dir, name)
+                try:
+                    entries.append((os.path.getmtime(path), path))
+                except OSError:
+                    # Removed by a save running in another thread
+                    continue
+        if len(entries) <= self.max_entries:
+            return
+        entries.sort()
+        for _, path in entries[:len(entries) - self.max_entries]:
+            try:
+                os.remove(path)
+                self.stats["evicted"] += 1
+            except OSError:
+                pass
+
+    async def restore_into(self, context, user_id: str) -> set[str]:
+        """Add the user's cached state to the context and start recording the sites it visits.
+
+        Returns that (growing) set of sites, for save_from.
+        """
+        visited = set()
+
+        def watch(page):
+            page.on("framenavigated", lambda frame: visited.add(_site(urlparse(frame.url).hostname or "")))
+
+        for page in context.pages:
+            watch(page)
+        context.on("page", watch)
+
+        state = await asyncio.to_thread(self.load, user_id)
+        if state["cookies"]:
+            await context.add_cookies(state["cookies"])
+        for origin in state["origins"]:
+            items = {item["name"]: item["value"] for item in origin.get("localStorage", [])}
+            if not items:
+                continue
+            await context.add_init_script(f"""
+            (() => {{
+                if (window.location.origin !== {json.dumps(origin["origin"])}) return;
+                const items = {json.dumps(items)};
+                for (const [name, value] of Object.entries(items)) {{
+                    if (window.localStorage.getItem(name) === null) window.localStorage.setItem(name, value);
+                }}
+            }})();
+            """)
+        return visited
+
+    async def save_from(self, context, user_id: str, visited: Iterable[str] = ()):
+        await asyncio.to_thread(self.save, user_id, await context.storage_state(), set(visited) - {""})
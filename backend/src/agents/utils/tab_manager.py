@@ -0,0 +1,108 @@
+from playwright.async_api import Page, BrowserContext
+from typing import Any, Awaitable, Callable, Dict, List, Tuple
+import asyncio
+import os
+import time
+
+
+class TabManager:
+    """Named pages of one run's browser context.
+
+    The lease's page is the "main" tab. Browser tools act on the active tab, and
+    fan_out() runs work on several tabs at once, at most max_concurrency at a
+    time per run. All methods run on the browser loop.
+    """
+
+    def __init__(self, context: BrowserContext, page: Page, max_tabs: int | None = None,
+                 max_concurrency: int | None = None):
+        self.context = context
+        self._tabs: Dict[str, Page] = {"main": page}
+        self.active = "main"
+        self.max_tabs = max_tabs or int(os.getenv("MAX_TABS", "6"))
+        self.max_concurrency = max_concurrency or int(os.getenv("TAB_CONCURRENCY", "3"))
+        self._semaphore = asyncio.Semaphore(self.max_concurrency)
+        self._metrics = {"opened": 0, "fan_outs": 0, "fan_out_jobs": 0,
+                         "fan_out_wall_time": 0.0, "fan_out_work_time": 0.0}
+
+    @property
+    def page(self) -> Page:
+        """The active tab"""
+        return self._tabs[self.active]
+
+    def names(self) -> List[str]:
+        return list(self._tabs)
+
+    def get(self, name: str) -> Page:
+        if name not in self._tabs:
+            raise ValueError(f"No tab named '{name}', open tabs: {', '.join(self._tabs)}.")
+        return self._tabs[name]
+
+    async def open(self, name: str) -> Page:
+        """The tab called name, opened in the run's context if it doesn't exist yet"""
+        if name in self._tabs:
+            return self._tabs[name]
+        if len(self._tabs) >= self.max_tabs:
+            raise ValueError(f"Can't open tab '{name}': {self.max_tabs} tabs are already open "
+                             f"({', '.join(self._tabs)}), close one first.")
+        page = await self.context.new_page()
+        self._tabs[name] = page
+        # The site may close it itself (window.close)
+        page.on("close", lambda closed: self._forget(name, closed))
+        self._metrics["opened"] += 1
+        return page
+
+    def _forget(self, name: str, page: Page):
+        if self._tabs.get(name) is page:
+            del self._tabs[name]
+            if self.active == name:
+                self.active = "main"
+
+    def switch(self, name: str) -> Page:
+        page = self.get(name)
+        self.active = name
+        return page
+
+    async def close(self, name: str):
+        if name == "main":
+            raise ValueError("The main tab can't be closed.")
+        page = self.get(name)
+        self._forget(name, page)
+        await page.close()
+
+    async def fan_out(self, jobs: List[Tuple[str, Callable[[Page], Awaitable[Any]]]],
+                      close_after: bool = False) -> List[Any]:
+        """Run each (tab name, work(page)) job on its own tab, max_concurrency at a time.
+
+        With close_after, tabs opened for a job are closed as soon as it is done, so
+        no more than max_concurrency extra tabs exist at once. Results come back in
+        job order; a job that raised returns its exception.
+        """
+        async def run(name: str, work: Callable[[Page], Awaitable[Any]]):
+            async with self._semaphore:
+                started = time.perf_counter()
+                opened = name not in self._tabs
+                try:
+                    return await work(await self.open(name))
+                finally:
+                    self._metrics["fan_out_work_time"] += time.perf_counter() - started
+                    if close_after and opened and name in self._tabs:
+                        await self.close(name)
+
+        started = time.perf_counter()
+        results = await asyncio.gather(*(run(name, work) for name, work in jobs), return_exceptions=True)
+        self._metrics["fan_outs"] += 1
+        self._metrics["fan_out_jobs"] += len(jobs)
+        self._metrics["fan_out_wall_time"] += time.perf_counter() - started
+        return results
+
+    def describe(self) -> str:
+        return "; ".join(f"{name}{' (active)' if name == self.active else ''}: {page.url}"
+                         for name, page in self._tabs.items())
+
+    def stats(self) -> dict:
+        return {
+            "open_tabs": len(self._tabs),
+            "active": self.active,
+            "max_concurrency": self.max_concurrency,
+            **self._metrics,
+        }
@@ -6,10 +6,30 @@ from src.routes.chat_route import chatRouter
 from src.models import user_model #need to do this asqlite must know about what models exist before it calls create_all to create tables
 import os
 from fastapi.middleware.cors import CORSMiddleware
+from contextlib import asynccontextmanager
+from src.agents.utils.browser_manager import browser_manager
+from src.agents.utils.browser_loop import browser_loop
+from src.utils.worker_farm import worker_farm
 load_dotenv()
 
 Base.metadata.create_all(bind=engine)
-app=FastAPI()
+
+
+@asynccontextmanager
+async def lifespan(app:FastAPI):
+    # Either the farm workers own the browsers, or Chromium is launched once here and runs lease contexts from it
+    if worker_farm.enabled:
+        await worker_farm.start()
+        yield
+        await worker_farm.close()
+    else:
+        # Playwright lives on its own loop thread so crew runs never block this one
+        await browser_loop.run(browser_manager.start())
+        yield
+        await browser_loop.run(browser_manager.close())
+        browser_loop.stop()
+
+app=FastAPI(lifespan=lifespan)
 
 app.add_middleware(
     CORSMiddleware,
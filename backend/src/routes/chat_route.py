@@ -7,12 +7,17 @@ from sqlalchemy import or_
 from src.schema import schema
 from fastapi.responses import JSONResponse
 from src.middleware.get_current_user import getCurrentUser
+from src.controllers.auth import validate_token
 from src.agents.main import run
 from src.utils.connection_manager import manager
-import nest_asyncio
-
-
-nest_asyncio.apply()
+from src.agents.utils.browser_manager import browser_manager
+from src.agents.tools.snapshot_cache import snapshot_cache
+from src.agents.tools.element_registry import element_registry
+from src.agents.tools.page_readiness import page_readiness
+from src.agents.utils.screenshot_pipeline import screenshot_pipeline
+from src.agents.utils.browser_loop import browser_loop
+from src.agents.utils.action_trace import trace_store
+from src.utils.worker_farm import worker_farm
 
 chatRouter=APIRouter()
 
@@ -25,20 +30,48 @@ def get_db():
 
 
 
+def get_websocket_user_id(websocket:WebSocket):
+    # Optional ?token=<jwt>; anonymous runs just don't get cached browser logins
+    token=websocket.query_params.get("token")
+    if not token:
+        return None
+    try:
+        user=validate_token(token)
+    except HTTPException:
+        return None
+    return str(user["userid"]) if user else None
+
+
 @chatRouter.websocket("/websocket")
 async def websocket_endpoint(websocket:WebSocket):
     print("Came to correct place")
+    user_id=get_websocket_user_id(websocket)
     await manager.connect(websocket)
 
     try:
         while True:
             user_request=await websocket.receive_text()
-            await run(user_request)
+            if worker_farm.enabled:
+                try:
+                    await worker_farm.submit(user_request, user_id=user_id, on_event=manager.broadcast)
+                except RuntimeError as e:
+                    await manager.send_personal_message(f"Run failed: {e}", websocket)
+            else:
+                await run(schema.ChatInput(user_request=user_request, user_id=user_id))
 
     except WebSocketDisconnect:
         manager.disconnect(websocket)
 
-        
+
+@chatRouter.get("/browser/stats")
+async def browser_stats():
+    if worker_farm.enabled:
+        return worker_farm.stats()
+    return {**browser_manager.stats(), "snapshot_cache": snapshot_cache.stats(),
+            "element_addressing": element_registry.stats(), "page_readiness": page_readiness.stats(),
+            "screenshots": screenshot_pipeline.stats(), "browser_loop": browser_loop.stats(),
+            "action_traces": trace_store.stats()}
+
 
 
 
@@ -26,6 +26,7 @@ class Token(BaseModel):
 
 class ChatInput(BaseModel):
     user_request:str
+    user_id:Optional[str]=None #set for authenticated users so their browser logins can be reused
 
 
 class ChatOutputFormat(BaseModel):
@@ -1,10 +1,14 @@
 from fastapi import WebSocket
+import asyncio
 
 class ConnectionManager:
     def __init__(self):
         self.active_connections: list[WebSocket] = []
+        self.sink = None
+        self.loop: asyncio.AbstractEventLoop | None = None
 
     async def connect(self, websocket: WebSocket):
+        self.loop = asyncio.get_running_loop()
         await websocket.accept()
         self.active_connections.append(websocket)
 
@@ -14,9 +18,32 @@ class ConnectionManager:
     async def send_personal_message(self, message: str, websocket: WebSocket):
         await websocket.send_text(message)
 
+    def forward_to(self, sink):
+        # Inside a worker-farm process there are no sockets, events go back to the API process instead
+        self.sink = sink
+
     async def broadcast(self, message: str):
+        if self.sink:
+            self.sink(message)
+            return
         for connection in self.active_connections:
             await connection.send_text(message)
 
+    def publish(self, message: str):
+        """Broadcast from any thread, e.g. the crew's, without waiting for the sockets"""
+        if self.sink:
+            self.sink(message)
+            return
+        if self.loop is None or self.loop.is_closed():
+            return
+        try:
+            running = asyncio.get_running_loop()
+        except RuntimeError:
+            running = None
+        if running is self.loop:
+            self.loop.create_task(self.broadcast(message))
+        else:
+            asyncio.run_coroutine_threadsafe(self.broadcast(message), self.loop)
+
 
 manager = ConnectionManager()
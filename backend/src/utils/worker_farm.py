@@ -0,0 +1,187 @@
+import asyncio
+import multiprocessing as mp
+import os
+import queue
+import threading
+import traceback
+import uuid
+from dataclasses import dataclass
+
+
+def _worker_main(index: int, jobs, events):
+    """Entry point of a farm worker: owns its own Playwright driver and Chromium"""
+    # Imported here so the API process never pays for crewAI/Playwright just to spawn
+    from src.agents.main import run
+    from src.agents.utils.browser_manager import browser_manager
+    from src.agents.utils.browser_loop import browser_loop
+    from src.schema import schema
+    from src.utils.connection_manager import manager
+
+    async def serve():
+        loop = asyncio.get_running_loop()
+        await browser_loop.run(browser_manager.start())
+        try:
+            while True:
+                job = await loop.run_in_executor(None, jobs.get)
+                if job is None:
+                    break
+                job_id, user_request, user_id = job
+                manager.forward_to(lambda message: events.put(("event", job_id, message)))
+                try:
+                    result = await run(schema.ChatInput(user_request=user_request, user_id=user_id))
+                    events.put(("done", job_id, result))
+                except Exception as e:
+                    traceback.print_exc()
+                    events.put(("error", job_id, f"{e}"))
+                finally:
+                    manager.forward_to(None)
+        finally:
+            await browser_loop.run(browser_manager.close())
+            browser_loop.stop()
+
+    print(f"Browser worker {index} started (pid={os.getpid()}).")
+    asyncio.run(serve())
+
+
+@dataclass
+class _Worker:
+    index: int
+    process: mp.Process
+    jobs: object
+    job_id: str | None = None
+    restarting: bool = False
+
+
+class WorkerFarm:
+    """Runs browser sessions in a pool of worker processes.
+
+    Each worker owns a Playwright driver and Chromium, receives run() jobs over
+    its own queue and streams listener events back on a shared one, so a
+    crashing browser only costs the job it was running.
+    """
+
+    def __init__(self, size: int | None = None):
+        self.size = size if size is not None else int(os.getenv("BROWSER_WORKERS", "0"))
+        self._ctx = mp.get_context("spawn")
+        self._events = None
+        self._workers: list[_Worker] = []
+        self._idle: asyncio.Queue | None = None
+        self._pending: dict[str, asyncio.Future] = {}
+        self._on_event: dict[str, object] = {}
+        self._loop: asyncio.AbstractEventLoop | None = None
+        self._reader: threading.Thread | None = None
+        self._closing = False
+        self._metrics = {"jobs_total": 0, "jobs_failed": 0, "worker_restarts": 0}
+
+    @property
+    def enabled(self) -> bool:
+        return self.size > 0
+
+    async def start(self):
+        self._loop = asyncio.get_running_loop()
+        self._events = self._ctx.Queue()
+        self._idle = asyncio.Queue()
+        self._closing = False
+        for index in range(self.size):
+            self._workers.append(self._spawn(index))
+            self._idle.put_nowait(index)
+        self._reader = threading.Thread(target=self._read_events, daemon=True)
+        self._reader.start()
+        print(f"Worker farm started with {self.size} browser workers.")
+
+    def _spawn(self, index: int) -> _Worker:
+        jobs = self._ctx.Queue()
+        process = self._ctx.Process(target=_worker_main, args=(index, jobs, self._events), daemon=True)
+        process.start()
+        return _Worker(index=index, process=process, jobs=jobs)
+
+    async def submit(self, user_request: str, user_id: str | None = None, on_event=None) -> dict:
+        """Dispatch one run() to an idle worker and wait for its result"""
+        index = await self._idle.get()
+        worker = self._workers[index]
+        job_id = uuid.uuid4().hex
+        future = self._loop.create_future()
+        self._pending[job_id] = future
+        if on_event:
+            self._on_event[job_id] = on_event
+        worker.job_id = job_id
+        self._metrics["jobs_total"] += 1
+        worker.jobs.put((job_id, user_request, user_id))
+        try:
+            return await future
+        finally:
+            self._pending.pop(job_id, None)
+            self._on_event.pop(job_id, None)
+            if worker.job_id == job_id:
+                worker.job_id = None
+                self._idle.put_nowait(index)
+
+    def _read_events(self):
+        # Runs on its own thread: multiprocessing queues only offer blocking reads
+        while not self._closing:
+            try:
+                message = self._events.get(timeout=1)
+            except queue.Empty:
+                message = None
+            except (EOFError, OSError):
+                break
+            if message is not None:
+                self._loop.call_soon_threadsafe(self._handle_message, message)
+            for worker in self._workers:
+                if not worker.restarting and not worker.process.is_alive() and not self._closing:
+                    worker.restarting = True
+                    self._loop.call_soon_threadsafe(self._restart_worker, worker.index)
+
+    def _handle_message(self, message):
+        kind, job_id, payload = message
+        future = self._pending.get(job_id)
+        if future is None or future.done():
+            return
+        if kind == "event":
+            on_event = self._on_event.get(job_id)
+            if on_event:
+                asyncio.create_task(on_event(payload))
+        elif kind == "done":
+            future.set_result(payload)
+        elif kind == "error":
+            self._metrics["jobs_failed"] += 1
+            future.set_exception(RuntimeError(payload))
+
+    def _restart_worker(self, index: int):
+        worker = self._workers[index]
+        print(f"Browser worker {index} exited with code {worker.process.exitcode}, restarting.")
+        self._metrics["worker_restarts"] += 1
+        self._workers[index] = self._spawn(index)
+        # An idle worker's slot is still queued; a busy one is handed back by submit()
+        future = self._pending.get(worker.job_id) if worker.job_id else None
+        if future and not future.done():
+            self._metrics["jobs_failed"] += 1
+            future.set_exception(RuntimeError(f"Browser worker {index} crashed while running the job"))
+
+    def stats(self) -> dict:
+        return {
+            "workers": self.size,
+            "busy": sum(1 for worker in self._workers if worker.job_id),
+            "alive": sum(1 for worker in self._workers if worker.process.is_alive()),
+            **self._metrics,
+        }
+
+    async def close(self):
+        self._closing = True
+        for worker in self._workers:
+            try:
+                worker.jobs.put(None)
+            except Exception:
+                pass
+        for worker in self._workers:
+            await asyncio.to_thread(worker.process.join, 10)
+            if worker.process.is_alive():
+                worker.process.terminate()
+        for future in self._pending.values():
+            if not future.done():
+                future.set_exception(RuntimeError("Worker farm shut down"))
+        self._workers = []
+        print("Worker farm stopped.")
+
+
+worker_farm = WorkerFarm()